@@ -0,0 +1,87 @@
+"""
+FileMarker单文件处理耗时的基准测试
+
+生成一批包含中文字符串的Python模块, 分别统计:
+- extract_tokens: FileMarker(...).handle(only_extract_tokens=True) 端到端耗时
+- read+parse+tokenize: 读取/解码/tokenize的耗时
+
+用法(在仓库根目录执行):
+    python benchmarks/bench_marker.py
+    python benchmarks/bench_marker.py --files 200 --statements 300 --repeat 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# 配置在导入时加载, 未指定时使用模板配置
+os.environ.setdefault("CONFIG_PATH", os.path.join(ROOT, "jinx.template.toml"))
+
+from marker.marker import FileMarker  # noqa: E402
+
+HEADER = "import os\nfrom django.utils.translation import gettext_lazy as _\n\n"
+
+
+def generate_module(statements: int, rng: random.Random) -> str:
+    """生成一个模块, 约1/4的语句为中文字符串赋值, 其余为普通函数"""
+    lines = [HEADER]
+    for i in range(statements):
+        if rng.random() < 0.25:
+            lines.append(f'X{i} = "中文字符串{i}"\n')
+        else:
+            lines.append(f"def f{i}(a, b):\n    return a + b * {i}  # comment\n")
+    return "".join(lines)
+
+
+def generate_corpus(path: str, files: int, statements: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    filepaths = []
+    for i in range(files):
+        filepath = os.path.join(path, f"m{i}.py")
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(generate_module(statements, rng))
+        filepaths.append(filepath)
+    return filepaths
+
+
+def best_of(repeat: int, func) -> float:
+    """多次执行取最短耗时, 减少其他进程的干扰"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def extract_tokens(filepaths: list[str]):
+    for filepath in filepaths:
+        FileMarker(filepath).handle(only_extract_tokens=True)
+
+
+def tokenize_only(filepaths: list[str]):
+    for filepath in filepaths:
+        for _ in FileMarker(filepath).token_generator:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200, help="生成的模块数")
+    parser.add_argument("--statements", type=int, default=300, help="每个模块的语句数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数, 取最短耗时")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        filepaths = generate_corpus(path, args.files, args.statements)
+        for name, func in (("extract_tokens", extract_tokens), ("read+parse+tokenize", tokenize_only)):
+            elapsed = best_of(args.repeat, lambda: func(filepaths))
+            print(f"{name}: {elapsed / len(filepaths) * 1000:.2f} ms/file ({len(filepaths)} files)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+PO文件备份
+快照按内容摘要去重并使用gzip压缩, 保存在po文件同级的.jinx_backups/<po文件名>/目录下, 超出保留数量的旧快照自动清理
+"""
+import gzip
+import json
+import os
+import typing
+from dataclasses import asdict, dataclass
+
+import arrow
+
+from common.config import backup
+from common.constants import BACKUP_DIR
+from common.prompt import Prompt
+from common.utils import atomic_write, content_digest, read_bytes
+
+BACKUP_INDEX_FILE = "index.json"
+SNAPSHOT_SUFFIX = ".po.gz"
+
+
+@dataclass
+class Snapshot:
+    """
+    单个快照
+    :param digest: po文件内容摘要, 同时也是快照文件名
+    :param created_at: 快照时间
+    :param size: po文件大小
+    :param mtime_ns: 快照时po文件的修改时间
+    """
+
+    digest: str
+    created_at: str
+    size: int
+    mtime_ns: int = 0
+
+
+class BackupStore:
+    """
+    PO文件备份仓库
+    :param po_file_path: po文件路径
+    :param keep: 保留的快照数量
+    """
+
+    def __init__(self, po_file_path: str, keep: int = backup.keep):
+        self._po_fp = po_file_path
+        self._keep = max(1, keep)
+        po_dir, po_name = os.path.split(os.path.abspath(po_file_path))
+        self._dir = os.path.join(po_dir, BACKUP_DIR, po_name)
+        self._index_fp = os.path.join(self._dir, BACKUP_INDEX_FILE)
+
+    def _snapshot_path(self, digest: str) -> str:
+        return os.path.join(self._dir, f"{digest}{SNAPSHOT_SUFFIX}")
+
+    @property
+    def snapshots(self) -> list[Snapshot]:
+        """所有快照, 按时间从旧到新排列"""
+        if not os.path.exists(self._index_fp):
+            return []
+        try:
+            with open(self._index_fp, encoding="utf-8") as f:
+                return [Snapshot(**_s) for _s in json.load(f)]
+        except (ValueError, TypeError) as e:
+            Prompt.warning("Ignore broken backup index {fp}: {e}", fp=self._index_fp, e=e)
+            return []
+
+    def _save_index(self, snapshots: list[Snapshot]):
+        content = json.dumps([asdict(_s) for _s in snapshots], ensure_ascii=False, indent=4)
+        atomic_write(self._index_fp, content, encoding="utf-8")
+
+    def snapshot(self) -> typing.Optional[Snapshot]:
+        """
+        备份当前po文件
+        内容与最近一次快照相同时跳过, 内容与更早的快照相同时只更新索引, 不重复保存
+        :return: 新增的快照, 跳过时返回None
+        """
+        snapshots = self.snapshots
+        stat = os.stat(self._po_fp)
+        latest = snapshots[-1] if snapshots else None
+        # mtime/大小未变化时无需读取文件
+        if latest and latest.size == stat.st_size and latest.mtime_ns == stat.st_mtime_ns:
+            return None
+        content = read_bytes(self._po_fp)
+        digest = content_digest(content)
+        if latest and latest.digest == digest:
+            return None
+        os.makedirs(self._dir, exist_ok=True)
+        if not os.path.exists(self._snapshot_path(digest)):
+            atomic_write(self._snapshot_path(digest), gzip.compress(content, mtime=0))
+        current = Snapshot(
+            digest=digest,
+            created_at=arrow.now().format("YYYY-MM-DDTHH:mm:ss"),
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+        snapshots = [_s for _s in snapshots if _s.digest != digest] + [current]
+        self._prune(snapshots[: -self._keep])
+        self._save_index(snapshots[-self._keep :])
+        return current
+
+    def _prune(self, expired: list[Snapshot]):
+        for _s in expired:
+            try:
+                os.remove(self._snapshot_path(_s.digest))
+            except FileNotFoundError:
+                pass
+
+    def find(self, version: str = None) -> Snapshot:
+        """
+        查找快照
+        :param version: 内容摘要前缀, 不传时返回最近一次快照
+        """
+        snapshots = self.snapshots
+        if not snapshots:
+            Prompt.panic("No backups for {po_file}", po_file=self._po_fp)
+        if not version:
+            return snapshots[-1]
+        matched = [_s for _s in snapshots if _s.digest.startswith(version)]
+        if len(matched) != 1:
+            Prompt.panic("Backup version {version} matched {count} snapshots", version=version, count=len(matched))
+        return matched[0]
+
+    def restore(self, version: str = None) -> Snapshot:
+        """
+        从快照恢复po文件, 恢复前会先备份当前内容, 以便撤销
+        :param version: 内容摘要前缀, 不传时恢复最近一次快照
+        """
+        target = self.find(version)
+        with open(self._snapshot_path(target.digest), "rb") as f:
+            content = gzip.decompress(f.read())
+        if content_digest(content) != target.digest:
+            Prompt.panic("Backup {digest} is corrupted", digest=target.digest)
+        self.snapshot()
+        atomic_write(self._po_fp, content, keep_mode=True)
+        Prompt.info(
+            "Restored {po_file} from backup {digest} ({created_at})",
+            po_file=self._po_fp,
+            digest=target.digest,
+            created_at=target.created_at,
+        )
+        return target
+
+    def show(self):
+        """输出所有快照"""
+        snapshots = self.snapshots
+        if not snapshots:
+            Prompt.info("No backups for {po_file}", po_file=self._po_fp)
+            return
+        for _s in reversed(snapshots):
+            Prompt.print(f"{_s.digest}  {_s.created_at}  {_s.size} bytes")
+
+
+__all__ = ["BackupStore", "Snapshot"]
@@ -1,11 +1,15 @@
 import os
+import tomllib
 import typing
 from dataclasses import dataclass
 
-import tomllib
-
-from common import Prompt
-from common.constants import LanguageEnum, LanguageRegexEnum
+from common.constants import (
+    DEFAULT_BACKUP_KEEP,
+    DEFAULT_CACHE_PATH,
+    LanguageEnum,
+    LanguageRegexEnum,
+)
+from common.prompt import Prompt
 
 """
 以下是全局配置
@@ -36,6 +40,29 @@ class LanguageConfig:
         self.re = LanguageRegexEnum[self.current]
 
 
+@dataclass
+class CacheConfig:
+    """缓存配置"""
+
+    enabled: bool = True
+    path: str = DEFAULT_CACHE_PATH
+
+
+@dataclass
+class BackupConfig:
+    """po文件备份配置"""
+
+    enabled: bool = True
+    keep: int = DEFAULT_BACKUP_KEEP
+
+
+@dataclass
+class PoConfig:
+    """po文件配置"""
+
+    sidecar_cache: bool = False
+
+
 """
 以下是主逻辑: 配置文件加载
 """
@@ -49,6 +76,9 @@ class Config:
     """
 
     language: LanguageConfig
+    cache: CacheConfig
+    po: PoConfig
+    backup: BackupConfig
 
 
 class ConfigUtil:
@@ -72,11 +102,15 @@ class ConfigUtil:
         """
         if not key:
             return self._config
-        key_hierarchy = key.split(".")
-        value = self._config.get(key_hierarchy[0], "")
-        for key in key_hierarchy[1:]:
-            value = value.get(key)
-        if not value and default:
+        value: typing.Any = self._config
+        for _key in key.split("."):
+            # 中间层级不存在时, 视为未配置
+            if not isinstance(value, dict):
+                value = None
+                break
+            value = value.get(_key)
+        # 未配置或配置为空字符串时使用默认值, 显式配置的false/0/[]保持原样
+        if value is None or value == "":
             value = default
         return value
 
@@ -90,5 +124,17 @@ language = LanguageConfig(
     dest=config_util.get("language.dest", LanguageEnum.English),
 )
 
+cache = CacheConfig(
+    enabled=config_util.get("cache.enabled", True),
+    path=config_util.get("cache.path", DEFAULT_CACHE_PATH),
+)
+
+po = PoConfig(sidecar_cache=config_util.get("po.sidecar_cache", False))
+
+backup = BackupConfig(
+    enabled=config_util.get("backup.enabled", True),
+    keep=config_util.get("backup.keep", DEFAULT_BACKUP_KEEP),
+)
+
 # 只允许其他模块导入__all__中的变量
-__all__ = ["language", "config_util"]
+__all__ = ["language", "cache", "po", "backup", "config_util"]
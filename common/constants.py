@@ -12,12 +12,38 @@ if _cpu_count is None:
 else:
     MAX_WORKERS = math.ceil(_cpu_count / 2)
 
+# 多进程标记时, 每批分发给worker的最大文件数
+MARKER_CHUNK_SIZE = 32
+
+# 提取词条时, 每批写入po文件的最大msgid数
+EXTRACT_BATCH_SIZE = 500
+
 # py文件后缀
 FILE_SUFFIX = ".py"
 
+# 遍历文件时始终跳过的目录
+DEFAULT_EXCLUDE_DIRS = (".git", ".hg", ".svn", "node_modules", "__pycache__")
+
 # 默认编码
 DEFAULT_ENCODING = "utf-8"
 
+# 默认缓存目录
+DEFAULT_CACHE_PATH = ".jinx_cache"
+
+# msgctxt与msgid之间的分隔符, 与gettext的mo文件一致, 用于JSON导出/导入时区分不同上下文的同一msgid
+MSGCTXT_SEPARATOR = "\x04"
+
+# po文件备份目录, 位于po文件同级目录
+BACKUP_DIR = ".jinx_backups"
+# 默认保留的备份数量
+DEFAULT_BACKUP_KEEP = 10
+
+# 编译清单文件名, 位于缓存目录, 记录每个po文件上次编译时的内容摘要
+COMPILER_MANIFEST_FILE = "compiler.json"
+
+# 导出快照目录, 位于缓存目录, 记录每个po文件上次导出的词条
+EXPORT_SNAPSHOT_DIR = "export_snapshots"
+
 # Django 导入语句前缀
 DJANGO_TRANSLATE_FUNC_IMPORT_PATH_PREFIX = "from django.utils.translation import "
 DEFAULT_TRANSLATION_FUNC_ALIAS = "_"
@@ -154,6 +180,14 @@ LanguageRegexEnum = {
     LanguageEnum.Korean: r"[\uac00-\ud7af]+",
 }
 
+# 语言正则对应的码点区间, 用于字节级预筛选, 需与LanguageRegexEnum保持一致
+LanguageCharRangeEnum = {
+    LanguageEnum.English: ((0x41, 0x5A), (0x61, 0x7A)),
+    LanguageEnum.Chinese: ((0x4E00, 0x9FA5),),
+    LanguageEnum.Japanese: ((0x3040, 0x30FF), (0x31F0, 0x31FF), (0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF)),
+    LanguageEnum.Korean: ((0xAC00, 0xD7AF),),
+}
+
 
 class PoFileModeEnum(EnhanceEnum):
     """文件模式"""
@@ -170,8 +204,18 @@ class PoFileModeEnum(EnhanceEnum):
 
 # 最大同时请求语句数
 MAX_CONCURRENT_REQUEST = 10
+# 自适应并发的默认目标延迟(秒), 请求延迟不超过该值时才增加并发
+DEFAULT_THROTTLE_LATENCY_TARGET = 2.0
 # 默认google翻译url
 DEFAULT_GOOGLE_TRANSLATE_URL = "https://translate.google.com"
+# 谷歌翻译批量请求的最大语句数/URL编码后的最大长度
+GOOGLE_BATCH_MAX_ITEMS = 50
+GOOGLE_BATCH_MAX_URL_SIZE = 6000
+# 翻译请求的默认连接超时/读取超时(秒)
+DEFAULT_HTTP_CONNECT_TIMEOUT = 5
+DEFAULT_HTTP_READ_TIMEOUT = 30
+# 翻译请求连接失败或服务端错误(5xx)时的默认重试次数
+DEFAULT_HTTP_RETRIES = 2
 
 
 class TranslatorProviderEnum(EnhanceEnum):
@@ -186,6 +230,50 @@ class TranslatorProviderEnum(EnhanceEnum):
     # Baidu = "baidu"
 
 
+class ExportFormatEnum(EnhanceEnum):
+    """导出格式"""
+
+    NAME = "Export format"
+
+    JSON = "json"
+    JSONL = "jsonl"
+    CSV = "csv"
+
+    @classmethod
+    def from_path(cls, path: str) -> str:
+        """根据文件后缀判断格式, 无法判断时为json"""
+        suffix = os.path.splitext(path)[1].lstrip(".").lower()
+        return suffix if suffix in (cls.JSON, cls.JSONL, cls.CSV) else cls.JSON
+
+
+class ImportConflictEnum(EnhanceEnum):
+    """导入冲突原因"""
+
+    NAME = "Import conflict"
+
+    # po文件中不存在该词条, 源文案在导出后被修改或删除
+    MISSING = "missing"
+    # 词条已废弃
+    OBSOLETE = "obsolete"
+    # 导出后po文件中的译文被修改, 且与评审后的译文不同, 仅增量导出的词条可以检测
+    MODIFIED = "modified"
+    # 复数词条, 导出格式只包含msgstr, 无法写回复数译文
+    PLURAL = "plural"
+
+
+class CompileStatusEnum(EnhanceEnum):
+    """po编译结果"""
+
+    NAME = "Compile status"
+
+    # 已编译
+    COMPILED = "compiled"
+    # mo文件已是最新, 跳过
+    SKIPPED = "skipped"
+    # 编译失败
+    FAILED = "failed"
+
+
 class TranslatorModeEnum(EnhanceEnum):
     """翻译模式"""
 
@@ -210,5 +298,17 @@ class YouDaoSupportDomainEnum(EnhanceEnum):
     Finance = "finance"
 
 
+# 翻译记忆库默认路径, 位于用户目录, 多个项目共享
+DEFAULT_TRANSLATION_MEMORY_PATH = "~/.jinx/translation_memory.db"
+# 从po文件导入的人工翻译在翻译记忆库中的提供商名称, 优先于机器翻译
+TRANSLATION_MEMORY_PO_PROVIDER = "po"
+
 # 有道SDK翻译url
 YOU_DAO_SDK_URL = "https://openapi.youdao.com/api"
+# 有道SDK批量翻译url
+YOU_DAO_SDK_BATCH_URL = "https://openapi.youdao.com/v2/api"
+# 有道批量翻译单个请求的最大语句数/最大字符数
+YOU_DAO_BATCH_MAX_ITEMS = 50
+YOU_DAO_BATCH_MAX_CHARS = 4000
+# 有道翻译访问频率受限的错误码
+YOU_DAO_THROTTLED_ERROR_CODE = "411"
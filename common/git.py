@@ -0,0 +1,69 @@
+"""
+git相关工具, 用于只处理变更文件
+"""
+import os
+import subprocess
+
+from common.prompt import Prompt
+
+
+def run_git(args: list[str], cwd: str) -> str:
+    """执行git命令, 失败时退出"""
+    try:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True)
+    except FileNotFoundError:
+        Prompt.panic("git is not installed")
+    except subprocess.CalledProcessError as e:
+        Prompt.panic("Failed to run git {args}: {e}", args=" ".join(args), e=e.stderr.strip())
+    return result.stdout
+
+
+def git_root(path: str) -> str:
+    """git仓库根目录"""
+    cwd = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+    return run_git(["rev-parse", "--show-toplevel"], cwd=cwd).strip()
+
+
+def show_file(path: str, ref: str) -> bytes:
+    """文件在指定git ref下的内容"""
+    root = git_root(path)
+    rel_path = os.path.relpath(os.path.realpath(path), root).replace(os.sep, "/")
+    try:
+        result = subprocess.run(["git", "show", f"{ref}:{rel_path}"], cwd=root, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        Prompt.panic("Failed to read {path} at {ref}: {e}", path=path, ref=ref, e=e.stderr.decode().strip())
+    return result.stdout
+
+
+def _split_z(output: str) -> list[str]:
+    return [_p for _p in output.split("\0") if _p]
+
+
+def _status_files(root: str) -> list[str]:
+    """工作区相对HEAD的变更文件, 包括未跟踪文件, 不包括已删除文件"""
+    files = []
+    entries = iter(_split_z(run_git(["status", "--porcelain", "-z", "--untracked-files=all"], cwd=root)))
+    for entry in entries:
+        status, path = entry[:2], entry[3:]
+        # 重命名/复制时, 下一项是原路径
+        if "R" in status or "C" in status:
+            next(entries, None)
+        if "D" in status:
+            continue
+        files.append(path)
+    return files
+
+
+def changed_files(path: str, since: str = None) -> list[str]:
+    """
+    获取git变更的文件, 返回绝对路径
+    :param path: 仓库内任意路径
+    :param since: git ref, 返回工作区相对该ref的变更以及未跟踪文件; 不传时返回工作区相对HEAD的变更
+    """
+    root = git_root(path)
+    if not since:
+        files = _status_files(root)
+    else:
+        files = _split_z(run_git(["diff", "--name-only", "-z", "--diff-filter=ACMR", since, "--"], cwd=root))
+        files += _split_z(run_git(["ls-files", "--others", "--exclude-standard", "-z"], cwd=root))
+    return [os.path.join(root, _f) for _f in dict.fromkeys(files)]
@@ -1,8 +1,29 @@
 import os
+import typing
 
+from common.config import language
 from common.prompt import Prompt
 
 
 def check_exist(path):
     if not os.path.exists(path):
         Prompt.panic("Path is not exist: {path}", path=path)
+
+
+def require_path(path: typing.Optional[str], name: str = "locale_path") -> str:
+    """必填的路径参数, 未传或不存在时退出"""
+    if not path:
+        Prompt.panic("Missing {name}", name=name)
+    check_exist(path)
+    return path
+
+
+def resolve_po_file(locale_path: str, lang: str = None) -> str:
+    """
+    locale目录或po文件路径转换为po文件路径
+    :param locale_path: Django locale目录, 也可以是po文件路径
+    :param lang: 语言, 默认为目标语言
+    """
+    if locale_path.endswith(".po"):
+        return locale_path
+    return os.path.join(locale_path, lang or language.dest, "LC_MESSAGES", "django.po")
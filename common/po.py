@@ -1,98 +1,208 @@
-import json
-import shutil
+import typing
 
-import arrow
 import polib
 
+from common.backup import BackupStore
+from common.config import backup
+from common.config import po as po_config
 from common.constants import PoFileModeEnum
 from common.path import check_exist
+from common.po_cache import PoSidecar
+from common.po_reader import PoParseError, PoReader, PoRecord
 from common.prompt import Prompt
+from common.utils import atomic_path
+
+
+def iter_po_records(
+    po_file_path: str, predicate: typing.Callable[[PoRecord], bool] = None, include_header: bool = False
+) -> typing.Iterator[PoRecord]:
+    """
+    流式读取po文件条目, 不构建polib对象, 开启po.sidecar_cache时优先从旁路缓存加载
+    :param predicate: 过滤条件
+    :param include_header: 是否包括header条目
+    :raise PoParseError: po文件格式错误
+    """
+    if po_config.sidecar_cache:
+        records = PoSidecar(po_file_path).records(include_header)
+        return iter(records) if predicate is None else filter(predicate, records)
+    return PoReader(po_file_path).iter_records(predicate, include_header)
 
 
 class PoUtil:
-    """PO文件工具"""
+    """
+    PO文件工具
+    只读操作(导出/筛选词条)使用PoReader流式读取, 需要写入或访问polib对象时才完整解析
+    """
 
     def __init__(self, po_file_path: str):
         check_exist(po_file_path)
         self.po_file_path = po_file_path
-        self._po: polib.POFile
+        self.reader = PoReader(po_file_path)
+        self._po: typing.Optional[polib.POFile] = None
+        # msgid -> 条目索引, 同一msgid在不同msgctxt下可能对应多个条目
+        self._index: dict[str, list[polib.POEntry]] = {}
+        # 上次保存后变更的条目数, 为0时不写入文件
+        self._changed = 0
+
+    def _load(self) -> polib.POFile:
+        """使用polib完整解析po文件, 只执行一次"""
+        if self._po is not None:
+            return self._po
         try:
-            self._po = polib.pofile(po_file_path)
+            po = polib.pofile(self.po_file_path)
         except Exception as e:
-            Prompt.panic("Failed to load {po_file_path}: {e}", po_file=po_file_path, e=e)
-        # 初始化时读取po文件内现有所有msg
-        self.po_content_list: list[polib.POEntry] = [entry for entry in self._po]
-        self.po_content_dict: dict[str, str] = {entry.msgid: entry.msgstr for entry in self._po}
+            Prompt.panic("Failed to load {po_file}: {e}", po_file=self.po_file_path, e=e)
+        for entry in po:
+            self._index.setdefault(entry.msgid, []).append(entry)
+        self._po = po
+        return po
 
     @property
     def po(self) -> polib.POFile:
-        return self._po
+        return self._load()
+
+    @property
+    def po_content_list(self) -> list[polib.POEntry]:
+        return list(self.po)
+
+    @property
+    def po_content_dict(self) -> dict[str, str]:
+        return self.content_dict
+
+    def records(
+        self, predicate: typing.Callable[[PoRecord], bool] = None, include_header: bool = False
+    ) -> typing.Generator[PoRecord, None, None]:
+        """
+        流式读取磁盘上的条目, 不构建polib对象, 包括废弃条目, 默认不包括header
+        开启po.sidecar_cache时, 优先从旁路缓存加载
+        :param predicate: 过滤条件, 如: lambda r: r.msgstr == ""
+        :param include_header: 是否包括header条目
+        """
+        try:
+            yield from iter_po_records(self.po_file_path, predicate, include_header)
+        except PoParseError as e:
+            Prompt.panic("Failed to load {po_file}: {e}", po_file=self.po_file_path, e=e)
+
+    def find(self, msgid: str, msgctxt: str = None) -> typing.Optional[polib.POEntry]:
+        """按msgid和msgctxt查找条目"""
+        self._load()
+        for entry in self._index.get(msgid, []):
+            if entry.msgctxt == msgctxt:
+                return entry
+        return None
+
+    def _add(self, entry: polib.POEntry):
+        """新增条目并同步索引"""
+        self._load().append(entry)
+        self._index.setdefault(entry.msgid, []).append(entry)
+        self._changed += 1
 
     def _backup(self):
-        current = arrow.now().format("YYYY-MM-DDTHH-mm-ss")
-        backup_file = f"{self.po_file_path}_bak_{current}"
-        shutil.copyfile(self.po_file_path, backup_file)
+        """写入前备份, 内容与最近一次备份相同时跳过"""
+        if backup.enabled:
+            BackupStore(self.po_file_path).snapshot()
 
     @property
     def msgid_list(self) -> list[str]:
         """获取po文件所有msgid, 即需要翻译的所有内容"""
-        return [entry.msgid for entry in self._po]
+        if self._po is None:
+            return list(dict.fromkeys(_r.msgid for _r in self.records()))
+        return list(self._index)
 
     @property
     def content_dict(self) -> dict[str, str]:
-        """获取po文件所有信息"""
-        return self.po_content_dict
+        """获取po文件所有信息, 同一msgid存在多个条目时以最后一个为准"""
+        if self._po is None:
+            return {_r.msgid: _r.msgstr for _r in self.records()}
+        return {msgid: entries[-1].msgstr for msgid, entries in self._index.items()}
 
-    def write(self, data: dict[str, str], mode=PoFileModeEnum.UPDATE):
-        """写入po文件"""
-        # 写入前先备份
-        self._backup()
+    @property
+    def changed(self) -> int:
+        """上次保存后变更的条目数"""
+        return self._changed
+
+    def _set_msgstr(self, entry: polib.POEntry, msgstr: str):
+        """更新msgstr, 内容不变时不计入变更"""
+        if entry.msgstr == msgstr:
+            return
+        entry.msgstr = msgstr
+        self._changed += 1
+
+    def write(self, data: dict[str, str], mode=PoFileModeEnum.UPDATE) -> int:
+        """
+        写入po文件, 所有条目更新完成后只保存一次
+        :return: 变更的条目数
+        """
+        self._load()
         if mode == PoFileModeEnum.OVERWRITE:
             # 如果是OVERWRITE, 更新所有msgid匹配的数据
-            for entry in self._po:
-                if entry.msgid not in data:
-                    continue
-                entry.msgstr = data[entry.msgid]
-            self._po.save()
-            return
+            for msgid, msgstr in data.items():
+                for entry in self._index.get(msgid, []):
+                    self._set_msgstr(entry, msgstr)
         elif mode == PoFileModeEnum.APPEND:
             # APPEND模式用在提取项目国际化词条, 写入po, 以便翻译
-            # 如果是APPEND, 更新所有msgid匹配的数据, 并新增msgid不存在的数据
-            new_data = {}
-            for key, value in data.items():
-                if key.startswith("u"):
-                    key = key.lstrip("u")
-                if key.startswith('"'):
-                    key = key.lstrip('"')
-                if key.endswith('"'):
-                    key = key.rstrip('"')
-                new_data[key] = value
-            data = new_data
-            for entry in self._po:
-                if entry.msgid not in data or not data[entry.msgid]:
-                    continue
-                entry.msgstr = data[entry.msgid]
-            for msgid, msgstr in data.items():
-                if msgid not in self.msgid_list:
-                    self._po.append(polib.POEntry(msgid=msgid, msgstr=msgstr))
-            self._po.save()
-            return
+            self.append(data)
         else:
             # 如果是UPDATE, 更新现有msgstr为空的数据
-            for entry in self._po:
-                if entry.msgid not in data or entry.msgstr:
-                    continue
-                entry.msgstr = data[entry.msgid]
-                self._po.save()
+            for msgid, msgstr in data.items():
+                for entry in self._index.get(msgid, []):
+                    if entry.msgstr:
+                        continue
+                    self._set_msgstr(entry, msgstr)
+        return self.save()
 
-    def export(self, export_path: str):
-        try:
-            with open(export_path, "w", encoding="utf-8") as f:
-                json.dump(self.po_content_dict, f, ensure_ascii=False, indent=4)
-                f.close()
-            Prompt.info("Exported to {export_path}", export_path=export_path)
-        except Exception as e:
-            Prompt.panic("Failed to export: {e}", e=e)
+    def append(self, data: dict[str, str]):
+        """
+        更新所有msgid匹配的数据, 并新增msgid不存在的数据, 只修改内存中的po, 需要调用save写入
+        可以分批多次调用, 用于流式提取词条
+        """
+        self._load()
+        for key, value in data.items():
+            if key.startswith("u"):
+                key = key.lstrip("u")
+            if key.startswith('"'):
+                key = key.lstrip('"')
+            if key.endswith('"'):
+                key = key.rstrip('"')
+            entries = self._index.get(key)
+            if entries is None:
+                self._add(polib.POEntry(msgid=key, msgstr=value))
+                continue
+            if not value:
+                continue
+            for entry in entries:
+                self._set_msgstr(entry, value)
+
+    def merge(self, msgid: str, msgstr: str, msgctxt: str = None) -> typing.Optional[polib.POEntry]:
+        """
+        写回评审后的译文, 更新msgstr并去掉fuzzy标记, 只修改内存中的po, 需要调用save写入
+        :return: 匹配的条目, msgid/msgctxt不存在时返回None
+        """
+        entry = self.find(msgid, msgctxt)
+        if entry is None or entry.msgid_plural or not msgstr:
+            return entry
+        if entry.fuzzy:
+            entry.flags.remove("fuzzy")
+            if entry.msgstr == msgstr:
+                self._changed += 1
+        self._set_msgstr(entry, msgstr)
+        return entry
+
+    def save(self) -> int:
+        """
+        没有变更时不写入, 否则备份后序列化到临时文件, 再原子替换po文件
+        :return: 变更的条目数
+        """
+        changed = self._changed
+        if not changed:
+            Prompt.info("No changes to {po_file}", po_file=self.po_file_path)
+            return 0
+        self._backup()
+        with atomic_path(self.po_file_path, keep_mode=True) as tmp_file:
+            self._load().save(tmp_file)
+        self._changed = 0
+        Prompt.info("Saved {changed} changed entries to {po_file}", changed=changed, po_file=self.po_file_path)
+        return changed
 
 
-__all__ = ["PoUtil"]
+__all__ = ["PoUtil", "iter_po_records"]
@@ -0,0 +1,110 @@
+"""
+PO文件旁路缓存
+将PoReader解析出的条目以marshal格式保存在po文件旁(如: django.po.jinxcache), po文件未变化时直接加载, 无需重新解析
+"""
+import gc
+import marshal
+import os
+import typing
+
+from common.po_reader import PoReader, PoRecord
+from common.prompt import Prompt
+from common.utils import atomic_write, file_digest
+
+# 旁路缓存文件后缀
+SIDECAR_SUFFIX = ".jinxcache"
+# 缓存格式版本, PoRecord结构变化时需要递增, 2: 单独保存header
+SIDECAR_VERSION = 2
+
+
+def _to_columns(records: list[PoRecord]) -> tuple:
+    """按列存储, 复数译文只保存非空的条目"""
+    return (
+        [_r.msgid for _r in records],
+        [_r.msgstr for _r in records],
+        [_r.msgctxt for _r in records],
+        [_r.msgid_plural for _r in records],
+        {_i: _r.msgstr_plural for _i, _r in enumerate(records) if _r.msgstr_plural},
+        [_r.flags for _r in records],
+        [_r.obsolete for _r in records],
+        [_r.lineno for _r in records],
+    )
+
+
+def _from_columns(columns: tuple) -> list[PoRecord]:
+    msgids, msgstrs, msgctxts, msgid_plurals, plurals, flags, obsoletes, linenos = columns
+    msgstr_plurals = [plurals.get(_i) or {} for _i in range(len(msgids))]
+    # 批量创建大量对象时暂停gc, 避免反复触发分代回收
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return list(map(PoRecord, msgids, msgstrs, msgctxts, msgid_plurals, msgstr_plurals, flags, obsoletes, linenos))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+class PoSidecar:
+    """
+    PO文件旁路缓存
+    以po文件的mtime/大小/内容摘要作为key, mtime变化但内容不变时同样视为有效
+    :param po_file_path: po文件路径
+    """
+
+    def __init__(self, po_file_path: str):
+        self._po_fp = po_file_path
+        self._fp = po_file_path + SIDECAR_SUFFIX
+
+    def _load(self) -> typing.Optional[tuple[list[PoRecord], list[PoRecord]]]:
+        """加载有效的缓存, 返回(header, 其余条目), 缓存不存在/已损坏/已过期时返回None"""
+        try:
+            # marshal.load直接读文件对象很慢, 先整体读取再反序列化
+            with open(self._fp, "rb") as f:
+                data = marshal.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError):
+            Prompt.warning("Ignore broken po cache {fp}", fp=self._fp)
+            return None
+        if not isinstance(data, tuple) or len(data) != 6 or data[0] != SIDECAR_VERSION:
+            return None
+        __, mtime_ns, size, digest, header_columns, columns = data
+        stat = os.stat(self._po_fp)
+        if stat.st_size != size:
+            return None
+        if stat.st_mtime_ns != mtime_ns:
+            if file_digest(self._po_fp) != digest:
+                return None
+            # 内容未变化, 只刷新mtime
+            self._dump(stat.st_mtime_ns, size, digest, header_columns, columns)
+        return _from_columns(header_columns), _from_columns(columns)
+
+    def _dump(self, mtime_ns: int, size: int, digest: str, header_columns: tuple, columns: tuple):
+        """原子写入缓存, po文件所在目录不可写时跳过"""
+        try:
+            atomic_write(self._fp, marshal.dumps((SIDECAR_VERSION, mtime_ns, size, digest, header_columns, columns)))
+        except OSError as e:
+            Prompt.warning("Failed to write po cache {fp}: {e}", fp=self._fp, e=e)
+
+    def records(self, include_header: bool = False) -> list[PoRecord]:
+        """
+        缓存有效时直接加载, 否则重新解析po文件并更新缓存
+        :param include_header: 是否包括header条目, 包括时header排在最前面
+        """
+        loaded = self._load()
+        if loaded is None:
+            stat = os.stat(self._po_fp)
+            digest = file_digest(self._po_fp)
+            headers: list[PoRecord] = []
+            records: list[PoRecord] = []
+            for _record in PoReader(self._po_fp).iter_records(include_header=True):
+                (headers if _record.is_header else records).append(_record)
+            # 解析期间文件被修改时不写入缓存, 下次重新解析
+            if os.stat(self._po_fp).st_mtime_ns == stat.st_mtime_ns:
+                self._dump(stat.st_mtime_ns, stat.st_size, digest, _to_columns(headers), _to_columns(records))
+        else:
+            headers, records = loaded
+        return headers + records if include_header and headers else records
+
+
+__all__ = ["PoSidecar", "SIDECAR_SUFFIX"]
@@ -0,0 +1,228 @@
+"""
+快速PO读取器
+基于mmap逐行解析, 只生成轻量的PoRecord, 用于只读场景(导出/统计/筛选未翻译词条), 需要写入时再交给polib完整解析
+"""
+import codecs
+import io
+import mmap
+import os
+import re
+import typing
+from dataclasses import dataclass, field
+
+import polib
+
+# 与polib.detect_encoding保持一致
+_CHARSET_RE = re.compile(rb'"?Content-Type:.+? charset=([\w_\-:\.]+)')
+# 检测编码时读取的最大字节数, header一般在文件开头
+_CHARSET_SCAN_SIZE = 64 * 1024
+_DEFAULT_ENCODING = "utf-8"
+_PLURAL_RE = re.compile(r"msgstr\[(\d+)\]")
+
+
+class PoParseError(ValueError):
+    """PO文件格式错误"""
+
+    def __init__(self, path: str, lineno: int, line: str):
+        super().__init__(f"{path}:{lineno}: unexpected line {line!r}")
+
+
+@dataclass(slots=True)
+class PoRecord:
+    """
+    轻量的PO条目, 只包含翻译相关字段, 不包含注释和引用位置
+    :param msgid: 原文
+    :param msgstr: 译文
+    :param msgctxt: 上下文
+    :param msgid_plural: 复数原文
+    :param msgstr_plural: 复数译文, 下标 -> 译文
+    :param flags: 标记, 如fuzzy
+    :param obsolete: 是否为废弃条目(#~)
+    :param lineno: msgid所在行号
+    """
+
+    msgid: str = ""
+    msgstr: str = ""
+    msgctxt: typing.Optional[str] = None
+    msgid_plural: str = ""
+    msgstr_plural: dict[int, str] = field(default_factory=dict)
+    flags: tuple[str, ...] = ()
+    obsolete: bool = False
+    lineno: int = 0
+
+    @property
+    def fuzzy(self) -> bool:
+        return "fuzzy" in self.flags
+
+    @property
+    def translated(self) -> bool:
+        """与polib.POEntry.translated一致"""
+        if self.obsolete or self.fuzzy:
+            return False
+        if self.msgid_plural:
+            return bool(self.msgstr_plural) and all(self.msgstr_plural.values())
+        return self.msgstr != ""
+
+    @property
+    def is_header(self) -> bool:
+        return self.msgid == "" and self.msgctxt is None
+
+
+def detect_encoding(mm: typing.Union[mmap.mmap, bytes]) -> str:
+    """从header的Content-Type中检测编码"""
+    match = _CHARSET_RE.search(mm, 0, min(len(mm), _CHARSET_SCAN_SIZE))
+    if not match:
+        return _DEFAULT_ENCODING
+    encoding = match.group(1).decode("utf-8").strip()
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        return _DEFAULT_ENCODING
+    return encoding
+
+
+def _unquote(value: str) -> str:
+    """去掉引号并反转义, 没有转义字符时跳过正则替换"""
+    value = value[1:-1] if value[:1] == '"' else value.strip()[1:-1]
+    return polib.unescape(value) if "\\" in value else value
+
+
+# 条目各字段在片段列表中的下标
+_FIELDS = {"msgctxt": 0, "msgid": 1, "msgid_plural": 2, "msgstr": 3}
+
+
+def _join(parts: typing.Optional[list[str]]) -> str:
+    if not parts:
+        return ""
+    return parts[0] if len(parts) == 1 else "".join(parts)
+
+
+def _build_record(
+    fields: list[typing.Optional[list[str]]],
+    plurals: dict[int, list[str]],
+    flags: tuple[str, ...],
+    obsolete: bool,
+    lineno: int,
+) -> PoRecord:
+    return PoRecord(
+        _join(fields[1]),
+        _join(fields[3]),
+        None if fields[0] is None else _join(fields[0]),
+        _join(fields[2]),
+        {_i: _join(_parts) for _i, _parts in plurals.items()} if plurals else {},
+        flags,
+        obsolete,
+        lineno,
+    )
+
+
+class PoReader:
+    """
+    PO文件流式读取器
+    :param path: po文件路径
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> typing.Iterator[PoRecord]:
+        return self.iter_records()
+
+    def iter_records(
+        self, predicate: typing.Callable[[PoRecord], bool] = None, include_header: bool = False
+    ) -> typing.Generator[PoRecord, None, None]:
+        """
+        按文件顺序逐个产出条目
+        :param predicate: 过滤条件, 只产出满足条件的条目
+        :param include_header: 是否产出header条目(msgid为空)
+        """
+        if not os.path.getsize(self.path):
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            records = self._parse(iter(mm.readline, b""), detect_encoding(mm))
+            yield from self._filter(records, predicate, include_header)
+
+    def iter_content(
+        self, content: bytes, predicate: typing.Callable[[PoRecord], bool] = None, include_header: bool = False
+    ) -> typing.Generator[PoRecord, None, None]:
+        """解析内存中的po内容(如git历史版本), path只用于错误信息, 参数同iter_records"""
+        lines = iter(io.BytesIO(content).readline, b"")
+        yield from self._filter(self._parse(lines, detect_encoding(content)), predicate, include_header)
+
+    @staticmethod
+    def _filter(
+        records: typing.Iterable[PoRecord],
+        predicate: typing.Optional[typing.Callable[[PoRecord], bool]],
+        include_header: bool,
+    ) -> typing.Generator[PoRecord, None, None]:
+        for record in records:
+            if record.is_header and not include_header:
+                continue
+            if predicate is None or predicate(record):
+                yield record
+
+    def _parse(self, lines: typing.Iterable[bytes], encoding: str) -> typing.Generator[PoRecord, None, None]:
+        # 当前条目各字段的字符串片段, 条目结束时再拼接
+        fields: list[typing.Optional[list[str]]] = [None] * len(_FIELDS)
+        plurals: dict[int, list[str]] = {}
+        # 续行追加到的片段列表
+        parts: typing.Optional[list[str]] = None
+        # 当前条目是否已开始, 以及是否已出现msgstr, 再遇到msgid/msgctxt/注释时说明开始了新条目
+        started = has_msgstr = False
+        flags: list[str] = []
+        record_flags: tuple[str, ...] = ()
+        obsolete = False
+        msgid_lineno = 0
+        for lineno, raw in enumerate(lines, start=1):
+            line = raw.decode(encoding).strip()
+            if not line:
+                continue
+            is_obsolete = False
+            if line[0] == "#":
+                if line[1:2] != "~":
+                    if has_msgstr:
+                        yield _build_record(fields, plurals, record_flags, obsolete, msgid_lineno)
+                        fields, plurals, parts = [None] * len(_FIELDS), {}, None
+                        started = has_msgstr = False
+                    if line[1:2] == ",":
+                        flags.extend(_f.strip() for _f in line[2:].split(",") if _f.strip())
+                    continue
+                line = line[2:].lstrip()
+                if not line or line[0] in "|#":
+                    continue
+                is_obsolete = True
+            if line[0] == '"':
+                if parts is None:
+                    raise PoParseError(self.path, lineno, line)
+                parts.append(_unquote(line))
+                continue
+            keyword, __, value = line.partition(" ")
+            index = _FIELDS.get(keyword)
+            if index is None:
+                match = _PLURAL_RE.fullmatch(keyword)
+                if not match or not started:
+                    raise PoParseError(self.path, lineno, line)
+                parts = plurals[int(match.group(1))] = [_unquote(value)]
+                has_msgstr = True
+                continue
+            if index <= 1:
+                if has_msgstr:
+                    yield _build_record(fields, plurals, record_flags, obsolete, msgid_lineno)
+                    fields, plurals = [None] * len(_FIELDS), {}
+                    started = has_msgstr = False
+                if not started:
+                    started = True
+                    record_flags, obsolete = tuple(flags), is_obsolete
+                    flags = []
+                if index == 1:
+                    msgid_lineno = lineno
+            elif not started:
+                raise PoParseError(self.path, lineno, line)
+            elif index == 3:
+                has_msgstr = True
+            parts = fields[index] = [_unquote(value)]
+        if started:
+            yield _build_record(fields, plurals, record_flags, obsolete, msgid_lineno)
+
+
+__all__ = ["PoReader", "PoRecord", "PoParseError"]
@@ -0,0 +1,83 @@
+"""
+PO导出快照
+记录上次导出给评审的词条: 词条key的hash -> 译文hash, 保存在缓存目录下
+增量导出时只导出新增或译文有变化的词条, 导入时用于判断评审期间po文件中的译文是否被修改
+"""
+import hashlib
+import json
+import os
+import typing
+
+from common.config import cache
+from common.constants import EXPORT_SNAPSHOT_DIR
+from common.po_reader import PoRecord
+from common.prompt import Prompt
+from common.utils import atomic_write, content_digest
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def entry_key(msgid: str, msgctxt: typing.Optional[str] = None) -> str:
+    """词条key的hash, 与mo文件一致, 有上下文时为 msgctxt + EOT + msgid"""
+    return _digest(msgid if msgctxt is None else f"{msgctxt}\x04{msgid}")
+
+
+def translation_digest(msgstr: str, msgstr_plural: typing.Optional[dict[int, str]] = None, fuzzy: bool = False) -> str:
+    """译文的hash, 包括复数译文和fuzzy标记, 没有复数译文时与空dict一致"""
+    parts = [msgstr]
+    if msgstr_plural is not None:
+        parts.extend(msgstr_plural[_i] for _i in sorted(msgstr_plural))
+    if fuzzy:
+        parts.append("#, fuzzy")
+    return _digest("\0".join(parts))
+
+
+def record_digest(record: PoRecord) -> str:
+    return translation_digest(record.msgstr, record.msgstr_plural, record.fuzzy)
+
+
+class PoSnapshot:
+    """
+    PO导出快照
+    :param po_file_path: po文件路径
+    :param path: 缓存目录
+    """
+
+    def __init__(self, po_file_path: str, path: str = cache.path):
+        self._fp = os.path.join(
+            path, EXPORT_SNAPSHOT_DIR, f"{content_digest(os.path.abspath(po_file_path).encode('utf-8'))}.json"
+        )
+        self._entries: dict[str, str] = {}
+        if os.path.exists(self._fp):
+            try:
+                with open(self._fp, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except ValueError as e:
+                Prompt.warning("Ignore broken export snapshot {fp}: {e}", fp=self._fp, e=e)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, msgid: str, msgctxt: typing.Optional[str] = None) -> typing.Optional[str]:
+        """上次导出时的译文hash, 未导出过时返回None"""
+        return self._entries.get(entry_key(msgid, msgctxt))
+
+    def is_changed(self, record: PoRecord) -> bool:
+        """新增或译文有变化"""
+        return self.get(record.msgid, record.msgctxt) != record_digest(record)
+
+    def put(self, record: PoRecord):
+        self.set(record.msgid, record.msgctxt, record_digest(record))
+
+    def set(self, msgid: str, msgctxt: typing.Optional[str], digest: str):
+        self._entries[entry_key(msgid, msgctxt)] = digest
+
+    def save(self):
+        _dir = os.path.dirname(self._fp)
+        os.makedirs(_dir, exist_ok=True)
+        atomic_write(self._fp, json.dumps(self._entries, separators=(",", ":")), encoding="utf-8")
+
+
+__all__ = ["PoSnapshot", "entry_key", "translation_digest", "record_digest"]
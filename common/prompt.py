@@ -47,7 +47,7 @@ class Prompt:
         cls.fprint("error", msg, **kwargs)
 
     @classmethod
-    def panic(cls, msg: typing.Any, **kwargs):
+    def panic(cls, msg: typing.Any, **kwargs) -> typing.NoReturn:
         cls.fprint("panic", msg, **kwargs)
         sys.exit(1)
 
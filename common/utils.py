@@ -1,59 +1,89 @@
 """
 This file contains utility functions for the project.
 """
+import hashlib
 import json
-import json5
+import locale
+import mmap
 import os
+import shutil
 import typing
+import uuid
+from contextlib import contextmanager
 from importlib import import_module
 
+import json5
+
 from common.constants import DEFAULT_ENCODING, FILE_SUFFIX
+from common.walker import FileWalker
 
 
 def array_chunk(data: list[typing.Any], size=100):
     return [data[i : i + size] for i in range(0, len(data), size)]
 
 
-def is_sub_string(s: str, sub_string_list: list[typing.Any]) -> bool:
-    """
-    遍历字符串列表，判断字符串是否包含其中的字符串
-    """
-    for _s in sub_string_list:
-        if _s in s:
-            return True
-    return False
-
-
-def list_files(target_path: str, exclude_paths: list = None, exclude_files: list = None) -> list[str]:
-    """获取指定路径下所有后缀为suffix的文件"""
-    if not os.path.isdir(target_path):
-        return [target_path]
-    files = []
-    for root, __, file_names in os.walk(target_path):
-        if exclude_paths and is_sub_string(root, exclude_paths):
-            continue
-        for file_name in file_names:
-            if not file_name.endswith(FILE_SUFFIX):
-                continue
-            if exclude_files and is_sub_string(file_name, exclude_files):
-                continue
-            files.append(os.path.join(root, file_name))
-
-    return files
+def list_files(
+    target_path: str,
+    exclude_paths: list = None,
+    exclude_files: list = None,
+    respect_gitignore: bool = False,
+) -> list[str]:
+    """获取指定路径下所有后缀为FILE_SUFFIX的文件, 被过滤的目录不会进入"""
+    walker = FileWalker(
+        exclude_paths=exclude_paths,
+        exclude_files=exclude_files,
+        suffix=FILE_SUFFIX,
+        respect_gitignore=respect_gitignore,
+    )
+    return walker.walk(target_path)
+
+
+def filter_files(
+    target_path: str,
+    filepaths: typing.Iterable[str],
+    exclude_paths: list = None,
+    exclude_files: list = None,
+) -> list[str]:
+    """按与list_files相同的过滤规则筛选给定的文件列表"""
+    walker = FileWalker(exclude_paths=exclude_paths, exclude_files=exclude_files, suffix=FILE_SUFFIX)
+    return walker.filter(target_path, filepaths)
+
+
+def content_digest(content: typing.Union[bytes, mmap.mmap]) -> str:
+    """内容摘要, 用于判断文件内容是否发生变化, 支持直接传入mmap, 避免复制文件内容"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def file_digest(fp: str) -> str:
+    """文件内容摘要"""
+    return content_digest(read_bytes(fp))
+
+
+def decode_bytes(content: bytes, encoding: str = None) -> str:
+    """解码文件内容, 默认使用utf-8, 失败时回退到系统编码, 并统一换行符"""
+    try:
+        text = content.decode(encoding or DEFAULT_ENCODING)
+    except UnicodeDecodeError:
+        text = content.decode(locale.getpreferredencoding(False))
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_bytes(fp: str) -> bytes:
+    """以二进制形式读取文件"""
+    with open(fp, "rb") as f:
+        return f.read()
 
 
 def read_file(fp: str, encoding: str = None, is_json: bool = False):
     """读取文件"""
-    try:
-        with open(fp, encoding=DEFAULT_ENCODING) as f:
-            if is_json:
-                return json5.load(f)
-            return f.read()
-    except Exception:  # pylint: disable=broad-except
-        with open(fp, encoding=encoding) as f:
-            if is_json:
-                return json5.load(f)
-            return f.read()
+    text = decode_bytes(read_bytes(fp), encoding=encoding)
+    if is_json:
+        # 标准JSON直接用C实现的json解析, 只有包含注释/尾逗号等JSON5语法时才回退到json5
+        try:
+            return json.loads(text)
+        except ValueError:
+            return json5.loads(text)
+    return text
 
 
 def write_file(fp: str, contents: list = None, encoding: str = None):
@@ -61,12 +91,43 @@ def write_file(fp: str, contents: list = None, encoding: str = None):
     if not contents:
         return
     content = "\n".join(contents)
+    with open(fp, "w", encoding=encoding or DEFAULT_ENCODING) as f:
+        f.write(content)
+
+
+@contextmanager
+def atomic_path(fp: str, keep_mode: bool = False) -> typing.Generator[str, None, None]:
+    """
+    原子写入文件, 产出同目录下的临时文件路径, 调用方写入临时文件后原子替换fp, 写入失败时删除临时文件, fp保持不变
+    临时文件直接open创建, 新文件的权限与直接写入时一致
+    :param fp: 目标文件路径
+    :param keep_mode: 保留原文件权限
+    """
+    tmp_file = f"{fp}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_file, "xb"):
+        pass
     try:
-        with open(fp, "w", encoding=DEFAULT_ENCODING) as f:
-            f.write(content)
-    except Exception:  # pylint: disable=broad-except
-        with open(fp, "w", encoding=encoding) as f:
-            f.write(content)
+        yield tmp_file
+        if keep_mode and os.path.exists(fp):
+            shutil.copymode(fp, tmp_file)
+        os.replace(tmp_file, fp)
+    except BaseException:
+        try:
+            os.unlink(tmp_file)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write(fp: str, content: typing.Union[str, bytes], encoding: str = None, keep_mode: bool = False):
+    """原子写入文件内容, 参考atomic_path"""
+    with atomic_path(fp, keep_mode=keep_mode) as tmp_file:
+        if isinstance(content, bytes):
+            with open(tmp_file, "wb") as f:
+                f.write(content)
+        else:
+            with open(tmp_file, "w", encoding=encoding or DEFAULT_ENCODING) as f:
+                f.write(content)
 
 
 def import_string(dotted_path):
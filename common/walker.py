@@ -0,0 +1,323 @@
+"""
+文件遍历
+基于os.scandir, 在进入目录之前就剪枝被过滤的目录, 并发遍历顶层子目录
+"""
+import fnmatch
+import os
+import re
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from common.constants import DEFAULT_EXCLUDE_DIRS, FILE_SUFFIX, MAX_WORKERS
+
+GITIGNORE_FILE = ".gitignore"
+# 虚拟环境目录的标志文件
+VIRTUALENV_MARKER = "pyvenv.cfg"
+
+
+class PathPatterns:
+    """
+    路径过滤规则, 支持glob
+    不含"/"的规则匹配任意一级目录名或文件名, 如: migrations, test_*.py
+    含"/"的规则匹配相对于目标目录的路径, 如: app/legacy, */settings/*.py
+    """
+
+    def __init__(self, patterns: typing.Iterable[str] = None):
+        self._names: list[re.Pattern] = []
+        self._paths: list[re.Pattern] = []
+        for _p in patterns or []:
+            _p = _p.strip().strip("/")
+            if not _p:
+                continue
+            _regex = re.compile(fnmatch.translate(_p))
+            if "/" in _p:
+                self._paths.append(_regex)
+            else:
+                self._names.append(_regex)
+
+    def __bool__(self):
+        return bool(self._names or self._paths)
+
+    def match(self, name: str, rel_path: str) -> bool:
+        """
+        :param name: 文件名或目录名
+        :param rel_path: 相对于目标目录的路径, 使用"/"分隔
+        """
+        for _regex in self._names:
+            if _regex.match(name):
+                return True
+        for _regex in self._paths:
+            if _regex.match(rel_path):
+                return True
+        return False
+
+
+@dataclass(frozen=True)
+class GitIgnoreRule:
+    """
+    单条.gitignore规则
+    :param base: 规则所在目录, 相对于仓库根目录
+    :param regex: 匹配相对于base的路径
+    :param negate: 是否为!取反规则
+    :param dir_only: 是否只匹配目录
+    """
+
+    base: str
+    regex: re.Pattern
+    negate: bool = False
+    dir_only: bool = False
+
+    def match(self, rel_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return False
+            rel_path = rel_path[len(self.base) + 1 :]
+        return self.regex.match(rel_path) is not None
+
+
+def _translate_gitignore(pattern: str) -> str:
+    """将gitignore的glob转换为正则"""
+    i, n = 0, len(pattern)
+    regex = []
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif c == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif c == "?":
+            regex.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = pattern.find("]", i + 2)
+            if j == -1:
+                regex.append(re.escape(c))
+                i += 1
+                continue
+            _class = pattern[i + 1 : j].replace("\\", "\\\\")
+            if _class.startswith("!"):
+                _class = "^" + _class[1:]
+            regex.append(f"[{_class}]")
+            i = j + 1
+        elif c == "\\" and i + 1 < n:
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(c))
+            i += 1
+    return "".join(regex)
+
+
+def parse_gitignore(content: str, base: str = "") -> list[GitIgnoreRule]:
+    """
+    解析.gitignore内容
+    :param content: 文件内容
+    :param base: .gitignore所在目录, 相对于仓库根目录
+    """
+    rules = []
+    for line in content.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # 含"/"的规则相对于.gitignore所在目录, 否则匹配任意层级
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        regex = re.compile(f"{prefix}{_translate_gitignore(line)}$", re.DOTALL)
+        rules.append(GitIgnoreRule(base=base, regex=regex, negate=negate, dir_only=dir_only))
+    return rules
+
+
+def _read_gitignore(directory: str, base: str) -> list[GitIgnoreRule]:
+    _fp = os.path.join(directory, GITIGNORE_FILE)
+    if not os.path.isfile(_fp):
+        return []
+    with open(_fp, encoding="utf-8", errors="ignore") as f:
+        return parse_gitignore(f.read(), base=base)
+
+
+def is_ignored(rules: typing.Sequence[GitIgnoreRule], rel_path: str, is_dir: bool) -> bool:
+    """按顺序匹配, 最后一条命中的规则生效"""
+    ignored = False
+    for _rule in rules:
+        if _rule.negate == ignored and _rule.match(rel_path, is_dir):
+            ignored = not _rule.negate
+    return ignored
+
+
+def find_git_root(path: str) -> typing.Optional[str]:
+    """向上查找git仓库根目录"""
+    current = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _join(rel_path: str, name: str) -> str:
+    return f"{rel_path}/{name}" if rel_path else name
+
+
+@dataclass(frozen=True)
+class _Directory:
+    """
+    待遍历的目录
+    :param path: 目录路径, 以目标目录为前缀
+    :param rel_path: 相对于目标目录的路径
+    :param git_path: 相对于git仓库根目录的路径
+    :param rules: 对该目录生效的gitignore规则
+    """
+
+    path: str
+    rel_path: str
+    git_path: str
+    rules: tuple[GitIgnoreRule, ...] = ()
+
+
+class FileWalker:
+    """
+    文件遍历器
+    :param exclude_paths: 过滤目录, 命中的目录不会进入
+    :param exclude_files: 过滤文件
+    :param suffix: 文件后缀
+    :param respect_gitignore: 是否遵循.gitignore
+    :param workers: 并发遍历顶层子目录的线程数
+    """
+
+    def __init__(
+        self,
+        exclude_paths: list[str] = None,
+        exclude_files: list[str] = None,
+        suffix: str = FILE_SUFFIX,
+        respect_gitignore: bool = False,
+        workers: int = MAX_WORKERS,
+    ):
+        self._exclude_paths = PathPatterns(exclude_paths)
+        self._exclude_files = PathPatterns(exclude_files)
+        self._suffix = suffix
+        self._respect_gitignore = respect_gitignore
+        self._workers = workers
+
+    def is_excluded_file(self, name: str, rel_path: str) -> bool:
+        """文件是否被过滤, rel_path为相对于目标目录的路径"""
+        return not name.endswith(self._suffix) or self._exclude_files.match(name, rel_path)
+
+    def is_excluded_path(self, name: str, rel_path: str) -> bool:
+        """目录是否被过滤"""
+        return name in DEFAULT_EXCLUDE_DIRS or self._exclude_paths.match(name, rel_path)
+
+    def _root(self, target_path: str) -> _Directory:
+        """目标目录, gitignore需要加载目标目录到仓库根目录之间的所有规则"""
+        if not self._respect_gitignore:
+            return _Directory(path=target_path, rel_path="", git_path="")
+        git_root = find_git_root(target_path) or os.path.abspath(target_path)
+        git_path = os.path.relpath(os.path.abspath(target_path), git_root).replace(os.sep, "/")
+        git_path = "" if git_path == "." else git_path
+        rules: list[GitIgnoreRule] = []
+        current, base = git_root, ""
+        for _part in git_path.split("/") if git_path else []:
+            rules.extend(_read_gitignore(current, base))
+            current, base = os.path.join(current, _part), _join(base, _part)
+        rules.extend(_read_gitignore(current, base))
+        return _Directory(path=target_path, rel_path="", git_path=git_path, rules=tuple(rules))
+
+    def _scan_dir(self, directory: _Directory) -> tuple[list[str], list[_Directory]]:
+        """扫描单个目录, 返回符合条件的文件以及需要继续遍历的子目录"""
+        files: list[str] = []
+        dirs: list[_Directory] = []
+        try:
+            with os.scandir(directory.path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return files, dirs
+        for entry in entries:
+            rel_path = _join(directory.rel_path, entry.name)
+            git_path = _join(directory.git_path, entry.name)
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                # 与os.walk保持一致, 不进入软链接目录
+                if entry.is_symlink() or self.is_excluded_path(entry.name, rel_path):
+                    continue
+                if os.path.exists(os.path.join(entry.path, VIRTUALENV_MARKER)):
+                    continue
+                if directory.rules and is_ignored(directory.rules, git_path, True):
+                    continue
+                rules = directory.rules
+                if self._respect_gitignore:
+                    rules = rules + tuple(_read_gitignore(entry.path, git_path))
+                dirs.append(_Directory(path=entry.path, rel_path=rel_path, git_path=git_path, rules=rules))
+                continue
+            if self.is_excluded_file(entry.name, rel_path):
+                continue
+            if directory.rules and is_ignored(directory.rules, git_path, False):
+                continue
+            files.append(entry.path)
+        return files, dirs
+
+    def _walk_tree(self, directory: _Directory) -> list[str]:
+        """深度优先遍历子树"""
+        files: list[str] = []
+        stack = [directory]
+        while stack:
+            _files, _dirs = self._scan_dir(stack.pop())
+            files.extend(_files)
+            stack.extend(reversed(_dirs))
+        return files
+
+    def walk(self, target_path: str) -> list[str]:
+        """获取目标目录下所有符合条件的文件, 目标为文件时直接返回"""
+        if not os.path.isdir(target_path):
+            return [target_path]
+        files, dirs = self._scan_dir(self._root(target_path))
+        if self._workers <= 1 or len(dirs) <= 1:
+            for _dir in dirs:
+                files.extend(self._walk_tree(_dir))
+            return files
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            for _files in executor.map(self._walk_tree, dirs):
+                files.extend(_files)
+        return files
+
+    def filter(self, target_path: str, filepaths: typing.Iterable[str]) -> list[str]:
+        """
+        按过滤规则筛选给定的文件列表, 如git变更的文件
+        只保留目标目录下存在的文件, 路径中任意一级目录被过滤时, 该文件同样被过滤
+        """
+        target = os.path.realpath(target_path)
+        if not os.path.isdir(target):
+            return [target_path] if target in {os.path.realpath(_fp) for _fp in filepaths} else []
+        files = []
+        for _fp in filepaths:
+            rel_path = os.path.relpath(os.path.realpath(_fp), target).replace(os.sep, "/")
+            if rel_path.startswith("../") or not os.path.isfile(_fp):
+                continue
+            parts = rel_path.split("/")
+            if self.is_excluded_file(parts[-1], rel_path):
+                continue
+            if any(self.is_excluded_path(_name, "/".join(parts[: i + 1])) for i, _name in enumerate(parts[:-1])):
+                continue
+            files.append(os.path.join(target_path, *parts))
+        return sorted(files)
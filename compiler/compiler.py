@@ -1,7 +1,101 @@
+import json
 import os
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 
-from common import PoUtil, Prompt
-from common.config import language
+from rich.table import Table
+
+from common import Prompt
+from common.config import cache
+from common.constants import COMPILER_MANIFEST_FILE, MAX_WORKERS, CompileStatusEnum
+from common.path import check_exist, require_path, resolve_po_file
+from common.utils import atomic_path, atomic_write, file_digest
+from common.walker import FileWalker
+from compiler.mo import write_mo
+
+# po文件所在目录名
+LC_MESSAGES = "LC_MESSAGES"
+
+
+@dataclass
+class CompileResult:
+    """
+    单个po文件的编译结果
+    :param po_file: po文件路径
+    :param mo_file: mo文件路径
+    :param status: 编译结果, 参考CompileStatusEnum
+    :param po_digest: 编译时po文件的内容摘要
+    :param mo_digest: 编译生成的mo文件的内容摘要
+    :param error: 失败原因
+    """
+
+    po_file: str
+    mo_file: str
+    status: str
+    po_digest: str = ""
+    mo_digest: str = ""
+    error: str = ""
+
+
+def mo_file_path(po_file: str) -> str:
+    return os.path.splitext(po_file)[0] + ".mo"
+
+
+def find_po_files(root: str) -> list[str]:
+    """查找root下所有LC_MESSAGES/*.po"""
+    files = FileWalker(suffix=".po").walk(root)
+    return sorted(_f for _f in files if os.path.basename(os.path.dirname(_f)) == LC_MESSAGES)
+
+
+def compile_catalog(po_file: str) -> CompileResult:
+    """编译单个po文件, 先写入临时文件再原子替换, 作为多进程模式下worker的执行单元"""
+    mo_file = mo_file_path(po_file)
+    try:
+        po_digest = file_digest(po_file)
+        # 编译失败时保留原mo文件
+        with atomic_path(mo_file) as tmp_file:
+            write_mo(po_file, tmp_file)
+    except Exception as e:  # pylint: disable=broad-except
+        return CompileResult(po_file=po_file, mo_file=mo_file, status=CompileStatusEnum.FAILED, error=str(e))
+    return CompileResult(
+        po_file=po_file,
+        mo_file=mo_file,
+        status=CompileStatusEnum.COMPILED,
+        po_digest=po_digest,
+        mo_digest=file_digest(mo_file),
+    )
+
+
+class CompileManifest:
+    """
+    编译清单, 记录每个po文件上次编译时po/mo的内容摘要
+    po文件的mtime比mo新但内容未变化(如git checkout)时, 通过摘要判断无需重新编译
+    :param path: 缓存目录
+    """
+
+    def __init__(self, path: str = cache.path):
+        self._fp = os.path.join(path, COMPILER_MANIFEST_FILE)
+        self._records: typing.Dict[str, dict] = {}
+        if os.path.exists(self._fp):
+            try:
+                with open(self._fp, encoding="utf-8") as f:
+                    self._records = json.load(f)
+            except ValueError as e:
+                Prompt.warning("Ignore broken compiler manifest {fp}: {e}", fp=self._fp, e=e)
+
+    def is_up_to_date(self, po_file: str, mo_file: str) -> bool:
+        _record = self._records.get(os.path.abspath(po_file))
+        if not _record:
+            return False
+        return file_digest(po_file) == _record["po_digest"] and file_digest(mo_file) == _record["mo_digest"]
+
+    def put(self, result: CompileResult):
+        self._records[os.path.abspath(result.po_file)] = {"po_digest": result.po_digest, "mo_digest": result.mo_digest}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self._fp), exist_ok=True)
+        atomic_write(self._fp, json.dumps(self._records, ensure_ascii=False, indent=4), encoding="utf-8")
 
 
 class CompileTool:
@@ -13,32 +107,77 @@ class CompileTool:
     且django-admin/python manage.py shell compilemessages 这种形式依赖导入项目的环境变量, 会变得额外繁琐
 
     所以提供了这个工具, 用于编译po->mo
+    :param locale_path: Django locale目录, 也可以是po文件路径; all_catalogs为True时为查找po文件的根目录
+    :param all_catalogs: 编译根目录下所有LC_MESSAGES/*.po
+    :param jobs: 并行进程数, 1为单进程, 0为自动(MAX_WORKERS)
+    :param force: 忽略mo文件是否最新, 全部重新编译
     """
 
-    def __init__(self, locale_path: str = None):
-        self.locale_path = locale_path
-        self._init_po()
+    def __init__(self, locale_path: str = None, all_catalogs: bool = False, jobs: int = 1, force: bool = False):
+        self.locale_path = require_path(locale_path)
+        self._all_catalogs = all_catalogs
+        self._jobs = jobs if jobs > 0 else MAX_WORKERS
+        self._force = force
+        self._manifest = CompileManifest() if cache.enabled else None
+
+    @property
+    def po_files(self) -> list[str]:
+        if self._all_catalogs:
+            return find_po_files(self.locale_path)
+        po_file = resolve_po_file(self.locale_path)
+        check_exist(po_file)
+        return [po_file]
 
-    def _init_po(self):
-        """初始化po文件"""
-        if self.locale_path.endswith(".po"):
-            po_file = self.locale_path
-        else:
-            po_file = os.path.join(self.locale_path, language.dest, "LC_MESSAGES", "django.po")
-        self.po_file = PoUtil(po_file)
+    def _is_up_to_date(self, po_file: str) -> bool:
+        """mo文件比po文件新, 或者po/mo与上次编译时的内容摘要一致"""
+        mo_file = mo_file_path(po_file)
+        if not os.path.exists(mo_file):
+            return False
+        if os.stat(mo_file).st_mtime_ns >= os.stat(po_file).st_mtime_ns:
+            return True
+        return self._manifest is not None and self._manifest.is_up_to_date(po_file, mo_file)
+
+    def _compile(self, po_files: list[str]) -> typing.Generator[CompileResult, None, None]:
+        """逐个产出编译结果, 单进程顺序执行, 多进程交给进程池"""
+        if self._jobs <= 1 or len(po_files) <= 1:
+            yield from map(compile_catalog, po_files)
+            return
+        with ProcessPoolExecutor(max_workers=self._jobs) as executor:
+            yield from executor.map(compile_catalog, po_files)
 
     def handle(self):
         """编译po文件"""
-        mo_file_path = self.po_file.po_file_path.replace(".po", ".mo")
-        try:
-            self.po_file.po.save_as_mofile(mo_file_path)
+        po_files = self.po_files
+        pending = [_f for _f in po_files if self._force or not self._is_up_to_date(_f)]
+        summary = {
+            CompileStatusEnum.COMPILED: 0,
+            CompileStatusEnum.SKIPPED: len(po_files) - len(pending),
+            CompileStatusEnum.FAILED: 0,
+        }
+        for _result in self._compile(pending):
+            summary[_result.status] += 1
+            if _result.status == CompileStatusEnum.FAILED:
+                Prompt.error(
+                    "Failed to compile {po_file} to {mo_file}, {e}",
+                    po_file=_result.po_file,
+                    mo_file=_result.mo_file,
+                    e=_result.error,
+                )
+                continue
             Prompt.info(
-                "Successfully compiled {po_file} to {mo_file}", po_file=self.po_file.po_file_path, mo_file=mo_file_path
-            )
-        except Exception as e:
-            Prompt.error(
-                "Failed to compile {po_file} to {mo_file}, {e}",
-                po_file=self.po_file.po_file_path,
-                mo_file=mo_file_path,
-                e=e,
+                "Successfully compiled {po_file} to {mo_file}", po_file=_result.po_file, mo_file=_result.mo_file
             )
+            if self._manifest:
+                self._manifest.put(_result)
+        if self._manifest and summary[CompileStatusEnum.COMPILED]:
+            self._manifest.save()
+        self._print_summary(summary)
+
+    @staticmethod
+    def _print_summary(summary: dict[str, int]):
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("Status")
+        table.add_column("Catalogs", justify="right")
+        for _status, _count in summary.items():
+            table.add_row(_status, str(_count))
+        Prompt.print(table)
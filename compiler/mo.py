@@ -0,0 +1,168 @@
+"""
+MO文件编译
+按GNU msgfmt的格式输出: 按原文排序的字符串表 + 用于运行时O(1)查找的hash表
+polib.save_as_mofile不生成hash表, gettext运行时(libintl)只能对每次查找做二分搜索
+"""
+import codecs
+import re
+import struct
+import typing
+from array import array
+
+from common.po import iter_po_records
+from common.po_reader import PoRecord
+
+# MO文件魔数及格式版本
+MO_MAGIC = 0x950412DE
+MO_REVISION = 0
+# 文件头: 魔数/版本/条目数/原文表偏移/译文表偏移/hash表大小/hash表偏移
+_HEADER = struct.Struct("=7I")
+# msgctxt与msgid之间的分隔符
+CONTEXT_SEPARATOR = b"\x04"
+_CHARSET_RE = re.compile(r"charset=([\w_\-:\.]+)")
+_DEFAULT_CHARSET = "utf-8"
+
+
+def hash_string(key: bytes) -> int:
+    """
+    gettext的hashpjw算法(hash-string.c), 结果为32位无符号整数
+    C实现中hval为unsigned long, 进位到32位以上的部分不影响低32位, 最终截断为nls_uint32, 这里每步截断与其等价
+    """
+    hval = 0
+    for _c in key:
+        hval = ((hval << 4) + _c) & 0xFFFFFFFF
+        g = hval & 0xF0000000
+        if g:
+            hval ^= g >> 24
+            hval ^= g
+    return hval
+
+
+def _is_prime(candidate: int) -> bool:
+    """
+    gettext的is_prime(hash.c), 只检查3及以上的奇数因子
+    与数学意义的质数判断不同: 3被3整除, 判定为非质数; 1判定为质数, hash表大小需与msgfmt逐字节一致
+    """
+    divn = 3
+    sq = divn * divn
+    while sq < candidate and candidate % divn != 0:
+        divn += 1
+        sq += 4 * divn
+        divn += 1
+    return candidate % divn != 0
+
+
+def next_prime(seed: int) -> int:
+    """gettext的next_prime(hash.c): 从seed起(取奇数)第一个满足_is_prime的数"""
+    seed |= 1
+    while not _is_prime(seed):
+        seed += 2
+    return seed
+
+
+def hash_table_size(count: int) -> int:
+    """与msgfmt(write-mo.c)一致: next_prime(count * 4 / 3), 不大于2时取3"""
+    size = next_prime(count * 4 // 3)
+    return 3 if size <= 2 else size
+
+
+def catalog_charset(header: str) -> str:
+    """从header的Content-Type中获取编码, 未声明或无法识别时使用utf-8"""
+    match = _CHARSET_RE.search(header)
+    if not match:
+        return _DEFAULT_CHARSET
+    try:
+        codecs.lookup(match.group(1))
+    except LookupError:
+        return _DEFAULT_CHARSET
+    return match.group(1)
+
+
+def _is_compiled(record: PoRecord) -> bool:
+    """与msgfmt一致: 跳过废弃/未翻译条目, 以及除header外的fuzzy条目"""
+    if record.obsolete:
+        return False
+    if record.fuzzy and not record.is_header:
+        return False
+    if record.msgid_plural:
+        return bool(record.msgstr_plural.get(0))
+    return record.msgstr != ""
+
+
+def _encode(record: PoRecord, charset: str) -> tuple[bytes, bytes]:
+    """条目的原文/译文, 复数形式以NUL分隔, 有上下文时原文为 msgctxt + EOT + msgid"""
+    msgid = record.msgid.encode(charset)
+    if record.msgctxt is not None:
+        msgid = record.msgctxt.encode(charset) + CONTEXT_SEPARATOR + msgid
+    if not record.msgid_plural:
+        return msgid, record.msgstr.encode(charset)
+    msgid += b"\0" + record.msgid_plural.encode(charset)
+    msgstr = "\0".join(record.msgstr_plural[_i] for _i in sorted(record.msgstr_plural))
+    return msgid, msgstr.encode(charset)
+
+
+def build_mo(records: typing.Iterable[PoRecord]) -> bytes:
+    """
+    生成MO文件内容
+    :param records: po条目, 需要包括header, 编码取自header的charset
+    """
+    messages: dict[bytes, bytes] = {}
+    charset = _DEFAULT_CHARSET
+    for _record in records:
+        if not _is_compiled(_record):
+            continue
+        if _record.is_header:
+            charset = catalog_charset(_record.msgstr)
+        msgid, msgstr = _encode(_record, charset)
+        messages[msgid] = msgstr
+    keys = sorted(messages)
+    count = len(keys)
+    hash_size = hash_table_size(count)
+
+    # 计算hash表, 冲突时使用二次hash的步长探测, 与libintl的查找逻辑对应
+    hash_table = array("I", bytes(4 * hash_size))
+    for _i, _key in enumerate(keys):
+        # 复数条目只对msgid部分计算hash
+        hval = hash_string(_key.split(b"\0", 1)[0])
+        idx = hval % hash_size
+        if hash_table[idx]:
+            incr = 1 + hval % (hash_size - 2)
+            while hash_table[idx]:
+                idx = idx - (hash_size - incr) if idx >= hash_size - incr else idx + incr
+        hash_table[idx] = _i + 1
+
+    # 布局: 文件头 | 原文表 | 译文表 | hash表 | 原文字符串 | 译文字符串
+    orig_table_offset = _HEADER.size
+    trans_table_offset = orig_table_offset + 8 * count
+    hash_table_offset = trans_table_offset + 8 * count
+    offset = hash_table_offset + 4 * hash_size
+    orig_table, trans_table = array("I"), array("I")
+    for _table, _strings in ((orig_table, keys), (trans_table, [messages[_k] for _k in keys])):
+        for _s in _strings:
+            _table.append(len(_s))
+            _table.append(offset)
+            offset += len(_s) + 1
+    return b"".join(
+        (
+            _HEADER.pack(
+                MO_MAGIC, MO_REVISION, count, orig_table_offset, trans_table_offset, hash_size, hash_table_offset
+            ),
+            orig_table.tobytes(),
+            trans_table.tobytes(),
+            hash_table.tobytes(),
+            b"\0".join(keys),
+            b"\0" if keys else b"",
+            b"\0".join(messages[_k] for _k in keys),
+            b"\0" if keys else b"",
+        )
+    )
+
+
+def write_mo(po_file: str, mo_file: str):
+    """将po文件编译为mo文件, 开启po.sidecar_cache时从旁路缓存读取条目"""
+    content = build_mo(iter_po_records(po_file, include_header=True))
+    with open(mo_file, "wb") as f:
+        f.write(content)
+
+
+__all__ = ["build_mo", "write_mo", "hash_string", "hash_table_size"]
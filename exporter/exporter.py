@@ -1,29 +1,81 @@
-import os
+import typing
 
-from common.config import language
+from common import Prompt
+from common.constants import ExportFormatEnum
+from common.git import show_file
+from common.path import require_path, resolve_po_file
 from common.po import PoUtil
+from common.po_reader import PoRecord
+from common.po_snapshot import PoSnapshot, entry_key, record_digest
+from exporter.formats import WRITERS
 
 
 class ExportTool:
     """
-    提取工具
+    导出工具, 逐条流式写入, 不在内存中保留全部词条
+    多个过滤条件同时生效; untranslated_only和fuzzy_only同时开启时, 导出未翻译或fuzzy的词条
     :param locale_path: Django locale目录, 也可以是po文件路径
     :param export_path: 导出路径
+    :param export_format: 导出格式, 参考ExportFormatEnum, 不传时根据export_path后缀判断, 默认为json
+    :param untranslated_only: 只导出未翻译的词条
+    :param fuzzy_only: 只导出标记为fuzzy的词条
+    :param changed_since: git ref, 只导出相对该ref新增或译文有变化的词条
+    :param delta: 只导出相对上次导出新增或译文有变化的词条, 导出后更新导出快照
     """
 
-    def __init__(self, locale_path: str = None, export_path: str = "contents.json"):
-        """ """
+    def __init__(
+        self,
+        locale_path: str = None,
+        export_path: str = "contents.json",
+        export_format: str = None,
+        untranslated_only: bool = False,
+        fuzzy_only: bool = False,
+        changed_since: str = None,
+        delta: bool = False,
+    ):
         self.locale_path = locale_path
-        self._init_po()
+        self.po_file = PoUtil(resolve_po_file(require_path(locale_path)))
         self.export_path = export_path
+        self.export_format = export_format or ExportFormatEnum.from_path(export_path)
+        ExportFormatEnum.check_member(self.export_format)
+        self._untranslated_only = untranslated_only
+        self._fuzzy_only = fuzzy_only
+        self._changed_since = changed_since
+        self._snapshot = PoSnapshot(self.po_file.po_file_path) if delta else None
 
-    def _init_po(self):
-        """初始化po文件"""
-        if self.locale_path.endswith(".po"):
-            po_file = self.locale_path
-        else:
-            po_file = os.path.join(self.locale_path, language.dest, "LC_MESSAGES", "django.po")
-        self.po_file = PoUtil(po_file)
+    def _predicate(self) -> typing.Callable[[PoRecord], bool]:
+        """组合过滤条件, 始终跳过废弃条目"""
+        conditions: list[typing.Callable[[PoRecord], bool]] = [lambda r: not r.obsolete]
+        if self._untranslated_only or self._fuzzy_only:
+            untranslated_only, fuzzy_only = self._untranslated_only, self._fuzzy_only
+            conditions.append(
+                lambda r: (untranslated_only and not r.fuzzy and not r.translated) or (fuzzy_only and r.fuzzy)
+            )
+        if self._changed_since:
+            # 只保留旧版本译文的hash, 不保留旧版本条目
+            content = show_file(self.po_file.po_file_path, self._changed_since)
+            previous = {
+                entry_key(_r.msgid, _r.msgctxt): record_digest(_r) for _r in self.po_file.reader.iter_content(content)
+            }
+            conditions.append(lambda r: previous.get(entry_key(r.msgid, r.msgctxt)) != record_digest(r))
+        if self._snapshot is not None:
+            conditions.append(self._snapshot.is_changed)
+        return lambda r: all(_c(r) for _c in conditions)
 
     def handle(self):
-        self.po_file.export(self.export_path)
+        predicate = self._predicate()
+        try:
+            with open(self.export_path, "w", encoding="utf-8", newline="") as f:
+                writer = WRITERS[self.export_format](f)
+                writer.begin()
+                for _record in self.po_file.records(predicate):
+                    writer.write(_record)
+                    if self._snapshot is not None:
+                        self._snapshot.put(_record)
+                writer.end()
+        except OSError as e:
+            Prompt.panic("Failed to export: {e}", e=e)
+        # 导出成功后才更新快照, 失败时下次重新导出
+        if self._snapshot is not None and writer.count:
+            self._snapshot.save()
+        Prompt.info("Exported {count} entries to {export_path}", count=writer.count, export_path=self.export_path)
@@ -0,0 +1,97 @@
+"""
+导出格式
+各格式的writer逐条写入, 不在内存中保留全部词条
+"""
+import csv
+import json
+import typing
+
+from common.constants import MSGCTXT_SEPARATOR, ExportFormatEnum
+from common.po_reader import PoRecord
+
+# JSONL/CSV导出的字段
+EXPORT_FIELDS = ("msgctxt", "msgid", "msgstr", "fuzzy")
+
+
+class ExportWriter:
+    """
+    导出writer基类
+    :param f: 以文本模式打开的文件对象
+    """
+
+    def __init__(self, f: typing.TextIO):
+        self._f = f
+        self.count = 0
+
+    def begin(self):
+        """写入文件头"""
+
+    def write(self, record: PoRecord):
+        self._write(record)
+        self.count += 1
+
+    def _write(self, record: PoRecord):
+        raise NotImplementedError
+
+    def end(self):
+        """写入文件尾"""
+
+
+def json_key(msgid: str, msgctxt: typing.Optional[str] = None) -> str:
+    """JSON导出的键, 有msgctxt时为"msgctxt\\x04msgid", 与gettext一致, 避免不同上下文的同一msgid互相覆盖"""
+    return msgid if msgctxt is None else f"{msgctxt}{MSGCTXT_SEPARATOR}{msgid}"
+
+
+class JsonWriter(ExportWriter):
+    """
+    JSON对象, msgid -> msgstr, 与官方词典格式一致, 可以直接作为translator的-o参数
+    有msgctxt的词条键为"msgctxt\\x04msgid", 参考json_key
+    """
+
+    def begin(self):
+        self._f.write("{")
+
+    def _write(self, record: PoRecord):
+        self._f.write(",\n    " if self.count else "\n    ")
+        self._f.write(json.dumps(json_key(record.msgid, record.msgctxt), ensure_ascii=False))
+        self._f.write(": ")
+        self._f.write(json.dumps(record.msgstr, ensure_ascii=False))
+
+    def end(self):
+        self._f.write("\n}\n" if self.count else "}\n")
+
+
+class JsonlWriter(ExportWriter):
+    """每行一个JSON对象, 包含EXPORT_FIELDS"""
+
+    def _write(self, record: PoRecord):
+        self._f.write(json.dumps(dict(zip(EXPORT_FIELDS, _row(record))), ensure_ascii=False))
+        self._f.write("\n")
+
+
+class CsvWriter(ExportWriter):
+    """CSV, 第一行为EXPORT_FIELDS"""
+
+    def __init__(self, f: typing.TextIO):
+        super().__init__(f)
+        self._writer = csv.writer(f)
+
+    def begin(self):
+        self._writer.writerow(EXPORT_FIELDS)
+
+    def _write(self, record: PoRecord):
+        self._writer.writerow(_row(record))
+
+
+def _row(record: PoRecord) -> tuple:
+    return record.msgctxt, record.msgid, record.msgstr, record.fuzzy
+
+
+WRITERS: dict[str, typing.Type[ExportWriter]] = {
+    ExportFormatEnum.JSON: JsonWriter,
+    ExportFormatEnum.JSONL: JsonlWriter,
+    ExportFormatEnum.CSV: CsvWriter,
+}
+
+
+__all__ = ["ExportWriter", "WRITERS", "EXPORT_FIELDS", "json_key"]
@@ -3,9 +3,8 @@ import typing
 
 from common import PoUtil, Prompt
 from common.config import language
-from common.constants import PoFileModeEnum
+from common.constants import EXTRACT_BATCH_SIZE
 from marker import MarkerTool
-from marker.utils.token import Token
 
 
 class ExtractTool:
@@ -19,10 +18,17 @@ class ExtractTool:
     所以提供了这个工具, 用于提取token到po文件里
     """
 
-    def __init__(self, target_path: str = None, locale_path: str = None):
+    def __init__(
+        self,
+        target_path: str = None,
+        locale_path: str = None,
+        jobs: int = 1,
+        since: str = None,
+        changed_only: bool = False,
+    ):
         self.target_path = target_path
         self.locale_path = locale_path
-        self.tokens: typing.List[Token] = MarkerTool(target_path).tokens
+        self.marker = MarkerTool(target_path, jobs=jobs, since=since, changed_only=changed_only)
         self._init_po()
 
     def _init_po(self):
@@ -33,10 +39,27 @@ class ExtractTool:
             po_file = os.path.join(self.locale_path, language.dest, "LC_MESSAGES", "django.po")
         self.po_file = PoUtil(po_file)
 
+    def _iter_batches(self) -> typing.Generator[dict[str, str], None, None]:
+        """逐个文件消费marker提取的token, 增量去重后按批产出新词条"""
+        seen = set()
+        batch = {}
+        for _tokens in self.marker.iter_tokens():
+            for _text in _tokens.texts():
+                if _text in seen:
+                    continue
+                seen.add(_text)
+                batch[_text] = ""
+            if len(batch) >= EXTRACT_BATCH_SIZE:
+                yield batch
+                batch = {}
+        if batch:
+            yield batch
+
     def handle(self):
-        data = {token.token: "" for token in self.tokens}
         try:
-            self.po_file.write(data=data, mode=PoFileModeEnum.APPEND)
+            for _batch in self._iter_batches():
+                self.po_file.append(_batch)
+            self.po_file.save()
             Prompt.info("Extract tokens to {po_file} successfully", po_file=self.po_file.po_file_path)
         except Exception as e:
             Prompt.error("Failed to extract tokens to {po_file}: {e}", po_file=self.po_file.po_file_path, e=e)
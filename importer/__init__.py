@@ -0,0 +1,3 @@
+from importer.importer import ImportTool
+
+__all__ = ["ImportTool"]
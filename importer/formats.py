@@ -0,0 +1,140 @@
+"""
+导入格式, 与exporter导出的格式对应
+"""
+import csv
+import json
+import typing
+
+from common.constants import MSGCTXT_SEPARATOR, ExportFormatEnum
+
+
+class ReviewedEntry(typing.NamedTuple):
+    """评审后的词条"""
+
+    msgid: str
+    msgstr: str
+    msgctxt: typing.Optional[str] = None
+
+
+# 流式解析JSON时每次读取的字符数
+JSON_CHUNK_SIZE = 1 << 20
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+def iter_json_object(f: typing.TextIO, chunk_size: int = JSON_CHUNK_SIZE) -> typing.Iterator[tuple[str, typing.Any]]:
+    """
+    流式解析顶层JSON对象, 逐个产出键值对, 只在内存中保留一个读取块
+    每个键/值用json.JSONDecoder.raw_decode解析, 读取块末尾的值不完整时再读取下一块
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def _fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+        return not eof
+
+    def _skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not _fill():
+                return
+
+    def _expect(chars: str) -> str:
+        nonlocal pos
+        _skip_ws()
+        if pos >= len(buf) or buf[pos] not in chars:
+            found = buf[pos] if pos < len(buf) else "EOF"
+            raise ValueError(f"Expecting {' or '.join(map(repr, chars))}, found {found!r}")
+        pos += 1
+        return buf[pos - 1]
+
+    def _decode() -> typing.Any:
+        nonlocal pos
+        _skip_ws()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # 值被读取块截断, 读取更多内容后重试, 已到文件末尾时说明格式错误
+                if _fill():
+                    continue
+                raise
+            # 数字等值在读取块末尾结束时, 可能还没有读取完整(如 1.5 只读取到 1.)
+            if (end == len(buf) or buf[end] in _NUMBER_CHARS) and _fill():
+                continue
+            pos = end
+            return value
+
+    _expect("{")
+    _skip_ws()
+    if pos < len(buf) and buf[pos] == "}":
+        return
+    while True:
+        key = _decode()
+        if not isinstance(key, str):
+            raise ValueError(f"Expecting property name, found {key!r}")
+        _expect(":")
+        yield key, _decode()
+        if _expect(",}") == "}":
+            return
+
+
+def iter_json(f: typing.TextIO) -> typing.Iterator[ReviewedEntry]:
+    """JSON对象, msgid -> msgstr, 流式解析, 键为"msgctxt\\x04msgid"时拆分出msgctxt, 与exporter的json_key对应"""
+    for key, msgstr in iter_json_object(f):
+        msgctxt, sep, msgid = key.partition(MSGCTXT_SEPARATOR)
+        yield ReviewedEntry(msgid, msgstr or "", msgctxt) if sep else ReviewedEntry(key, msgstr or "")
+
+
+def iter_jsonl(f: typing.TextIO) -> typing.Iterator[ReviewedEntry]:
+    """每行一个JSON对象, 逐行解析, 格式错误时抛出ValueError, 包含行号"""
+    for lineno, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {lineno}: {e}") from e
+        if not isinstance(item, dict) or not isinstance(item.get("msgid"), str):
+            raise ValueError(f"line {lineno}: missing msgid")
+        yield ReviewedEntry(item["msgid"], item.get("msgstr") or "", item.get("msgctxt"))
+
+
+def iter_csv(f: typing.TextIO) -> typing.Iterator[ReviewedEntry]:
+    """
+    CSV, 第一行为字段名, msgctxt为空时视为没有msgctxt
+    按严格模式解析, 引号不匹配等格式错误时抛出ValueError, 包含出错记录的起始行号
+    """
+    reader = csv.DictReader(f, strict=True)
+    lineno = 1
+    try:
+        fieldnames = reader.fieldnames or []
+        while True:
+            # 字段中可以包含换行, 一条记录可能跨越多行
+            lineno = reader.line_num + 1
+            row = next(reader, None)
+            if row is None:
+                return
+            if "msgid" not in fieldnames or row["msgid"] is None:
+                raise ValueError(f"line {lineno}: missing msgid")
+            yield ReviewedEntry(row["msgid"], row.get("msgstr") or "", row.get("msgctxt") or None)
+    except csv.Error as e:
+        raise ValueError(f"line {lineno}: {e}") from e
+
+
+READERS: dict[str, typing.Callable[[typing.TextIO], typing.Iterator[ReviewedEntry]]] = {
+    ExportFormatEnum.JSON: iter_json,
+    ExportFormatEnum.JSONL: iter_jsonl,
+    ExportFormatEnum.CSV: iter_csv,
+}
+
+
+__all__ = ["ReviewedEntry", "READERS"]
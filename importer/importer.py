@@ -0,0 +1,94 @@
+import typing
+
+import polib
+from rich.table import Table
+
+from common import Prompt
+from common.constants import ExportFormatEnum, ImportConflictEnum
+from common.path import require_path, resolve_po_file
+from common.po import PoUtil
+from common.po_snapshot import PoSnapshot, translation_digest
+from importer.formats import READERS, ReviewedEntry
+
+_CONFLICTS = (
+    ImportConflictEnum.MISSING,
+    ImportConflictEnum.OBSOLETE,
+    ImportConflictEnum.MODIFIED,
+    ImportConflictEnum.PLURAL,
+)
+
+
+def _digest(entry: polib.POEntry) -> str:
+    return translation_digest(entry.msgstr, entry.msgstr_plural, entry.fuzzy)
+
+
+class ImportTool:
+    """
+    导入工具, 将评审后的词条写回po文件
+    流式读取评审文件, 通过msgid索引逐条合并, 全部合并后只保存一次; 译文为空的词条跳过, 不会清空已有译文
+    存在冲突的词条不写入, 冲突原因参考ImportConflictEnum
+    使用过增量导出时, 同时更新导出快照, 评审后的译文不会在下次增量导出时再次导出
+    :param locale_path: Django locale目录, 也可以是po文件路径
+    :param import_path: 评审后的文件路径, 格式与exporter导出的一致
+    :param import_format: 导入格式, 参考ExportFormatEnum, 不传时根据import_path后缀判断
+    """
+
+    def __init__(self, locale_path: str = None, import_path: str = None, import_format: str = None):
+        self.locale_path = locale_path
+        self.po_file = PoUtil(resolve_po_file(require_path(locale_path)))
+        self.import_path = require_path(import_path, name="import_path")
+        self.import_format = import_format or ExportFormatEnum.from_path(self.import_path)
+        ExportFormatEnum.check_member(self.import_format)
+        self._snapshot = PoSnapshot(self.po_file.po_file_path)
+
+    def _conflict(self, reviewed: ReviewedEntry, entry: typing.Optional[polib.POEntry]) -> typing.Optional[str]:
+        """检查冲突, 返回冲突原因, 没有冲突时返回None"""
+        if entry is None:
+            return ImportConflictEnum.MISSING
+        if entry.obsolete:
+            return ImportConflictEnum.OBSOLETE
+        if entry.msgid_plural:
+            return ImportConflictEnum.PLURAL
+        exported = self._snapshot.get(entry.msgid, entry.msgctxt)
+        if exported is not None and exported != _digest(entry) and entry.msgstr != reviewed.msgstr:
+            return ImportConflictEnum.MODIFIED
+        return None
+
+    def handle(self):
+        summary = {"read": 0, "empty": 0, **dict.fromkeys(_CONFLICTS, 0)}
+        try:
+            with open(self.import_path, encoding="utf-8", newline="") as f:
+                for _reviewed in READERS[self.import_format](f):
+                    summary["read"] += 1
+                    if not _reviewed.msgstr:
+                        summary["empty"] += 1
+                        continue
+                    entry = self.po_file.find(_reviewed.msgid, _reviewed.msgctxt)
+                    reason = self._conflict(_reviewed, entry)
+                    if reason:
+                        summary[reason] += 1
+                        Prompt.warning(
+                            "Conflict({reason}): {msgctxt}{msgid}",
+                            reason=reason,
+                            msgctxt=f"[{_reviewed.msgctxt}] " if _reviewed.msgctxt is not None else "",
+                            msgid=_reviewed.msgid,
+                        )
+                        continue
+                    self.po_file.merge(_reviewed.msgid, _reviewed.msgstr, _reviewed.msgctxt)
+                    if len(self._snapshot):
+                        self._snapshot.set(entry.msgid, entry.msgctxt, _digest(entry))
+        except (ValueError, KeyError) as e:
+            Prompt.panic("Failed to import {import_path}: {e}", import_path=self.import_path, e=e)
+        summary["changed"] = self.po_file.save()
+        if len(self._snapshot):
+            self._snapshot.save()
+        self._print_summary(summary)
+
+    @staticmethod
+    def _print_summary(summary: dict[str, int]):
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("Status")
+        table.add_column("Entries", justify="right")
+        for _status, _count in summary.items():
+            table.add_row(_status, str(_count))
+        Prompt.print(table)
@@ -3,11 +3,15 @@ import sys
 
 import click
 
+from common.backup import BackupStore
+from common.path import resolve_po_file
 from compiler import CompileTool
 from exporter import ExportTool
 from extractor import ExtractTool
+from importer import ImportTool
 from marker import MarkerTool
 from translator import TranslatorTool
+from translator.memory import TranslationMemoryTool
 
 
 @click.group(help="Jinx, 一个方便的国际化工具")
@@ -29,10 +33,13 @@ def cli(config_path):
 @cli.command(help="标记国际化字符串")
 # @click.pass_context
 @click.option("--target_path", "-t", type=click.Path(exists=True), required=True, help="要标记的目录")
-# @click.option("--multi_thread", "-m", type=bool, required=False, help="是否开启多线程", default=False)
+@click.option("--jobs", "-j", type=int, required=False, help="并行进程数, 0表示使用CPU核数的一半", default=1)
+@click.option("--since", "-s", type=str, required=False, help="只处理相对该git ref有变更的文件")
+@click.option("--changed_only", is_flag=True, help="只处理工作区相对HEAD有变更的文件")
+@click.option("--diff", "dry_run", is_flag=True, help="不写入文件, 只输出标记结果的diff")
 # def marker(ctx, target_path):
-def marker(target_path):
-    MarkerTool(target_path=target_path).handle()
+def marker(target_path, jobs, since, changed_only, dry_run):
+    MarkerTool(target_path=target_path, jobs=jobs, since=since, changed_only=changed_only, dry_run=dry_run).handle()
 
 
 @cli.command(help="翻译需要国际化的词条")
@@ -43,24 +50,74 @@ def translator(locale_path, official_dict_path, mode):
     TranslatorTool(locale_path=locale_path, official_dict_path=official_dict_path, mode=mode).handle()
 
 
+@cli.command(help="管理翻译记忆库")
+@click.option("--import_path", "-i", type=click.Path(exists=True), required=False, help="导入已翻译词条的locale目录或django.po")
+@click.option("--stats", is_flag=True, help="输出记忆库统计信息")
+@click.option("--evict", is_flag=True, help="淘汰过期以及超出最大条目数的条目")
+@click.option("--clear", is_flag=True, help="清空记忆库")
+def memory(import_path, stats, evict, clear):
+    TranslationMemoryTool(import_path=import_path, stats=stats, evict=evict, clear=clear).handle()
+
+
 @cli.command(help="提取项目中的国际化字符串到po文件中")
 @click.option("--target_path", "-t", type=click.Path(exists=True), required=True, help="要提取的目录")
 @click.option("--locale_path", "-l", type=click.Path(exists=True), required=True, help="需要写入的locale目录或者django.po路径")
-def extractor(target_path, locale_path):
-    ExtractTool(target_path=target_path, locale_path=locale_path).handle()
+@click.option("--jobs", "-j", type=int, required=False, help="并行进程数, 0表示使用CPU核数的一半", default=1)
+@click.option("--since", "-s", type=str, required=False, help="只提取相对该git ref有变更的文件")
+@click.option("--changed_only", is_flag=True, help="只提取工作区相对HEAD有变更的文件")
+def extractor(target_path, locale_path, jobs, since, changed_only):
+    ExtractTool(
+        target_path=target_path, locale_path=locale_path, jobs=jobs, since=since, changed_only=changed_only
+    ).handle()
 
 
 @cli.command(help="从po文件中导出词条")
 @click.option("--locale_path", "-l", type=click.Path(exists=True), required=True, help="需要提取的locale目录或者django.po路径")
-@click.option("--export_path", "-e", type=str, required=False, help="导出JSON路径", default="contents.json")
-def exporter(locale_path, export_path):
-    ExportTool(locale_path=locale_path, export_path=export_path).handle()
+@click.option("--export_path", "-e", type=str, required=False, help="导出路径", default="contents.json")
+@click.option("--format", "-f", "export_format", type=str, required=False, help="导出格式, json|jsonl|csv, 默认根据导出路径后缀判断")
+@click.option("--untranslated_only", is_flag=True, help="只导出未翻译的词条")
+@click.option("--fuzzy_only", is_flag=True, help="只导出标记为fuzzy的词条")
+@click.option("--changed_since", type=str, required=False, help="只导出相对该git ref新增或译文有变化的词条")
+@click.option("--delta", is_flag=True, help="只导出相对上次导出新增或译文有变化的词条")
+def exporter(locale_path, export_path, export_format, untranslated_only, fuzzy_only, changed_since, delta):
+    ExportTool(
+        locale_path=locale_path,
+        export_path=export_path,
+        export_format=export_format,
+        untranslated_only=untranslated_only,
+        fuzzy_only=fuzzy_only,
+        changed_since=changed_since,
+        delta=delta,
+    ).handle()
+
+
+@cli.command(help="将评审后的词条写回po文件")
+@click.option("--locale_path", "-l", type=click.Path(exists=True), required=True, help="需要写入的locale目录或者django.po路径")
+@click.option("--import_path", "-i", type=click.Path(exists=True), required=True, help="评审后的文件路径")
+@click.option("--format", "-f", "import_format", type=str, required=False, help="导入格式, json|jsonl|csv, 默认根据文件后缀判断")
+def importer(locale_path, import_path, import_format):
+    ImportTool(locale_path=locale_path, import_path=import_path, import_format=import_format).handle()
 
 
 @cli.command(help="po编译成mo")
 @click.option("--locale_path", "-l", type=click.Path(exists=True), required=True, help="需要提取的locale目录或者django.po路径")
-def compiler(locale_path):
-    CompileTool(locale_path=locale_path).handle()
+@click.option("--all", "-a", "all_catalogs", is_flag=True, help="编译locale_path下所有LC_MESSAGES/*.po")
+@click.option("--jobs", "-j", type=int, required=False, help="并行进程数, 0表示使用CPU核数的一半", default=1)
+@click.option("--force", "-f", is_flag=True, help="忽略mo文件是否最新, 全部重新编译")
+def compiler(locale_path, all_catalogs, jobs, force):
+    CompileTool(locale_path=locale_path, all_catalogs=all_catalogs, jobs=jobs, force=force).handle()
+
+
+@cli.command(help="从备份恢复po文件")
+@click.option("--locale_path", "-l", type=click.Path(exists=True), required=True, help="需要恢复的locale目录或者django.po路径")
+@click.option("--version", "-v", type=str, required=False, help="备份版本, 即内容摘要前缀, 默认为最近一次备份")
+@click.option("--list", "show", is_flag=True, help="列出所有备份")
+def restore(locale_path, version, show):
+    store = BackupStore(resolve_po_file(locale_path))
+    if show:
+        store.show()
+        return
+    store.restore(version)
 
 
 if __name__ == "__main__":
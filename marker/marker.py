@@ -1,19 +1,43 @@
+import math
+import mmap
 import os
+import sys
 import tokenize
 import typing
 from collections import defaultdict
-from dataclasses import asdict, dataclass
-from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
 from typing import Generator
 
-from rich.progress import track
+from rich.progress import Progress
 
 from common import Prompt
-from common.config import config_util
-from common.utils import list_files, read_file, write_file
+from common.config import cache, config_util, language
+from common.constants import MARKER_CHUNK_SIZE, MAX_WORKERS
+from common.git import changed_files
+from common.utils import (
+    array_chunk,
+    content_digest,
+    filter_files,
+    list_files,
+    read_bytes,
+    write_file,
+)
 from marker.plugins.file_filter import file_filter
-from marker.plugins.str_conditions import StrCondition
-from marker.utils.token import Token, TokenPoint, generate_tokens
+from marker.plugins.str_conditions import str_matcher
+from marker.utils.cache import CacheRecord, MarkerCache, config_fingerprint
+from marker.utils.edit import EditConflictError, EditSet
+from marker.utils.prefilter import byte_prefilter
+from marker.utils.token import (
+    Token,
+    TokenPoint,
+    TokenStore,
+    decode_source,
+    generate_tokens,
+    is_fstring,
+    join_literals,
+)
 from marker.utils.translation_func import (
     DjangoTranslationFunc,
     DjangoTranslationFuncParser,
@@ -28,27 +52,88 @@ class MarkerConfig:
 marker_config = MarkerConfig(strict_mode=config_util.get("marker.strict_mode", False))
 
 
+@dataclass
+class FileMarkResult:
+    """
+    单个文件的标记结果
+    :param filepath: 文件路径
+    :param tokens: 提取到的合法token
+    :param illegal_tokens: 非法token, 如f-string
+    :param changed: 标记后内容是否有变化
+    :param written: 是否写入了文件
+    :param diff: dry_run模式下生成的unified diff
+    :param mtime_ns: 标记前的文件修改时间
+    :param size: 标记前的文件大小
+    :param digest: 标记前的文件内容摘要
+    :param skipped: 是否被预筛选跳过, 即文件中不包含当前语言文本
+    """
+
+    filepath: str
+    tokens: TokenStore = field(default_factory=TokenStore)
+    illegal_tokens: TokenStore = field(default_factory=TokenStore)
+    changed: bool = False
+    written: bool = False
+    diff: str = ""
+    mtime_ns: int = 0
+    size: int = 0
+    digest: str = ""
+    skipped: bool = False
+
+
+def warn_illegal_tokens(filepath: str, illegal_tokens: typing.Iterable[Token]):
+    """提示f-string格式化的需要国际化的字符串"""
+    for _t in illegal_tokens:
+        Prompt.warning(
+            "Unsupported f-string, {filepath}:{row}, token: {token}",
+            filepath=filepath,
+            row=_t.start_at.row,
+            token=_t.token,
+        )
+
+
 class FileMarker:
     """
     单个py文件国际化标记器
     单文件, 给py文件中的中文字符串添加国际化函数
+    文件只读取一次, 提取/检查/标记/插入import语句共享同一份内容
     :param filepath: 文件路径
+    :param content: 文件原始内容, 调用方已读取过文件时传入, 避免重复读取
     """
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, content: bytes = None):
         self._fp = filepath
         # _tokens 中文词列表
         self._tokens: typing.Dict[typing.Any, list] = defaultdict(list)
+        # 文件状态及内容摘要, 用于增量缓存
+        self._stat = os.stat(filepath)
+        if content is None:
+            content = read_bytes(filepath)
+        self._digest = content_digest(content)
+        # 文件编码及解码后的原始内容
+        self._encoding, self._content = decode_source(content)
         # 所有行
-        self._lines = read_file(filepath).split("\n")
+        self._lines = self._content.split("\n")
         # 非合法的行
         self._illegal_tokens: typing.List[Token] = []
+        # 翻译函数解析器
+        self._parser = DjangoTranslationFuncParser(contents=self._lines)
         # 默认翻译函数
-        self._default_translate_func = DjangoTranslationFuncParser(contents=self._lines).default
-        # 是否需要插入import语句
-        self._missing_import = False
+        self._default_translate_func = self._parser.default
+        # 文件是否已导入翻译函数, 未导入时需要插入import语句
+        self._has_import = False
         # 翻译函数列表
         self._translate_funcs = self._parse_translate_funcs()
+        self._translate_prefixes = tuple(_f.prefix.strip() for _f in self._translate_funcs)
+        # 隐式拼接的字符串组, 字符串起始位置 -> 组内所有token
+        self._groups: typing.Dict[TokenPoint, list[Token]] = {}
+        # 包含f-string的字符串组, 记录组内首个token的起始位置
+        self._illegal_groups: typing.Set[TokenPoint] = set()
+        # 整个文件的编辑区间
+        self._edits = EditSet(self._content)
+        # 标记后的内容
+        self._marked_content = self._content
+        # 标记后内容是否有变化
+        self._changed = False
 
     @property
     def is_legal(self) -> bool:
@@ -57,75 +142,84 @@ class FileMarker:
 
     def _parse_translate_funcs(self) -> list[DjangoTranslationFunc]:
         """解析翻译函数"""
-        _parser = DjangoTranslationFuncParser(contents=self._lines)
-        _funcs = _parser.parse()
+        _funcs = self._parser.parse()
         if not _funcs:
             _funcs.append(self._default_translate_func)
         else:
-            self._missing_import = True
+            self._has_import = True
         return _funcs
 
     @property
     def token_generator(self) -> Generator[tokenize.TokenInfo, None, None]:
         """利用tokenize标记py代码文件"""
-        return tokenize.generate_tokens(StringIO(read_file(self._fp)).readline)
-
-    def _extract_token(self, t: Token) -> None:
-        """匹配规则, 根据过滤规则, 判断是否提取token"""
-        try:
-            if not StrCondition(token=t).match():
-                return
-            self._tokens[t.start_at.row].append(t)
-
-        except Exception as e:
-            Prompt.error("handler_string, token: {token}, error: {e}", token=asdict(t), e=e)
+        return generate_tokens(self._content)
 
     def _extract_tokens(self) -> None:
         """
         <核心逻辑> 第一步
-        遍历所有token, 提取中文字符串
+        遍历所有字符串token, 根据过滤规则批量提取中文字符串
         """
-        for _type, _val, _st, _et, _source in generate_tokens(self._fp):
-            _token = Token(
-                type=_type, token=_val, start_at=TokenPoint(*_st), end_at=TokenPoint(*_et), source_line=_source
-            )
+        _string_tokens = []
+        # 当前隐式拼接的字符串组, 如: "abc" "中文", 中间可以有换行和注释
+        _group: list[Token] = []
+        for _type, _val, _st, _et, _source in self.token_generator:
             if _type == tokenize.STRING:
-                self._extract_token(_token)
+                _t = Token(
+                    type=_type, token=_val, start_at=TokenPoint(*_st), end_at=TokenPoint(*_et), source_line=_source
+                )
+                _string_tokens.append(_t)
+                _group.append(_t)
+                continue
+            if _type in (tokenize.NL, tokenize.COMMENT):
+                continue
+            self._add_group(_group)
+            _group = []
+        self._add_group(_group)
+        for _t in str_matcher.filter(_string_tokens):
+            self._tokens[_t.start_at.row].append(_t)
+
+    def _add_group(self, group: list[Token]) -> None:
+        """记录隐式拼接的字符串组, 提取和标记时整组作为一个字符串"""
+        if len(group) < 2:
+            return
+        for _t in group:
+            self._groups[_t.start_at] = group
+
+    def _group_of(self, t: Token) -> list[Token]:
+        """token所在字符串组的所有token"""
+        return self._groups.get(t.start_at, [t])
 
     @property
     def tokens(self) -> list[Token]:
-        """待标记的token"""
+        """
+        待标记的token
+        隐式拼接的字符串组合并为一个token, 范围与标记时包裹的范围一致, 组内包含f-string时整组跳过
+        """
         if not self._tokens:
             self._extract_tokens()
         tokens = []
+        _handled = set()
         for _tokens in self._tokens.values():
-            tokens.extend(_tokens)
-
+            for _t in _tokens:
+                _group = self._group_of(_t)
+                _start = _group[0].start_at
+                if _start in _handled or _start in self._illegal_groups:
+                    continue
+                _handled.add(_start)
+                tokens.append(_t if len(_group) == 1 else join_literals(_group))
         return tokens
 
-    def _match_translate_func(
-        self,
-        current_line: str,
-        translation_func: DjangoTranslationFunc,
-        t: Token,
-        offset: int,
-    ):
-        """匹配单个翻译函数"""
-        _func_len = len(translation_func.prefix)
-        _current_prefix_start = t.start_at.col + offset - _func_len
-        _current_prefix_end = t.start_at.col + offset
-        _current_prefix = current_line[_current_prefix_start:_current_prefix_end]
-        # 如果当前行已经存在翻译函数, 则不再添加
-        if _current_prefix.strip() == translation_func.prefix.strip():
-            return True
-        _current_line_start = current_line[: _current_prefix_start + 1]
-        # 考虑到字符串超长导致的代码格式化, 检查上一行是否添加了翻译函数
-        if translation_func.prefix in self._lines[t.start_at.row - 2] and not "".join(_current_line_start.split(" ")):
-            return True
-
-        if _current_line_start.rstrip(" ").endswith("'") or _current_line_start.rstrip(" ").endswith('"'):
+    def _is_marked(self, t: Token) -> bool:
+        """
+        判断token是否已被翻译函数包裹
+        1. token前紧挨着翻译函数, 如: _("中文")
+        2. 字符串超长导致代码格式化换行, 翻译函数在上一行末尾, 如: _(\n    "中文"\n)
+        """
+        _before = self._lines[t.start_at.row - 1][: t.start_at.col].rstrip()
+        if _before.endswith(self._translate_prefixes):
             return True
-
+        if not _before and t.start_at.row > 1:
+            return self._lines[t.start_at.row - 2].rstrip().endswith(self._translate_prefixes)
         return False
 
     def _check(self) -> None:
@@ -137,11 +231,13 @@ class FileMarker:
             return
         _del_rows = []
         for _row in self._tokens.keys():
-            _current_line = self._lines[_row - 1]
             _legal_tokens = []
             for _t in self._tokens[_row]:
-                if _current_line[_t.start_at.col] == "f":
+                # 隐式拼接的字符串组中任意一个是f-string时, 整组都无法标记
+                _group = self._group_of(_t)
+                if any(is_fstring(_g.token) for _g in _group):
                     self._illegal_tokens.append(_t)
+                    self._illegal_groups.add(_group[0].start_at)
                     continue
                 _legal_tokens.append(_t)
             if _legal_tokens:
@@ -152,134 +248,315 @@ class FileMarker:
             del self._tokens[_row]
 
         if not self.is_legal:
-            for _t in self._illegal_tokens:
-                Prompt.warning(
-                    "Unsupported f-string, {filepath}:{row}, token: {token}",
-                    filepath=self._fp,
-                    row=_t.start_at.row,
-                    token=_t.token,
-                )
+            warn_illegal_tokens(self._fp, self._illegal_tokens)
 
     def _mark(self) -> None:
         """
         <核心逻辑> 第三步
-        给需要国际化的字符串添加翻译函数
+        给需要国际化的字符串添加翻译函数, 只收集编辑区间, 不直接修改内容
         """
         if not self._tokens:
             return
-        for _row in self._tokens.keys():
-            _current_line = self._lines[_row - 1]
-            # 当前因添加翻译函数所增加的列偏移量
-            _line_offset = 0
-            for _t in self._tokens[_row]:
-                # 先置为默认翻译函数
-                real_mark_prefix = self._default_translate_func.prefix
-                real_mark_suffix = self._default_translate_func.suffix
-                _is_match = False
-                for _translate_func in self._translate_funcs:
-                    _is_match = self._match_translate_func(
-                        current_line=_current_line,
-                        translation_func=_translate_func,
-                        t=_t,
-                        offset=_line_offset,
-                    )
-                    if _is_match:
-                        real_mark_prefix = _translate_func.prefix
-                        real_mark_suffix = _translate_func.suffix
-                        break
-                if _is_match:
-                    continue
-                _new_line = _current_line[: _t.start_at.col + _line_offset] + real_mark_prefix + _t.token
-                _new_line += real_mark_suffix
-                _new_line += _current_line[_t.end_at.col + _line_offset :]
-                _current_line = _new_line
-                _line_offset += len(real_mark_prefix) + len(real_mark_suffix)
-            if self._lines[_row - 1] != _current_line:
-                self._lines[_row - 1] = _current_line
+        _prefix = self._default_translate_func.prefix
+        _suffix = self._default_translate_func.suffix
+        for _t in self.tokens:
+            if self._is_marked(_t):
+                continue
+            _start = self._edits.offset(_t.start_at.row, _t.start_at.col)
+            _end = self._edits.offset(_t.end_at.row, _t.end_at.col)
+            self._edits.replace(_start, _end, _prefix + self._content[_start:_end] + _suffix)
 
     def _add_import(self):
         """
         <核心逻辑> 第四步
-        添加导入语句
+        添加导入语句, 仅在文件未导入翻译函数且确实有字符串被标记时添加
         """
-        if self._missing_import and self._tokens:
+        if self._has_import or not self._edits:
             return
         insert_idx = 0
         for _idx, _line in enumerate(self._lines):
-            try:
-                if (
-                    (_line.startswith("import") or _line.startswith("from"))
-                    and _idx < len(self._lines) - 1
-                    # 空行可能为"", "\n"
-                    and self._lines[_idx + 1] in ["", os.linesep]
-                ):
-                    insert_idx = _idx + 1
-                    break
-            except Exception as e:
-                Prompt.error(f"Failed to find empty line: {e}")
+            if (
+                (_line.startswith("import") or _line.startswith("from"))
+                and _idx < len(self._lines) - 1
+                # 空行可能为"", "\n"
+                and self._lines[_idx + 1] in ["", os.linesep]
+            ):
+                insert_idx = _idx + 1
+                break
         if not insert_idx:
             for _idx, _line in enumerate(self._lines):
                 if _line == "\n" or not _line.startswith("#"):
                     insert_idx = _idx
                     break
-        for _translate_func in self._translate_funcs:
-            self._lines.insert(insert_idx, _translate_func.import_path)
+        _imports = "".join(f"{_f.import_path}\n" for _f in reversed(self._translate_funcs))
+        self._edits.insert(self._edits.offset(insert_idx + 1, 0), _imports)
 
-    def _write(self):
+    def _apply(self) -> bool:
+        """应用编辑区间, 区间冲突时跳过当前文件"""
+        try:
+            self._marked_content = self._edits.apply()
+        except EditConflictError as e:
+            Prompt.error("Skip {filepath}, conflicting edits: {e}", filepath=self._fp, e=e)
+            return False
+        return self._marked_content != self._content
+
+    def _write(self) -> bool:
         """
         <核心逻辑> 第五步
-        将修改后的内容写入文件
+        将修改后的内容写入文件, 内容没有变化时不重写文件, 保持mtime不变, 以便增量缓存命中
         """
-        if not self._tokens:
-            return
-        write_file(self._fp, self._lines)
+        if not self._changed:
+            return False
+        write_file(self._fp, [self._marked_content], encoding=self._encoding)
+        return True
 
-    def handle(self, only_extract_tokens: bool = False):
+    @property
+    def result(self) -> FileMarkResult:
+        """标记结果"""
+        return FileMarkResult(
+            filepath=self._fp,
+            tokens=TokenStore(self.tokens),
+            illegal_tokens=TokenStore(self._illegal_tokens),
+            changed=self._changed,
+            mtime_ns=self._stat.st_mtime_ns,
+            size=self._stat.st_size,
+            digest=self._digest,
+        )
+
+    def handle(
+        self, only_extract_tokens: bool = False, dry_run: bool = False, diff_root: str = None
+    ) -> FileMarkResult:
         """
         <核心逻辑>
         主流程
+        :param only_extract_tokens: 仅提取tokens
+        :param dry_run: 不写入文件, 只生成diff
+        :param diff_root: diff中的文件路径相对于该目录, 默认为当前目录
         """
         self._extract_tokens()
         self._check()
+        result = self.result
         # 仅提取tokens, 不做后续处理
         if only_extract_tokens:
-            return
+            return result
         # 严格模式下, 存在需要修复的f-string格式语句, 跳过当前文件的后续流程
         if not self.is_legal and marker_config.strict_mode:
-            return
+            return result
         self._mark()
         self._add_import()
-        self._write()
+        self._changed = self._apply()
+        result.changed = self._changed
+        if dry_run:
+            _path = os.path.relpath(self._fp, diff_root or os.curdir).replace(os.sep, "/")
+            result.diff = self._edits.diff(_path) if self._changed else ""
+            return result
+        result.written = self._write()
+        return result
+
+
+def mark_file(
+    filepath: str, only_extract_tokens: bool = False, dry_run: bool = False, diff_root: str = None
+) -> FileMarkResult:
+    """
+    标记单个文件
+    先用mmap在原始字节上预筛选, 不包含当前语言文本的文件直接跳过tokenize
+    """
+    if not byte_prefilter.enabled:
+        return FileMarker(filepath).handle(only_extract_tokens, dry_run, diff_root)
+    with open(filepath, "rb") as f:
+        _stat = os.fstat(f.fileno())
+        if not _stat.st_size:
+            return FileMarkResult(
+                filepath=filepath, mtime_ns=_stat.st_mtime_ns, digest=content_digest(b""), skipped=True
+            )
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if not byte_prefilter.scan(mm):
+                return FileMarkResult(
+                    filepath=filepath,
+                    mtime_ns=_stat.st_mtime_ns,
+                    size=_stat.st_size,
+                    digest=content_digest(mm),
+                    skipped=True,
+                )
+            content = mm[:]
+    return FileMarker(filepath, content=content).handle(only_extract_tokens, dry_run, diff_root)
+
+
+def mark_files(
+    filepaths: list[str], only_extract_tokens: bool = False, dry_run: bool = False, diff_root: str = None
+) -> list[FileMarkResult]:
+    """标记一批文件, 作为多进程模式下worker的执行单元"""
+    return [mark_file(_fp, only_extract_tokens, dry_run, diff_root) for _fp in filepaths]
 
 
 class MarkerTool:
-    def __init__(self, target_path: str = None):
+    """
+    国际化标记工具
+    :param target_path: 要标记的目录
+    :param jobs: 并行进程数, 1为单进程, 0为自动(MAX_WORKERS)
+    :param since: git ref, 只处理相对该ref有变更的文件
+    :param changed_only: 只处理工作区相对HEAD有变更的文件
+    :param dry_run: 不写入文件, 输出unified diff
+    """
+
+    def __init__(
+        self,
+        target_path: str = None,
+        jobs: int = 1,
+        since: str = None,
+        changed_only: bool = False,
+        dry_run: bool = False,
+    ):
         self._target_path = target_path
-        self._tokens: typing.List[Token] = []
+        self._dry_run = dry_run
+        # diff中的文件路径相对于目标目录, 可以在目标目录下直接git apply
+        self._diff_root = (
+            target_path if target_path and os.path.isdir(target_path) else os.path.dirname(target_path or "")
+        )
+        self._jobs = jobs if jobs > 0 else MAX_WORKERS
+        self._since = since
+        self._changed_only = changed_only or bool(since)
+        self._tokens = TokenStore()
+        self._cache = MarkerCache(config_fingerprint(marker_config.strict_mode)) if cache.enabled else None
 
     @property
     def files(self):
-        """列出符合过滤条件的所有文件"""
+        """列出符合过滤条件的所有文件, 只处理变更文件时, 以git变更文件列表为候选"""
+        if self._changed_only:
+            return filter_files(
+                target_path=self._target_path,
+                filepaths=changed_files(self._target_path, since=self._since),
+                exclude_paths=file_filter.exclude_paths,
+                exclude_files=file_filter.exclude_files,
+            )
         return list_files(
             target_path=self._target_path,
             exclude_paths=file_filter.exclude_paths,
             exclude_files=file_filter.exclude_files,
+            respect_gitignore=file_filter.respect_gitignore,
         )
 
     @property
-    def tokens(self):
+    def tokens(self) -> TokenStore:
+        """整个项目的token, 一次性汇总到内存中, 大型项目建议使用iter_tokens"""
         if not self._tokens:
             self.handle(only_extract_tokens=True)
         return self._tokens
 
+    def iter_tokens(self) -> Generator[TokenStore, None, None]:
+        """逐个文件产出提取到的token, 不在内存中汇总整个项目的token"""
+        for _result in self._run(self.files, only_extract_tokens=True):
+            if _result.tokens:
+                yield _result.tokens
+
+    def _chunk_size(self, total: int) -> int:
+        """每个worker单次处理的文件数, 保证每个进程能分到多批, 以便进度条平滑推进"""
+        return max(1, min(MARKER_CHUNK_SIZE, math.ceil(total / (self._jobs * 4))))
+
+    def _lookup(self, filepath: str, only_extract_tokens: bool) -> typing.Optional[FileMarkResult]:
+        """
+        查询增量缓存
+        提取模式下, 内容未变更即可复用; 标记模式下, 还要求上次标记后文件已无需改动
+        """
+        if not self._cache:
+            return None
+        _record = self._cache.get(filepath)
+        if not _record or not (only_extract_tokens or _record.marked):
+            return None
+        warn_illegal_tokens(filepath, _record.illegal_tokens)
+        return FileMarkResult(filepath=filepath, tokens=_record.tokens, illegal_tokens=_record.illegal_tokens)
+
+    def _update_cache(self, result: FileMarkResult, only_extract_tokens: bool):
+        if not self._cache:
+            return
+        # 文件已被改写, 缓存的内容摘要失效, 下次重新提取
+        if result.written:
+            self._cache.discard(result.filepath)
+            return
+        self._cache.put(
+            result.filepath,
+            CacheRecord(
+                mtime_ns=result.mtime_ns,
+                size=result.size,
+                digest=result.digest,
+                tokens=result.tokens,
+                illegal_tokens=result.illegal_tokens,
+                marked=not only_extract_tokens and not result.changed,
+            ),
+        )
+
+    def _mark_files(self, files: list[str], only_extract_tokens: bool):
+        """逐个产出标记结果, 单进程顺序执行, 多进程按批分发给进程池"""
+        if self._jobs <= 1 or len(files) <= 1:
+            for _file in files:
+                yield mark_file(_file, only_extract_tokens, self._dry_run, self._diff_root)
+            return
+        chunks = array_chunk(files, self._chunk_size(len(files)))
+        with ProcessPoolExecutor(max_workers=self._jobs) as executor:
+            # 按提交顺序收集结果, 保证与单进程模式的输出顺序一致
+            for results in executor.map(
+                mark_files, chunks, repeat(only_extract_tokens), repeat(self._dry_run), repeat(self._diff_root)
+            ):
+                yield from results
+
+    def _run(self, files: list[str], only_extract_tokens: bool, progress: Progress = None):
+        """按文件顺序产出标记结果, 命中缓存的文件直接复用, 其余文件交给FileMarker处理"""
+        task = progress.add_task("Marking...", total=len(files)) if progress else None
+        cached = {}
+        pending = []
+        for _file in files:
+            _result = self._lookup(_file, only_extract_tokens)
+            if _result:
+                cached[_file] = _result
+            else:
+                pending.append(_file)
+        if self._cache:
+            Prompt.info("Marker cache hit {hit}/{total} files", hit=len(cached), total=len(files))
+        results = self._mark_files(pending, only_extract_tokens)
+        skipped = 0
+        for _file in files:
+            _result = cached.get(_file)
+            if not _result:
+                _result = next(results)
+                skipped += _result.skipped
+                self._update_cache(_result, only_extract_tokens)
+            yield _result
+            if progress and task is not None:
+                progress.advance(task)
+        if byte_prefilter.enabled:
+            Prompt.info(
+                "Prefilter skipped {skipped}/{total} files without {language} text",
+                skipped=skipped,
+                total=len(pending),
+                language=language.current,
+            )
+        if self._cache:
+            # 只处理变更文件时, 文件列表不完整, 不能据此清理缓存
+            if not self._changed_only and self._target_path:
+                self._cache.retain(self._target_path, files)
+            self._cache.save()
+
     def handle(self, only_extract_tokens: bool = False):
         if only_extract_tokens:
-            tokens = []
-            for _file in self.files:
-                _handler = FileMarker(_file)
-                _handler.handle(only_extract_tokens)
-                tokens.extend(_handler.tokens)
+            tokens = TokenStore()
+            for _tokens in self.iter_tokens():
+                tokens.extend(_tokens)
             self._tokens = tokens
-        else:
-            for _file in track(self.files, description="Marking..."):
-                FileMarker(_file).handle()
+            return
+        files = self.files
+        changed, illegal = 0, 0
+        with Progress() as progress:
+            for _result in self._run(files, only_extract_tokens, progress):
+                changed += _result.changed
+                illegal += len(_result.illegal_tokens)
+                if _result.diff:
+                    # 原样输出, 不经过rich渲染, 保证输出可以直接作为patch使用
+                    sys.stdout.write(_result.diff)
+                    sys.stdout.flush()
+        Prompt.info(
+            "{action} {changed}/{total} files, {illegal} f-string tokens need to be fixed manually",
+            action="Would mark" if self._dry_run else "Marked",
+            changed=changed,
+            total=len(files),
+            illegal=illegal,
+        )
@@ -9,9 +9,11 @@ class FileFilterConfig:
 
     exclude_paths: list[str]
     exclude_files: list[str]
+    respect_gitignore: bool = False
 
 
 file_filter = FileFilterConfig(
     exclude_paths=config_util.get("marker.filter.exclude_paths", []),
     exclude_files=config_util.get("marker.filter.exclude_files", []),
+    respect_gitignore=config_util.get("marker.filter.respect_gitignore", False),
 )
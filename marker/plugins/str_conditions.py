@@ -1,7 +1,10 @@
 import re
-from dataclasses import asdict, dataclass
+import string
+import typing
+from dataclasses import dataclass
 
 from common.config import config_util, language
+from common.constants import LanguageRegexEnum
 from marker.utils.token import Token
 
 
@@ -33,91 +36,92 @@ str_conditions: StrConditions = StrConditions(
 )
 
 
-class StrCondition:
-    """字符串匹配条件"""
-
-    def __init__(self, token: Token, conditions: StrConditions = str_conditions, language_re: str = language.re):
-        self.token = token
-        self.conditions = conditions
-        self.language_re = language_re
-
-    def match(self):
-        if self.match_part(part="source_line") and self.match_part(part="token") and self.match_language():
-            return True
-        return False
-
-    def match_part(self, part: str):
-        """匹配字符串入口函数"""
-        for _key in asdict(getattr(self.conditions, part)).keys():
-            _method = "build_" + _key
-            if not getattr(self, _method)(part=part):
-                return False
-        return True
-
-    def match_language(self):
-        """匹配当前语言"""
-        language_re_pattern = re.compile(self.language_re)
-        return language_re_pattern.search(self.token.token)
-
-    def build_contains(self, part: str):
-        """包含: 遍历匹配一个就为True"""
-        content = getattr(self.token, part)
-        conditions = getattr(self.conditions, part)
-        if conditions.contains:
-            for _c in conditions.contains:
-                if _c in content:
-                    return True
+def _compile_alternation(items: list[str]) -> typing.Optional[re.Pattern]:
+    """多个子串编译成一个正则, 长串优先, 一次扫描完成匹配"""
+    if not items:
+        return None
+    return re.compile("|".join(re.escape(_i) for _i in sorted(items, key=len, reverse=True)))
+
+
+@dataclass(frozen=True)
+class CompiledStrCondition:
+    """预编译的字符串匹配条件, startswith/endswith使用元组, contains/not_contains使用单个正则"""
+
+    contains: typing.Optional[re.Pattern] = None
+    not_contains: typing.Optional[re.Pattern] = None
+    startswith: tuple[str, ...] = ()
+    not_startswith: tuple[str, ...] = ()
+    endswith: tuple[str, ...] = ()
+    not_endswith: tuple[str, ...] = ()
+
+    @classmethod
+    def compile(cls, config: StrConditionConfig) -> "CompiledStrCondition":
+        return cls(
+            contains=_compile_alternation(config.contains),
+            not_contains=_compile_alternation(config.not_contains),
+            startswith=tuple(config.startswith),
+            not_startswith=tuple(config.not_startswith),
+            endswith=tuple(config.endswith),
+            not_endswith=tuple(config.not_endswith),
+        )
+
+    def match(self, content: str) -> bool:
+        """
+        各条件之间为且的关系
+        contains/startswith/endswith: 配置了则至少匹配一个
+        not_contains/not_startswith/not_endswith: 匹配任意一个即不通过
+        """
+        if self.startswith and not content.startswith(self.startswith):
+            return False
+        if self.not_startswith and content.startswith(self.not_startswith):
+            return False
+        if self.endswith and not content.endswith(self.endswith):
+            return False
+        if self.not_endswith and content.endswith(self.not_endswith):
+            return False
+        if self.contains and not self.contains.search(content):
+            return False
+        if self.not_contains and self.not_contains.search(content):
             return False
         return True
 
-    def build_not_contains(self, part: str):
-        """不包含: 遍历匹配一个就为False"""
-        content = getattr(self.token, part)
-        conditions = getattr(self.conditions, part)
-        if conditions.not_contains:
-            for _c in conditions.not_contains:
-                if _c in content:
-                    return False
-        return True
 
-    def build_startswith(self, part):
-        """以...开头: 遍历匹配一个就为True"""
-        content = getattr(self.token, part)
-        conditions = getattr(self.conditions, part)
-        if conditions.startswith:
-            for _c in conditions.startswith:
-                if content.startswith(_c):
-                    return True
+@dataclass(frozen=True)
+class StrMatcher:
+    """
+    字符串匹配器
+    str_conditions和语言正则只编译一次, 所有token共用
+    """
+
+    source_line: CompiledStrCondition
+    token: CompiledStrCondition
+    language_pattern: re.Pattern
+    # 语言正则不可能匹配纯ASCII字符串时, 可以用str.isascii()快速排除
+    ascii_reject: bool = False
+
+    @classmethod
+    def compile(cls, conditions: StrConditions = str_conditions, language_re: str = language.re) -> "StrMatcher":
+        pattern = re.compile(language_re)
+        # 仅对内置的字符集正则做判断, 用户自定义正则无法保证单字符测试的准确性
+        ascii_reject = language_re in LanguageRegexEnum.values() and not pattern.search(string.printable)
+        return cls(
+            source_line=CompiledStrCondition.compile(conditions.source_line),
+            token=CompiledStrCondition.compile(conditions.token),
+            language_pattern=pattern,
+            ascii_reject=ascii_reject,
+        )
+
+    def match(self, token: Token) -> bool:
+        content = token.token
+        if self.ascii_reject and content.isascii():
             return False
-        return True
+        if not self.language_pattern.search(content):
+            return False
+        return self.token.match(content) and self.source_line.match(token.source_line)
 
-    def build_not_startswith(self, part):
-        """不以...开头: 遍历匹配一个就为False"""
-        content = getattr(self.token, part)
-        conditions = getattr(self.conditions, part)
-        if conditions.not_startswith:
-            for _c in conditions.not_startswith:
-                if content.startswith(_c):
-                    return False
-        return True
+    def filter(self, tokens: typing.Iterable[Token]) -> list[Token]:
+        """批量匹配, 返回满足条件的token"""
+        return [_t for _t in tokens if self.match(_t)]
 
-    def build_endswith(self, part):
-        """以...结尾: 遍历匹配一个就为True"""
-        content = getattr(self.token, part)
-        conditions = getattr(self.conditions, part)
-        if conditions.endswith:
-            for _c in conditions.endswith:
-                if content.endswith(_c):
-                    return True
-            return False
-        return True
 
-    def build_not_endswith(self, part):
-        """不以...结尾: 遍历匹配一个就为False"""
-        content = getattr(self.token, part)
-        conditions = getattr(self.conditions, part)
-        if conditions.not_endswith:
-            for _c in conditions.not_endswith:
-                if content.endswith(_c):
-                    return False
-        return True
+str_matcher: StrMatcher = StrMatcher.compile()
@@ -0,0 +1,161 @@
+import json
+import os
+import typing
+from dataclasses import asdict, dataclass, field
+
+from common import Prompt
+from common.config import cache, language
+from common.utils import atomic_write, file_digest
+from marker.plugins.str_conditions import str_conditions
+from marker.utils.token import TokenStore
+from marker.utils.translation_func import django_translate_func_config
+
+# 缓存格式版本, 缓存结构变化时需要递增, 3: 由pickle改为JSON, 4: 隐式拼接的字符串合并为一个token
+CACHE_VERSION = 4
+# 标记缓存文件名, 缓存目录可能被提交或植入, 只使用JSON保存, 加载时不会执行任何代码
+MARKER_CACHE_FILE = "marker.json"
+
+
+@dataclass
+class CacheRecord:
+    """
+    单个文件的缓存记录
+    :param mtime_ns: 文件修改时间
+    :param size: 文件大小
+    :param digest: 文件内容摘要
+    :param tokens: 提取到的合法token
+    :param illegal_tokens: 非法token
+    :param marked: 文件内容已是标记后的稳定状态, 再次标记不会产生任何改动
+    """
+
+    mtime_ns: int
+    size: int
+    digest: str
+    tokens: TokenStore = field(default_factory=TokenStore)
+    illegal_tokens: TokenStore = field(default_factory=TokenStore)
+    marked: bool = False
+
+    def to_list(self) -> list:
+        return [
+            self.mtime_ns,
+            self.size,
+            self.digest,
+            self.tokens.to_list(),
+            self.illegal_tokens.to_list(),
+            self.marked,
+        ]
+
+    @classmethod
+    def from_list(cls, data: list) -> "CacheRecord":
+        """
+        从to_list的结果恢复
+        :raise ValueError: 数据不完整或类型不正确
+        """
+        mtime_ns, size, digest, tokens, illegal_tokens, marked = data
+        if not isinstance(mtime_ns, int) or not isinstance(size, int) or not isinstance(digest, str):
+            raise ValueError("invalid file state")
+        return cls(
+            mtime_ns=mtime_ns,
+            size=size,
+            digest=digest,
+            tokens=TokenStore.from_list(tokens),
+            illegal_tokens=TokenStore.from_list(illegal_tokens),
+            marked=bool(marked),
+        )
+
+
+def config_fingerprint(strict_mode: bool) -> str:
+    """影响标记结果的配置指纹, 配置变化时缓存整体失效"""
+    data = {
+        "version": CACHE_VERSION,
+        "str_conditions": asdict(str_conditions),
+        "language": [language.current, language.re],
+        "translation_func": asdict(django_translate_func_config),
+        "strict_mode": strict_mode,
+    }
+    return json.dumps(data, sort_keys=True, ensure_ascii=False)
+
+
+class MarkerCache:
+    """
+    增量标记缓存
+    以文件绝对路径为key, 记录文件的mtime/size/内容摘要以及提取结果, 未变更的文件可以直接复用
+    :param fingerprint: 配置指纹
+    :param path: 缓存目录
+    """
+
+    def __init__(self, fingerprint: str, path: str = cache.path):
+        self._fp = os.path.join(path, MARKER_CACHE_FILE)
+        self._fingerprint = fingerprint
+        self._records: typing.Dict[str, CacheRecord] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self._fp, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            Prompt.warning("Ignore broken marker cache {fp}: {e}", fp=self._fp, e=e)
+            return
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            self._dirty = True
+            return
+        if data.get("fingerprint") != self._fingerprint:
+            Prompt.info("Marker config changed, cache invalidated")
+            self._dirty = True
+            return
+        try:
+            self._records = {_fp: CacheRecord.from_list(_r) for _fp, _r in data["records"].items()}
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            Prompt.warning("Ignore broken marker cache {fp}: {e}", fp=self._fp, e=e)
+            self._dirty = True
+
+    def get(self, filepath: str) -> typing.Optional[CacheRecord]:
+        """获取未变更文件的缓存记录, mtime变化但内容不变时同样视为命中"""
+        _record = self._records.get(os.path.abspath(filepath))
+        if not _record:
+            return None
+        _stat = os.stat(filepath)
+        if _stat.st_size != _record.size:
+            return None
+        if _stat.st_mtime_ns != _record.mtime_ns:
+            if file_digest(filepath) != _record.digest:
+                return None
+            _record.mtime_ns = _stat.st_mtime_ns
+            self._dirty = True
+        return _record
+
+    def put(self, filepath: str, record: CacheRecord):
+        self._records[os.path.abspath(filepath)] = record
+        self._dirty = True
+
+    def discard(self, filepath: str):
+        if self._records.pop(os.path.abspath(filepath), None):
+            self._dirty = True
+
+    def retain(self, target_path: str, filepaths: typing.Iterable[str]):
+        """清理target_path下已不存在或已被过滤的文件记录"""
+        # 以路径分隔符结尾, 避免清理/a/b时误删/a/bc下的记录
+        _target = os.path.join(os.path.abspath(target_path), "")
+        _alive = {os.path.abspath(_fp) for _fp in filepaths}
+        for _fp in list(self._records.keys()):
+            if _fp.startswith(_target) and _fp not in _alive:
+                del self._records[_fp]
+                self._dirty = True
+
+    def save(self):
+        """原子写入缓存文件"""
+        if not self._dirty:
+            return
+        _dir = os.path.dirname(self._fp)
+        os.makedirs(_dir, exist_ok=True)
+        data = {
+            "version": CACHE_VERSION,
+            "fingerprint": self._fingerprint,
+            "records": {_fp: _r.to_list() for _fp, _r in self._records.items()},
+        }
+        atomic_write(self._fp, json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        self._dirty = False
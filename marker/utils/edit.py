@@ -0,0 +1,87 @@
+import difflib
+import itertools
+from dataclasses import dataclass
+
+
+class EditConflictError(Exception):
+    """编辑区间冲突"""
+
+
+@dataclass(frozen=True)
+class Edit:
+    """
+    单个编辑区间, 将原文[start, end)替换为replacement, start == end时为插入
+    :param start: 起始偏移量
+    :param end: 结束偏移量
+    :param replacement: 替换内容
+    """
+
+    start: int
+    end: int
+    replacement: str
+
+
+class EditSet:
+    """
+    文件级编辑集合
+    收集整个文件互不重叠的编辑区间, 最后一次线性拼接完成所有修改, 同一份区间也可以用来生成diff
+    :param text: 原文
+    """
+
+    def __init__(self, text: str):
+        self._text = text
+        self._edits: list[Edit] = []
+        # 每行起始位置的偏移量, 行号从1开始
+        self._line_offsets = [0, *itertools.accumulate(len(_line) + 1 for _line in text.split("\n"))]
+
+    def __bool__(self):
+        return bool(self._edits)
+
+    def offset(self, row: int, col: int) -> int:
+        """tokenize的(行, 列)转换为原文偏移量"""
+        return self._line_offsets[row - 1] + col
+
+    def replace(self, start: int, end: int, replacement: str):
+        self._edits.append(Edit(start=start, end=end, replacement=replacement))
+
+    def insert(self, offset: int, content: str):
+        self._edits.append(Edit(start=offset, end=offset, replacement=content))
+
+    def _sorted(self) -> list[Edit]:
+        """按位置排序并检查冲突, 同一位置的插入排在替换之前"""
+        edits = sorted(self._edits, key=lambda e: (e.start, e.end))
+        for _prev, _edit in zip(edits, edits[1:]):
+            if _edit.start < _prev.end or (_edit.start == _prev.start and _edit.end == _prev.end):
+                raise EditConflictError(
+                    f"edit [{_edit.start}, {_edit.end}) conflicts with [{_prev.start}, {_prev.end})"
+                )
+        return edits
+
+    def apply(self) -> str:
+        """应用所有编辑, 返回修改后的内容"""
+        if not self._edits:
+            return self._text
+        pieces = []
+        cursor = 0
+        for _edit in self._sorted():
+            pieces.append(self._text[cursor : _edit.start])
+            pieces.append(_edit.replacement)
+            cursor = _edit.end
+        pieces.append(self._text[cursor:])
+        return "".join(pieces)
+
+    def diff(self, filepath: str) -> str:
+        """
+        生成unified diff, 可以直接用git apply/patch -p1应用
+        :param filepath: diff头中的文件路径, 使用相对路径, 如: pkg/models.py
+        """
+        if not self._edits:
+            return ""
+        lines = difflib.unified_diff(
+            self._text.splitlines(keepends=True),
+            self.apply().splitlines(keepends=True),
+            fromfile=f"a/{filepath}",
+            tofile=f"b/{filepath}",
+        )
+        # 文件末尾没有换行时, 补充标准的提示行, 否则diff格式不完整
+        return "".join(_l if _l.endswith("\n") else _l + "\n\\ No newline at end of file\n" for _l in lines)
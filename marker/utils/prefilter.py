@@ -0,0 +1,82 @@
+import re
+import tokenize
+import typing
+
+from common.config import language
+from common.constants import LanguageCharRangeEnum, LanguageRegexEnum
+
+# utf-8各字节长度对应的码点上限
+_UTF8_BOUNDARIES = (0x7F, 0x7FF, 0xFFFF, 0x10FFFF)
+# 可以预筛选的文件编码, 其余编码的文件一律交给tokenize处理
+_UTF8_ENCODINGS = ("utf-8", "utf-8-sig")
+
+
+def _split_by_utf8_length(lo: int, hi: int) -> typing.Generator[tuple[int, int], None, None]:
+    """按utf-8编码长度拆分码点区间"""
+    start = lo
+    for boundary in _UTF8_BOUNDARIES:
+        if start > hi:
+            return
+        if start <= boundary:
+            yield start, min(hi, boundary)
+            start = boundary + 1
+
+
+def _utf8_pattern(lo: int, hi: int) -> bytes:
+    """
+    码点区间对应的utf-8字节正则
+    多字节字符只限定首字节范围, 后续字节为任意续字节, 结果是原区间的超集, 满足预筛选不漏判的要求
+    """
+    lo_bytes = chr(lo).encode("utf-8", "surrogatepass")
+    hi_bytes = chr(hi).encode("utf-8", "surrogatepass")
+    pattern = b"[\\x%02x-\\x%02x]" % (lo_bytes[0], hi_bytes[0])
+    return pattern + b"[\\x80-\\xbf]" * (len(lo_bytes) - 1)
+
+
+def compile_bytes_pattern(ranges: typing.Iterable[tuple[int, int]]) -> typing.Optional[re.Pattern]:
+    """
+    将码点区间转换为作用于utf-8原始字节的正则
+    如: [(0x4E00, 0x9FA5)] -> [\xe4-\xe9][\x80-\xbf][\x80-\xbf]
+    没有区间时返回None, 即不做预筛选
+    """
+    alternatives = [_utf8_pattern(_lo, _hi) for lo, hi in ranges for _lo, _hi in _split_by_utf8_length(lo, hi)]
+    if not alternatives:
+        return None
+    return re.compile(b"|".join(dict.fromkeys(alternatives)))
+
+
+class BytePrefilter:
+    """
+    字节级预筛选
+    直接在文件原始字节上搜索当前语言字符, 不包含当前语言文本的文件无需tokenize
+    只支持内置的语言正则, 用户自定义正则时无法保证不漏判, 不做预筛选
+    :param current: 当前语言
+    :param language_re: 当前语言正则
+    """
+
+    def __init__(self, current: str = language.current, language_re: str = language.re):
+        ranges = LanguageCharRangeEnum.get(current, ()) if language_re == LanguageRegexEnum.get(current) else ()
+        self._pattern = compile_bytes_pattern(ranges)
+
+    @property
+    def enabled(self) -> bool:
+        return self._pattern is not None
+
+    def scan(self, content: typing.Any) -> bool:
+        """
+        判断内容中是否可能包含当前语言文本
+        :param content: 支持readline的字节缓冲, 如mmap
+        """
+        pattern = self._pattern
+        if pattern is None:
+            return True
+        try:
+            encoding, __ = tokenize.detect_encoding(content.readline)
+        except SyntaxError:
+            return True
+        if encoding not in _UTF8_ENCODINGS:
+            return True
+        return pattern.search(content) is not None
+
+
+byte_prefilter = BytePrefilter()
@@ -1,14 +1,16 @@
 import tokenize
+import typing
+from array import array
 from dataclasses import dataclass
-from io import StringIO
+from io import BytesIO, StringIO
 from tokenize import TokenInfo
 from typing import Generator
 
-from common.utils import read_file
+from common.constants import DEFAULT_ENCODING
+from common.utils import decode_bytes
 
 
-@dataclass
-class TokenPoint:
+class TokenPoint(typing.NamedTuple):
     """
     :param row: 行号
     :param col: 列号
@@ -18,9 +20,12 @@ class TokenPoint:
     col: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
-    """Token"""
+    """
+    Token
+    source_line直接引用tokenize产出的行文本, 同一行的token共享同一个字符串, 只在文件标记期间可用
+    """
 
     start_at: TokenPoint
     end_at: TokenPoint
@@ -29,5 +34,160 @@ class Token:
     source_line: str = ""
 
 
-def generate_tokens(fp: str) -> Generator[TokenInfo, None, None]:
-    return tokenize.generate_tokens(StringIO(read_file(fp)).readline)
+class TokenStore(typing.Sequence[Token]):
+    """
+    紧凑的字符串token存储
+    位置按(起始行, 起始列, 结束行, 结束列)存放在array中, 文本拼接成一个字符串按偏移量切分, 不保存source_line
+    遍历/下标访问时生成Token视图, 全项目提取时内存占用与token文本总长度相当
+    :param tokens: 初始token
+    """
+
+    __slots__ = ("_positions", "_offsets", "_text", "_parts")
+
+    def __init__(self, tokens: typing.Iterable[Token] = ()):
+        self._positions = array("I")
+        self._offsets = array("I", [0])
+        self._text = ""
+        # 尚未拼接到_text的文本
+        self._parts: list[str] = []
+        self.extend(tokens)
+
+    def append(self, token: Token):
+        self._positions.extend((*token.start_at, *token.end_at))
+        self._parts.append(token.token)
+        self._offsets.append(self._offsets[-1] + len(token.token))
+
+    def extend(self, tokens: typing.Iterable[Token]):
+        if not isinstance(tokens, TokenStore):
+            for _t in tokens:
+                self.append(_t)
+            return
+        tokens._compact()
+        base = self._offsets[-1]
+        self._positions.extend(tokens._positions)
+        self._offsets.extend(base + _o for _o in tokens._offsets[1:])
+        self._parts.append(tokens._text)
+
+    def _compact(self):
+        if self._parts:
+            self._text += "".join(self._parts)
+            self._parts = []
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @typing.overload
+    def __getitem__(self, index: int) -> Token:
+        ...
+
+    @typing.overload
+    def __getitem__(self, index: slice) -> "TokenStore":
+        ...
+
+    def __getitem__(self, index: typing.Union[int, slice]) -> typing.Union[Token, "TokenStore"]:
+        if isinstance(index, slice):
+            return TokenStore(self[_i] for _i in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("token index out of range")
+        self._compact()
+        _p = self._positions
+        _i = index * 4
+        return Token(
+            start_at=TokenPoint(_p[_i], _p[_i + 1]),
+            end_at=TokenPoint(_p[_i + 2], _p[_i + 3]),
+            type=tokenize.STRING,
+            token=self._text[self._offsets[index] : self._offsets[index + 1]],
+        )
+
+    def __iter__(self) -> typing.Iterator[Token]:
+        for _i in range(len(self)):
+            yield self[_i]
+
+    def texts(self) -> typing.Iterator[str]:
+        """只遍历token文本, 不生成Token视图"""
+        self._compact()
+        _o = self._offsets
+        for _i in range(len(self)):
+            yield self._text[_o[_i] : _o[_i + 1]]
+
+    def to_list(self) -> list:
+        """转为JSON可保存的[位置, 偏移量, 文本]"""
+        self._compact()
+        return [self._positions.tolist(), self._offsets.tolist(), self._text]
+
+    @classmethod
+    def from_list(cls, data: list) -> "TokenStore":
+        """
+        从to_list的结果恢复
+        :raise ValueError: 数据不完整或不一致
+        """
+        positions, offsets, text = data
+        store = cls()
+        try:
+            store._positions = array("I", positions)
+            store._offsets = array("I", offsets)
+        except (TypeError, OverflowError) as e:
+            raise ValueError(f"invalid token positions: {e}") from e
+        if not isinstance(text, str) or not store._offsets or store._offsets[0] != 0:
+            raise ValueError("invalid token text or offsets")
+        if len(store._positions) != 4 * len(store) or store._offsets[-1] != len(text):
+            raise ValueError("inconsistent token store")
+        store._text = text
+        return store
+
+    def __getstate__(self):
+        self._compact()
+        return self._positions, self._offsets, self._text
+
+    def __setstate__(self, state):
+        self._positions, self._offsets, self._text = state
+        self._parts = []
+
+    def __repr__(self):
+        return f"TokenStore({list(self.texts())!r})"
+
+
+def is_fstring(text: str) -> bool:
+    """字符串字面量是否为f-string, 前缀可以是f/F/rf/fR等组合"""
+    return "f" in text[: len(text) - len(text.lstrip("rRbBuUfF"))].lower()
+
+
+def literal_body(text: str) -> str:
+    """字符串字面量去掉前缀和引号后的内容, 不处理转义, 如: u'中文' -> 中文"""
+    text = text.lstrip("rRbBuUfF")
+    quote = text[:3] if text[:3] in ('"""', "'''") else text[:1]
+    return text[len(quote) : len(text) - len(quote)]
+
+
+def join_literals(tokens: typing.Sequence[Token]) -> Token:
+    """
+    合并隐式拼接的字符串, 如: "abc" "中文" -> "abc中文"
+    与运行时拼接后的值一致, 提取的msgid与整组包裹后翻译函数收到的字符串相同
+    """
+    return Token(
+        start_at=tokens[0].start_at,
+        end_at=tokens[-1].end_at,
+        type=tokenize.STRING,
+        token='"' + "".join(literal_body(_t.token) for _t in tokens) + '"',
+        source_line=tokens[0].source_line,
+    )
+
+
+def decode_source(content: bytes) -> tuple[str, str]:
+    """
+    按PEP 263检测py文件编码并解码
+    :return: (编码, 源码文本)
+    """
+    try:
+        encoding, __ = tokenize.detect_encoding(BytesIO(content).readline)
+    except SyntaxError:
+        # 编码声明非法时按默认编码处理
+        encoding = DEFAULT_ENCODING
+    return encoding, decode_bytes(content, encoding=encoding)
+
+
+def generate_tokens(source: str) -> Generator[TokenInfo, None, None]:
+    """对已解码的源码文本进行tokenize"""
+    return tokenize.generate_tokens(StringIO(source).readline)
@@ -0,0 +1,4 @@
+import os
+
+# 配置在导入时加载, 测试统一使用模板配置
+os.environ.setdefault("CONFIG_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "jinx.template.toml"))
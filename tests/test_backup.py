@@ -0,0 +1,99 @@
+import gzip
+import os
+import stat
+
+import pytest
+
+from common.backup import SNAPSHOT_SUFFIX, BackupStore
+from common.utils import content_digest
+
+
+def _write(fp, content: str, mtime: int):
+    with open(fp, "w", encoding="utf-8") as f:
+        f.write(content)
+    # 保证每次写入的mtime不同, 不依赖文件系统的时间精度
+    os.utime(fp, ns=(mtime * 10**9, mtime * 10**9))
+
+
+@pytest.fixture
+def po_file(tmp_path) -> str:
+    fp = str(tmp_path / "django.po")
+    _write(fp, 'msgid "中文"\nmsgstr ""\n', 1)
+    return fp
+
+
+def _stored(po_file: str) -> set[str]:
+    """已保存的快照文件"""
+    backup_dir = os.path.join(os.path.dirname(po_file), ".jinx_backups", "django.po")
+    return {_f[: -len(SNAPSHOT_SUFFIX)] for _f in os.listdir(backup_dir) if _f.endswith(SNAPSHOT_SUFFIX)}
+
+
+def test_snapshot_dedup(po_file):
+    store = BackupStore(po_file, keep=5)
+    first = store.snapshot()
+    assert first is not None
+    assert first.digest == content_digest(open(po_file, "rb").read())
+    # 内容未变化时跳过
+    assert store.snapshot() is None
+    _write(po_file, 'msgid "中文"\nmsgstr ""\n', 2)
+    assert store.snapshot() is None
+    _write(po_file, 'msgid "中文"\nmsgstr "Chinese"\n', 3)
+    second = store.snapshot()
+    assert second is not None and second.digest != first.digest
+    # 内容与更早的快照相同时只移动索引, 不重复保存
+    _write(po_file, 'msgid "中文"\nmsgstr ""\n', 4)
+    third = store.snapshot()
+    assert third is not None and third.digest == first.digest
+    assert [_s.digest for _s in store.snapshots] == [second.digest, first.digest]
+    assert _stored(po_file) == {first.digest, second.digest}
+
+
+def test_snapshot_retention(po_file):
+    store = BackupStore(po_file, keep=2)
+    digests = []
+    for _i in range(4):
+        _write(po_file, f'msgid "中文"\nmsgstr "{_i}"\n', _i + 10)
+        digests.append(store.snapshot().digest)
+    # 超出保留数量的旧快照连同文件一起清理
+    assert [_s.digest for _s in store.snapshots] == digests[-2:]
+    assert _stored(po_file) == set(digests[-2:])
+
+
+def test_restore_round_trip(po_file, capsys):
+    original = open(po_file, "rb").read()
+    os.chmod(po_file, 0o640)
+    store = BackupStore(po_file, keep=5)
+    first = store.snapshot()
+    _write(po_file, 'msgid "中文"\nmsgstr "Chinese"\n', 2)
+    modified = open(po_file, "rb").read()
+
+    restored = store.restore(first.digest[:8])
+    assert restored == first
+    assert open(po_file, "rb").read() == original
+    assert stat.S_IMODE(os.stat(po_file).st_mode) == 0o640
+    # 恢复前备份了当前内容, 可以撤销
+    assert store.snapshots[-1].digest == content_digest(modified)
+    store.restore(content_digest(modified))
+    assert open(po_file, "rb").read() == modified
+    assert "Restored" in capsys.readouterr().out
+
+
+def test_restore_corrupted(po_file):
+    store = BackupStore(po_file)
+    snapshot = store.snapshot()
+    with open(store._snapshot_path(snapshot.digest), "wb") as f:
+        f.write(gzip.compress(b"broken"))
+    _write(po_file, "changed", 2)
+    with pytest.raises(SystemExit):
+        store.restore()
+    assert open(po_file, encoding="utf-8").read() == "changed"
+
+
+def test_find(po_file):
+    store = BackupStore(po_file)
+    with pytest.raises(SystemExit):
+        store.find()
+    snapshot = store.snapshot()
+    assert store.find() == snapshot
+    with pytest.raises(SystemExit):
+        store.find("not-a-digest")
@@ -0,0 +1,142 @@
+import gettext
+import os
+
+import pytest
+
+from common.constants import CompileStatusEnum
+from compiler import compiler as compiler_module
+from compiler.compiler import CompileTool, find_po_files, mo_file_path
+
+PO = """msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "中文"
+msgstr "{msgstr}"
+"""
+
+
+@pytest.fixture(autouse=True)
+def manifest(monkeypatch, tmp_path):
+    """编译清单保存在当前目录下的缓存目录, 测试中切换到临时目录"""
+    monkeypatch.setattr(compiler_module.cache, "enabled", True)
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def summaries(monkeypatch) -> list[dict]:
+    """记录每次编译的汇总结果"""
+    recorded: list[dict] = []
+    monkeypatch.setattr(CompileTool, "_print_summary", staticmethod(lambda summary: recorded.append(dict(summary))))
+    return recorded
+
+
+def _po(tmp_path, lang: str = "en", msgstr: str = "Chinese", mtime: int = 10) -> str:
+    path = tmp_path / "locale" / lang / "LC_MESSAGES"
+    path.mkdir(parents=True, exist_ok=True)
+    fp = str(path / "django.po")
+    with open(fp, "w", encoding="utf-8") as f:
+        f.write(PO.format(msgstr=msgstr))
+    _touch(fp, mtime)
+    return fp
+
+
+def _touch(fp: str, mtime: int):
+    os.utime(fp, ns=(mtime * 10**9, mtime * 10**9))
+
+
+def _translate(po_file: str) -> str:
+    with open(mo_file_path(po_file), "rb") as f:
+        return gettext.GNUTranslations(f).gettext("中文")
+
+
+def _summary(compiled: int = 0, skipped: int = 0, failed: int = 0) -> dict:
+    return {
+        CompileStatusEnum.COMPILED: compiled,
+        CompileStatusEnum.SKIPPED: skipped,
+        CompileStatusEnum.FAILED: failed,
+    }
+
+
+def test_compile_then_skip_by_mtime(tmp_path, summaries):
+    po_file = _po(tmp_path)
+    CompileTool(po_file).handle()
+    assert _translate(po_file) == "Chinese"
+    mo_mtime = os.stat(mo_file_path(po_file)).st_mtime_ns
+    # mo比po新时跳过
+    CompileTool(po_file).handle()
+    assert summaries == [_summary(compiled=1), _summary(skipped=1)]
+    assert os.stat(mo_file_path(po_file)).st_mtime_ns == mo_mtime
+
+
+def test_skip_by_manifest(tmp_path, summaries, monkeypatch):
+    po_file = _po(tmp_path)
+    CompileTool(po_file).handle()
+    # po的mtime比mo新但内容不变, 如git checkout, 通过清单中的摘要跳过
+    _touch(po_file, 2 * 10**9)
+    CompileTool(po_file).handle()
+    # 内容变化时重新编译
+    _po(tmp_path, msgstr="Chinese language", mtime=2 * 10**9)
+    CompileTool(po_file).handle()
+    assert _translate(po_file) == "Chinese language"
+    # 不使用缓存时没有清单, 只能按mtime判断
+    _touch(po_file, 3 * 10**9)
+    monkeypatch.setattr(compiler_module.cache, "enabled", False)
+    CompileTool(po_file).handle()
+    assert summaries == [_summary(compiled=1), _summary(skipped=1), _summary(compiled=1), _summary(compiled=1)]
+
+
+def test_force(tmp_path, summaries):
+    po_file = _po(tmp_path)
+    CompileTool(po_file).handle()
+    CompileTool(po_file, force=True).handle()
+    assert summaries == [_summary(compiled=1), _summary(compiled=1)]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_all_catalogs(tmp_path, summaries, jobs):
+    po_files = [_po(tmp_path, _lang, msgstr=_lang) for _lang in ("en", "ja", "zh_Hant")]
+    # 不在LC_MESSAGES下的po文件不编译
+    (tmp_path / "locale" / "stray.po").write_text(PO.format(msgstr="stray"), encoding="utf-8")
+    (tmp_path / "locale" / "en" / "other").mkdir()
+    (tmp_path / "locale" / "en" / "other" / "django.po").write_text(PO.format(msgstr="other"), encoding="utf-8")
+    root = str(tmp_path / "locale")
+    assert find_po_files(root) == sorted(po_files)
+    CompileTool(root, all_catalogs=True, jobs=jobs).handle()
+    assert [_translate(_f) for _f in po_files] == ["en", "ja", "zh_Hant"]
+    assert not os.path.exists(tmp_path / "locale" / "stray.mo")
+    assert not os.path.exists(tmp_path / "locale" / "en" / "other" / "django.mo")
+    # 只有变更的po文件重新编译
+    _po(tmp_path, "ja", msgstr="日本語", mtime=2 * 10**9)
+    CompileTool(root, all_catalogs=True, jobs=jobs).handle()
+    assert _translate(po_files[1]) == "日本語"
+    assert summaries == [_summary(compiled=3), _summary(compiled=1, skipped=2)]
+
+
+def test_failed_compile_keeps_old_mo(tmp_path, summaries, monkeypatch, capsys):
+    po_file = _po(tmp_path)
+    CompileTool(po_file).handle()
+    mo_file = mo_file_path(po_file)
+    with open(mo_file, "rb") as f:
+        old_mo = f.read()
+
+    def broken_write_mo(po_file: str, mo_file: str):
+        with open(mo_file, "wb") as f:
+            f.write(b"partial")
+        raise ValueError("broken catalog")
+
+    monkeypatch.setattr(compiler_module, "write_mo", broken_write_mo)
+    _po(tmp_path, msgstr="Chinese language", mtime=2 * 10**9)
+    CompileTool(po_file).handle()
+    assert summaries[-1] == _summary(failed=1)
+    assert "broken catalog" in capsys.readouterr().out
+    # 原mo文件不变, 临时文件被清理
+    with open(mo_file, "rb") as f:
+        assert f.read() == old_mo
+    assert sorted(os.listdir(os.path.dirname(po_file))) == ["django.mo", "django.po"]
+    # 失败的po文件下次仍会重新编译
+    monkeypatch.undo()
+    monkeypatch.setattr(compiler_module.cache, "enabled", True)
+    monkeypatch.chdir(tmp_path)
+    CompileTool(po_file).handle()
+    assert _translate(po_file) == "Chinese language"
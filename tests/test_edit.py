@@ -0,0 +1,81 @@
+import pytest
+
+from marker.utils.edit import EditConflictError, EditSet
+
+TEXT = 'a = "中文"\nb = "文本"\n'
+
+
+def test_offset():
+    edits = EditSet(TEXT)
+    assert edits.offset(1, 0) == 0
+    assert edits.offset(2, 4) == TEXT.index('"文本"')
+
+
+def test_apply_without_edits():
+    edits = EditSet(TEXT)
+    assert not edits
+    assert edits.apply() == TEXT
+    assert edits.diff("a.py") == ""
+
+
+def test_apply_in_any_order():
+    edits = EditSet(TEXT)
+    for row in (2, 1):
+        start = edits.offset(row, 4)
+        edits.replace(start, start + 4, f"_({TEXT[start:start + 4]})")
+    edits.insert(0, "from django.utils.translation import gettext_lazy as _\n")
+    assert edits.apply() == 'from django.utils.translation import gettext_lazy as _\na = _("中文")\nb = _("文本")\n'
+
+
+def test_insert_before_replace_at_same_offset():
+    edits = EditSet("abc")
+    edits.replace(0, 1, "X")
+    edits.insert(0, ">")
+    assert edits.apply() == ">Xbc"
+
+
+def test_adjacent_edits_do_not_conflict():
+    edits = EditSet("abcd")
+    edits.replace(0, 2, "X")
+    edits.replace(2, 4, "Y")
+    assert edits.apply() == "XY"
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ((0, 3), (2, 4)),  # 部分重叠
+        ((0, 4), (1, 2)),  # 包含
+        ((1, 2), (1, 2)),  # 相同区间
+        ((1, 1), (1, 1)),  # 同一位置的两次插入
+    ],
+)
+def test_overlapping_edits_conflict(first, second):
+    edits = EditSet("abcd")
+    edits.replace(*first, "X")
+    edits.replace(*second, "Y")
+    with pytest.raises(EditConflictError):
+        edits.apply()
+
+
+def test_diff():
+    edits = EditSet(TEXT)
+    start = edits.offset(1, 4)
+    edits.replace(start, start + 4, '_("中文")')
+    assert edits.diff("app/a.py").splitlines() == [
+        "--- a/app/a.py",
+        "+++ b/app/a.py",
+        "@@ -1,2 +1,2 @@",
+        '-a = "中文"',
+        '+a = _("中文")',
+        ' b = "文本"',
+    ]
+
+
+def test_diff_without_trailing_newline():
+    edits = EditSet('a = "中文"')
+    edits.replace(4, 8, '_("中文")')
+    assert edits.diff("a.py") == (
+        '--- a/a.py\n+++ b/a.py\n@@ -1 +1 @@\n-a = "中文"\n\\ No newline at end of file\n'
+        '+a = _("中文")\n\\ No newline at end of file\n'
+    )
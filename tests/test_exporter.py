@@ -0,0 +1,160 @@
+import csv
+import io
+import json
+import os
+import subprocess
+
+import pytest
+
+from common.po_reader import PoRecord
+from exporter.exporter import ExportTool
+from exporter.formats import WRITERS, json_key
+from importer.formats import iter_json
+
+PO = """msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "中文"
+msgstr "Chinese"
+
+msgid "未翻译"
+msgstr ""
+
+#, fuzzy
+msgid "模糊"
+msgstr "Fuzzy"
+
+msgctxt "菜单"
+msgid "文件"
+msgstr "File (menu)"
+
+msgid "文件"
+msgstr "File"
+
+#~ msgid "废弃"
+#~ msgstr "Obsolete"
+"""
+
+RECORDS = [
+    PoRecord(msgid="中文", msgstr="Chinese"),
+    PoRecord(msgid="文件", msgstr="File (menu)", msgctxt="菜单", flags=("fuzzy",)),
+    PoRecord(msgid="文件", msgstr="File"),
+    PoRecord(msgid='引号"\n换行', msgstr='quote"\nnewline', msgctxt=""),
+]
+
+
+def _export(fmt: str, records: list[PoRecord]) -> str:
+    f = io.StringIO()
+    writer = WRITERS[fmt](f)
+    writer.begin()
+    for _r in records:
+        writer.write(_r)
+    writer.end()
+    assert writer.count == len(records)
+    return f.getvalue()
+
+
+def test_json_writer():
+    content = _export("json", RECORDS)
+    # 不同msgctxt下的同一msgid不会互相覆盖, 空msgctxt与没有msgctxt不同
+    assert json.loads(content) == {
+        "中文": "Chinese",
+        "菜单\x04文件": "File (menu)",
+        "文件": "File",
+        '\x04引号"\n换行': 'quote"\nnewline',
+    }
+    assert [(_e.msgid, _e.msgstr, _e.msgctxt) for _e in iter_json(io.StringIO(content))] == [
+        (_r.msgid, _r.msgstr, _r.msgctxt) for _r in RECORDS
+    ]
+    assert json.loads(_export("json", [])) == {}
+    assert json_key("文件") == "文件"
+    assert json_key("文件", "菜单") == "菜单\x04文件"
+
+
+def test_jsonl_writer():
+    lines = _export("jsonl", RECORDS).splitlines()
+    assert [json.loads(_l) for _l in lines] == [
+        {"msgctxt": _r.msgctxt, "msgid": _r.msgid, "msgstr": _r.msgstr, "fuzzy": _r.fuzzy} for _r in RECORDS
+    ]
+
+
+def test_csv_writer():
+    rows = list(csv.reader(io.StringIO(_export("csv", RECORDS), newline="")))
+    assert rows == [["msgctxt", "msgid", "msgstr", "fuzzy"]] + [
+        ["" if _r.msgctxt is None else _r.msgctxt, _r.msgid, _r.msgstr, str(_r.fuzzy)] for _r in RECORDS
+    ]
+    assert _export("csv", []) == "msgctxt,msgid,msgstr,fuzzy\r\n"
+
+
+@pytest.fixture
+def po_file(tmp_path, monkeypatch) -> str:
+    """导出快照保存在当前目录下的缓存目录, 测试中切换到临时目录"""
+    monkeypatch.chdir(tmp_path)
+    fp = tmp_path / "django.po"
+    fp.write_text(PO, encoding="utf-8")
+    return str(fp)
+
+
+def _exported(po_file: str, **kwargs) -> list[tuple]:
+    export_path = os.path.join(os.path.dirname(po_file), "review.jsonl")
+    ExportTool(po_file, export_path=export_path, **kwargs).handle()
+    with open(export_path, encoding="utf-8") as f:
+        return [(_i["msgctxt"], _i["msgid"]) for _i in map(json.loads, f)]
+
+
+ALL = [(None, "中文"), (None, "未翻译"), (None, "模糊"), ("菜单", "文件"), (None, "文件")]
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    [
+        # 废弃条目始终跳过
+        ({}, ALL),
+        ({"untranslated_only": True}, [(None, "未翻译")]),
+        ({"fuzzy_only": True}, [(None, "模糊")]),
+        ({"untranslated_only": True, "fuzzy_only": True}, [(None, "未翻译"), (None, "模糊")]),
+    ],
+)
+def test_filters(po_file, kwargs, expected):
+    assert _exported(po_file, **kwargs) == expected
+
+
+def _replace(po_file: str, old: str, new: str):
+    with open(po_file, encoding="utf-8") as f:
+        content = f.read()
+    with open(po_file, "w", encoding="utf-8") as f:
+        f.write(content.replace(old, new))
+
+
+def test_changed_since(po_file, tmp_path):
+    for _args in (
+        ["init", "-q"],
+        ["add", "django.po"],
+        ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "po"],
+    ):
+        subprocess.run(["git", *_args], cwd=tmp_path, check=True, capture_output=True)
+    assert _exported(po_file, changed_since="HEAD") == []
+    # 只有msgctxt不同的词条分别比较, 新增词条和变为fuzzy的词条也会导出
+    _replace(po_file, 'msgstr "File (menu)"', 'msgstr "File menu"')
+    _replace(po_file, 'msgid "中文"', '#, fuzzy\nmsgid "中文"')
+    _replace(po_file, "#~ msgid", 'msgid "新增"\nmsgstr ""\n\n#~ msgid')
+    assert _exported(po_file, changed_since="HEAD") == [(None, "中文"), ("菜单", "文件"), (None, "新增")]
+    # 多个条件同时生效: 未变化的fuzzy词条不导出
+    assert _exported(po_file, changed_since="HEAD", fuzzy_only=True) == [(None, "中文")]
+    with pytest.raises(SystemExit):
+        _exported(po_file, changed_since="no-such-ref")
+
+
+def test_delta(po_file):
+    assert _exported(po_file, delta=True) == ALL
+    # 没有变化时不再导出
+    assert _exported(po_file, delta=True) == []
+    _replace(po_file, 'msgstr "File"', 'msgstr "Document"')
+    assert _exported(po_file, delta=True) == [(None, "文件")]
+    assert _exported(po_file, delta=True) == []
+    # 与其它过滤条件同时生效, 被过滤的词条不记录到快照
+    _replace(po_file, 'msgstr "Chinese"', 'msgstr "Chinese language"')
+    _replace(po_file, 'msgstr "Fuzzy"', 'msgstr "Fuzzy entry"')
+    assert _exported(po_file, delta=True, fuzzy_only=True) == [(None, "模糊")]
+    assert _exported(po_file, delta=True) == [(None, "中文")]
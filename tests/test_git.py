@@ -0,0 +1,107 @@
+import os
+import subprocess
+
+import pytest
+
+from common.git import changed_files, git_root, show_file
+
+
+def _git(repo, *args: str):
+    subprocess.run(["git", *args], cwd=repo, capture_output=True, check=True)
+
+
+def _write(repo, rel_path: str, content: str = "A = 1\n"):
+    path = repo / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """包含一次提交的临时仓库"""
+    for _key in ("GIT_DIR", "GIT_WORK_TREE", "GIT_INDEX_FILE"):
+        monkeypatch.delenv(_key, raising=False)
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    _git(repo, "config", "user.email", "test@example.com")
+    _git(repo, "config", "user.name", "test")
+    _git(repo, "config", "core.quotepath", "true")
+    for _f in ("a.py", "old name.py", "pkg/b.py", "removed.py"):
+        _write(repo, _f)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "init")
+    return repo
+
+
+def _rel(repo, files: list[str]) -> list[str]:
+    root = os.path.realpath(repo)
+    return sorted(os.path.relpath(os.path.realpath(_f), root) for _f in files)
+
+
+def test_git_root(repo):
+    assert os.path.realpath(git_root(str(repo / "pkg" / "b.py"))) == os.path.realpath(repo)
+    assert os.path.realpath(git_root(str(repo / "pkg"))) == os.path.realpath(repo)
+
+
+def test_changed_files_clean(repo):
+    assert changed_files(str(repo)) == []
+    assert changed_files(str(repo), since="HEAD") == []
+
+
+def test_changed_files_worktree(repo):
+    _write(repo, "a.py", "A = 2\n")
+    _git(repo, "mv", "old name.py", "new name.py")
+    _git(repo, "rm", "-q", "removed.py")
+    _write(repo, "new dir/中文 文件.py")
+    _write(repo, "pkg/untracked.py")
+    expected = ["a.py", "new dir/中文 文件.py", "new name.py", "pkg/untracked.py"]
+    # 重命名只返回新路径, 删除的文件不返回, 带空格和非ASCII字符的路径原样返回
+    assert _rel(repo, changed_files(str(repo))) == expected
+    # 从子目录调用时同样返回仓库内全部变更
+    assert _rel(repo, changed_files(str(repo / "pkg"))) == expected
+
+
+def test_changed_files_since(repo):
+    _write(repo, "a.py", "A = 2\n")
+    _git(repo, "mv", "old name.py", "new name.py")
+    _git(repo, "rm", "-q", "removed.py")
+    _git(repo, "commit", "-q", "-a", "-m", "second")
+    _write(repo, "pkg/b.py", "B = 2\n")
+    _write(repo, "with space.py")
+    _write(repo, "ignored.py")
+    _write(repo, ".gitignore", "ignored.py\n")
+    assert _rel(repo, changed_files(str(repo), since="HEAD~1")) == [
+        ".gitignore",
+        "a.py",
+        "new name.py",
+        "pkg/b.py",
+        "with space.py",
+    ]
+    assert _rel(repo, changed_files(str(repo), since="HEAD")) == [".gitignore", "pkg/b.py", "with space.py"]
+
+
+def test_changed_files_bad_since(repo, capsys):
+    with pytest.raises(SystemExit):
+        changed_files(str(repo), since="no-such-ref")
+    assert "Failed to run git" in capsys.readouterr().out
+
+
+def test_changed_files_not_a_repo(tmp_path, monkeypatch, capsys):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    # 避免向上找到其它仓库
+    monkeypatch.setenv("GIT_CEILING_DIRECTORIES", str(tmp_path))
+    with pytest.raises(SystemExit):
+        changed_files(str(outside))
+    assert "Failed to run git" in capsys.readouterr().out
+
+
+def test_show_file(repo, capsys):
+    _write(repo, "old name.py", "A = 2\n")
+    assert show_file(str(repo / "old name.py"), "HEAD") == b"A = 1\n"
+    with pytest.raises(SystemExit):
+        show_file(str(repo / "a.py"), "no-such-ref")
+    with pytest.raises(SystemExit):
+        show_file(str(repo / "untracked.py"), "HEAD")
+    assert "Failed to read" in capsys.readouterr().out
@@ -0,0 +1,55 @@
+import random
+
+from translator.provider.base import match_official_dict
+from translator.provider.glossary import Glossary
+
+
+def _naive_longest(terms: list[str], text: str):
+    """逐个判断 term in text, 长度相同时取靠前的术语"""
+    found = ""
+    for _term in terms:
+        if _term in text and len(_term) > len(found):
+            found = _term
+    return found or None
+
+
+def test_longest_basic():
+    glossary = Glossary(["用户", "用户名", "名称", "", "户名不能"])
+    assert len(glossary) == 4
+    assert glossary.longest("请输入用户名") == "用户名"
+    assert glossary.longest("用户名不能为空") == "户名不能"
+    assert glossary.longest("名称") == "名称"
+    assert glossary.longest("密码") is None
+    assert glossary.longest("") is None
+    assert Glossary([]).longest("用户") is None
+
+
+def test_longest_tie_prefers_first():
+    assert Glossary(["名称", "用户"]).longest("用户名称") == "名称"
+    assert Glossary(["用户", "名称"]).longest("用户名称") == "用户"
+
+
+def test_longest_matches_naive():
+    rng = random.Random(0)
+    alphabet = "用户名称密码ab"
+    for _ in range(300):
+        terms = [
+            "".join(rng.choice(alphabet) for _ in range(rng.randrange(1, 5))) for _ in range(rng.randrange(1, 20))
+        ]
+        glossary = Glossary(terms)
+        for _ in range(10):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 30)))
+            assert glossary.longest(text) == _naive_longest(terms, text)
+
+
+def test_match_official_dict():
+    official_dict = {"用户名": "Username", "用户": "User", "密码": ""}
+    assert match_official_dict(official_dict, "用户名").full_match
+    assert match_official_dict(official_dict, "用户名").content == "Username"
+    result = match_official_dict(official_dict, "请输入用户名")
+    assert not result.full_match
+    assert result.content == "请输入Username"
+    # 官方词典中译文为空的词条不替换
+    assert match_official_dict(official_dict, "密码").content == "密码"
+    assert match_official_dict(official_dict, "请输入密码").content == "请输入密码"
+    assert match_official_dict({}, "用户").content == "用户"
@@ -0,0 +1,51 @@
+import io
+import json
+
+import pytest
+
+from importer.formats import (
+    ReviewedEntry,
+    iter_csv,
+    iter_json,
+    iter_json_object,
+    iter_jsonl,
+)
+
+DATA = {
+    "中文": "Chinese",
+    "数字": 1.5e-3,
+    "转义 \"引号\" \\ \n": "escape \"quote\" \\ \n",
+    "空": None,
+    "嵌套": {"a": [1, 2, {"b": "c"}]},
+    "长" * 50: "long" * 50,
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_iter_json_object_any_chunk_size(chunk_size, indent):
+    """任意读取块大小下, 结果都与json.loads一致, 包括在读取块边界被截断的数字/字符串"""
+    content = json.dumps(DATA, ensure_ascii=False, indent=indent)
+    assert dict(iter_json_object(io.StringIO(content), chunk_size=chunk_size)) == json.loads(content)
+
+
+@pytest.mark.parametrize("content", ["{}", " { } ", "{\n}"])
+def test_iter_json_object_empty(content):
+    assert list(iter_json_object(io.StringIO(content), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("content", ["", "[]", '{"a" 1}', '{"a": 1', '{"a": 1,}', "{1: 2}"])
+def test_iter_json_object_invalid(content):
+    with pytest.raises(ValueError):
+        list(iter_json_object(io.StringIO(content), chunk_size=2))
+
+
+def test_readers():
+    assert list(iter_json(io.StringIO('{"中文": "Chinese", "空": null}'))) == [
+        ReviewedEntry("中文", "Chinese"),
+        ReviewedEntry("空", ""),
+    ]
+    jsonl = '{"msgid": "文件", "msgstr": "File", "msgctxt": "菜单"}\n\n{"msgid": "中文"}\n'
+    assert list(iter_jsonl(io.StringIO(jsonl))) == [ReviewedEntry("文件", "File", "菜单"), ReviewedEntry("中文", "")]
+    csv = "msgctxt,msgid,msgstr,fuzzy\n菜单,文件,File,false\n,中文,Chinese,true\n"
+    assert list(iter_csv(io.StringIO(csv))) == [ReviewedEntry("文件", "File", "菜单"), ReviewedEntry("中文", "Chinese")]
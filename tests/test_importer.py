@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+import os
+
+import polib
+import pytest
+
+from common.constants import ImportConflictEnum
+from exporter.exporter import ExportTool
+from importer.importer import ImportTool
+
+PO = """msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "中文"
+msgstr ""
+
+msgctxt "菜单"
+msgid "文件"
+msgstr ""
+
+msgid "文件"
+msgstr ""
+
+msgid "一个"
+msgid_plural "多个"
+msgstr[0] ""
+msgstr[1] ""
+"""
+
+
+@pytest.fixture
+def po_file(tmp_path, monkeypatch) -> str:
+    """导出快照保存在当前目录下的缓存目录, 测试中切换到临时目录"""
+    monkeypatch.chdir(tmp_path)
+    fp = tmp_path / "django.po"
+    fp.write_text(PO, encoding="utf-8")
+    return str(fp)
+
+
+@pytest.fixture
+def summaries(monkeypatch) -> list[dict]:
+    recorded: list[dict] = []
+    monkeypatch.setattr(ImportTool, "_print_summary", staticmethod(lambda summary: recorded.append(dict(summary))))
+    return recorded
+
+
+def _translations(po_file: str) -> dict:
+    return {(_e.msgctxt, _e.msgid): _e.msgstr for _e in polib.pofile(po_file) if not _e.msgid_plural}
+
+
+REVIEWED = {(None, "中文"): "Chinese", ("菜单", "文件"): "File (menu)", (None, "文件"): "File"}
+
+
+def _review(fmt: str, path: str):
+    """模拟评审: 按导出格式填写译文"""
+    with open(path, encoding="utf-8", newline="") as f:
+        content = f.read()
+    if fmt == "json":
+        data = json.loads(content)
+        data = {_k: REVIEWED.get(("菜单", "文件") if "\x04" in _k else (None, _k), "one") for _k in data}
+        content = json.dumps(data, ensure_ascii=False)
+    elif fmt == "jsonl":
+        items = [json.loads(_l) for _l in content.splitlines()]
+        for _i in items:
+            _i["msgstr"] = REVIEWED.get((_i["msgctxt"], _i["msgid"]), "one")
+        content = "\n".join(json.dumps(_i, ensure_ascii=False) for _i in items)
+    else:
+        rows = list(csv.DictReader(io.StringIO(content, newline="")))
+        for _r in rows:
+            _r["msgstr"] = REVIEWED.get((_r["msgctxt"] or None, _r["msgid"]), "one")
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        content = buffer.getvalue()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+
+
+@pytest.mark.parametrize("fmt", ["json", "jsonl", "csv"])
+def test_round_trip(po_file, tmp_path, summaries, fmt):
+    """导出后评审再导入, msgctxt词条不会被误报为missing, 复数词条计入plural冲突"""
+    review = str(tmp_path / f"review.{fmt}")
+    ExportTool(po_file, export_path=review).handle()
+    _review(fmt, review)
+    ImportTool(po_file, import_path=review).handle()
+    assert _translations(po_file) == REVIEWED
+    plural = next(_e for _e in polib.pofile(po_file) if _e.msgid_plural)
+    assert set(plural.msgstr_plural.values()) == {""}
+    assert summaries == [
+        {
+            "read": 4,
+            "empty": 0,
+            ImportConflictEnum.MISSING: 0,
+            ImportConflictEnum.OBSOLETE: 0,
+            ImportConflictEnum.MODIFIED: 0,
+            ImportConflictEnum.PLURAL: 1,
+            "changed": 3,
+        }
+    ]
+
+
+@pytest.mark.parametrize(
+    "fmt, content, message",
+    [
+        ("csv", 'msgctxt,msgid,msgstr\n,中文,Chinese\n,"文件\n换行,File\n', "line 3: unexpected end of data"),
+        ("csv", 'msgctxt,msgid,msgstr\n,中文,Chinese\n,"文件"x,File\n', "line 3: ',' expected after '\"'"),
+        ("csv", "msgctxt,msgstr\n,Chinese\n", "line 2: missing msgid"),
+        ("jsonl", '{"msgid": "中文", "msgstr": "Chinese"}\n\n{"msgid": "文件",\n', "line 3: Expecting"),
+        ("jsonl", '{"msgid": "中文", "msgstr": "Chinese"}\n["文件"]\n', "line 2: missing msgid"),
+    ],
+)
+def test_malformed(po_file, tmp_path, capsys, fmt, content, message):
+    review = tmp_path / f"review.{fmt}"
+    review.write_text(content, encoding="utf-8")
+    with pytest.raises(SystemExit):
+        ImportTool(po_file, import_path=str(review)).handle()
+    assert message in " ".join(capsys.readouterr().out.split())
+    # 出错时不写入任何词条
+    with open(po_file, encoding="utf-8") as f:
+        assert f.read() == PO
+    assert not os.path.exists(tmp_path / ".jinx_backups")
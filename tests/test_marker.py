@@ -0,0 +1,271 @@
+import ast
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import polib
+import pytest
+
+from extractor.extractor import ExtractTool
+from marker import marker as marker_module
+from marker.marker import MarkerTool
+from marker.utils.token import TokenPoint
+
+PLAIN = 'import os\n\nNAME = "name"\n'
+CHINESE = 'import os\n\nA = "中文"\nB = ["一", "二"]\n\n\ndef f():\n    return "你好"\n'
+FSTRING = 'import os\n\nname = "x"\nA = f"你好{name}"\nB = "中文"\n'
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch, tmp_path):
+    """增量缓存目录相对于当前目录, 测试中关闭缓存并切换到临时目录"""
+    monkeypatch.setattr(marker_module.cache, "enabled", False)
+    monkeypatch.chdir(tmp_path)
+
+
+def _project(path) -> str:
+    path.mkdir()
+    for _i in range(12):
+        content = (PLAIN, CHINESE, FSTRING)[_i % 3]
+        package = path / f"pkg{_i % 2}"
+        package.mkdir(exist_ok=True)
+        (package / f"m{_i}.py").write_text(content.replace("中文", f"中文{_i}"), encoding="utf-8")
+    return str(path)
+
+
+def _extract(target_path: str, jobs: int):
+    tool = MarkerTool(target_path, jobs=jobs)
+    return [
+        (
+            _r.filepath,
+            [(_t.start_at, _t.end_at, _t.token) for _t in _r.tokens],
+            [(_t.start_at, _t.token) for _t in _r.illegal_tokens],
+        )
+        for _r in tool._run(tool.files, only_extract_tokens=True)
+    ]
+
+
+def _contents(target_path: str) -> dict[str, str]:
+    result = {}
+    for _dir, __, _files in os.walk(target_path):
+        for _f in _files:
+            _fp = os.path.join(_dir, _f)
+            with open(_fp, encoding="utf-8") as f:
+                result[os.path.relpath(_fp, target_path)] = f.read()
+    return result
+
+
+@pytest.fixture
+def pools(monkeypatch) -> list:
+    """记录创建的进程池, 确认多进程模式确实经过worker"""
+    created = []
+
+    class RecordingPool(ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(marker_module, "ProcessPoolExecutor", RecordingPool)
+    return created
+
+
+def test_jobs_extract_same_tokens(tmp_path, pools):
+    target = _project(tmp_path / "project")
+    single = _extract(target, jobs=1)
+    assert not pools
+    assert sum(len(_tokens) for __, _tokens, __ in single) == 4 * 4 + 4
+    assert sum(len(_illegal) for __, __, _illegal in single) == 4
+    assert _extract(target, jobs=3) == single
+    assert len(pools) == 1
+    assert list(MarkerTool(target, jobs=3).tokens.texts()) == list(MarkerTool(target, jobs=1).tokens.texts())
+
+
+@pytest.mark.parametrize("strict_mode", [False, True])
+def test_jobs_mark_same_files(tmp_path, monkeypatch, pools, strict_mode):
+    monkeypatch.setattr(marker_module.marker_config, "strict_mode", strict_mode)
+    original = _project(tmp_path / "project")
+    single, multi = str(tmp_path / "single"), str(tmp_path / "multi")
+    shutil.copytree(original, single)
+    shutil.copytree(original, multi)
+    MarkerTool(single, jobs=1).handle()
+    # fork出的worker继承monkeypatch后的严格模式配置
+    MarkerTool(multi, jobs=3).handle()
+    assert len(pools) == 1
+
+    marked = _contents(single)
+    assert marked == _contents(multi)
+    before = _contents(original)
+    for _path, _content in marked.items():
+        if "你好{name}" in before[_path]:
+            # 严格模式下包含f-string的文件不标记, 非严格模式只跳过f-string
+            assert (_content == before[_path]) is strict_mode
+            assert 'f"你好{name}"' in _content
+        elif "中文" in before[_path]:
+            assert '_("中文' in _content
+            assert "from django.utils.translation import gettext_lazy as _\n" in _content
+        else:
+            assert _content == before[_path]
+
+
+IMPORT = "from django.utils.translation import gettext_lazy as _\n"
+GROUPS = """import os
+
+A = "abc" "中文"
+B = (
+    "很长的字符串"
+    # 注释
+    "第二行"
+)
+C = ("中文" f"{A}")
+D = "中文", '二'
+"""
+GROUPS_MARKED = f"""import os
+{IMPORT}
+A = _("abc" "中文")
+B = (
+    _("很长的字符串"
+    # 注释
+    "第二行")
+)
+C = ("中文" f"{{A}}")
+D = _("中文"), _('二')
+"""
+
+
+def _mark(tmp_path, content: str, dry_run: bool = False) -> tuple[marker_module.FileMarkResult, str]:
+    fp = tmp_path / "m.py"
+    fp.write_text(content, encoding="utf-8")
+    result = marker_module.FileMarker(str(fp)).handle(dry_run=dry_run)
+    return result, fp.read_text(encoding="utf-8")
+
+
+def _wrapped_values(content: str) -> set[str]:
+    """翻译函数在运行时收到的字符串"""
+    return {
+        ast.literal_eval(_node.args[0])
+        for _node in ast.walk(ast.parse(content))
+        if isinstance(_node, ast.Call) and isinstance(_node.func, ast.Name) and _node.func.id == "_"
+    }
+
+
+@pytest.fixture
+def non_strict(monkeypatch):
+    monkeypatch.setattr(marker_module.marker_config, "strict_mode", False)
+
+
+def test_mark_groups_once(tmp_path, non_strict):
+    result, content = _mark(tmp_path, GROUPS)
+    # 隐式拼接的字符串整组包裹一次, 组内包含f-string时整组跳过
+    assert content == GROUPS_MARKED
+    assert result.changed and result.written
+    assert list(result.tokens.texts()) == ['"abc中文"', '"很长的字符串第二行"', '"中文"', "'二'"]
+    assert [(_t.start_at, _t.end_at) for _t in result.tokens][:2] == [
+        (TokenPoint(3, 4), TokenPoint(3, 14)),
+        (TokenPoint(5, 4), TokenPoint(7, 9)),
+    ]
+    assert list(result.illegal_tokens.texts()) == ['"中文"']
+    # 再次标记时不会重复包裹
+    result, content = _mark(tmp_path, content)
+    assert content == GROUPS_MARKED
+    assert not result.changed
+
+
+def test_extracted_msgids_match_wrapped(tmp_path, non_strict):
+    """提取到po文件的msgid与标记后翻译函数收到的字符串一致, 否则gettext无法匹配"""
+    target = tmp_path / "project"
+    target.mkdir()
+    (target / "m.py").write_text(GROUPS.replace("'二'", '"二"'), encoding="utf-8")
+    po_file = tmp_path / "django.po"
+    po_file.write_text('msgid ""\nmsgstr ""\n', encoding="utf-8")
+    ExtractTool(str(target), str(po_file)).handle()
+    msgids = {_e.msgid for _e in polib.pofile(str(po_file))}
+    assert msgids == {"abc中文", "很长的字符串第二行", "中文", "二"}
+
+    MarkerTool(str(target)).handle()
+    assert _wrapped_values((target / "m.py").read_text(encoding="utf-8")) == msgids
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        f'{IMPORT}\nA = _("中文")\n',
+        # 代码格式化后翻译函数在上一行末尾
+        f'{IMPORT}\nA = _(\n    "中文"\n)\n',
+        f'{IMPORT}\nA = _(  \n    "abc"\n    "中文"\n)\n',
+    ],
+)
+def test_already_marked(tmp_path, content):
+    result, marked = _mark(tmp_path, content)
+    assert marked == content
+    assert not result.changed and not result.written
+
+
+def test_previous_line_without_translate_func(tmp_path):
+    result, content = _mark(tmp_path, f'{IMPORT}\nA = [\n    "中文",\n]\nB = foo(\n    "二"\n)\n')
+    # 上一行末尾不是翻译函数时仍需标记
+    assert content == f'{IMPORT}\nA = [\n    _("中文"),\n]\nB = foo(\n    _("二")\n)\n'
+    assert result.changed
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        # 插入到第一个后面紧跟空行的import语句之后
+        (
+            'import os\nimport sys\n\nA = "中文"\n',
+            f'import os\nimport sys\n{IMPORT}\nA = _("中文")\n',
+        ),
+        # 没有import语句时插入到第一个非注释行之前
+        (
+            '# -*- coding: utf-8 -*-\n# 注释\nA = "中文"\n',
+            f'# -*- coding: utf-8 -*-\n# 注释\n{IMPORT}A = _("中文")\n',
+        ),
+        # 已导入翻译函数时不重复导入
+        (
+            'from django.utils.translation import gettext as _\n\nA = "中文"\n',
+            'from django.utils.translation import gettext as _\n\nA = _("中文")\n',
+        ),
+        # 没有需要标记的字符串时不插入
+        ('import os\n\nA = "abc"\n', 'import os\n\nA = "abc"\n'),
+    ],
+)
+def test_add_import(tmp_path, content, expected):
+    assert _mark(tmp_path, content)[1] == expected
+
+
+def test_edit_conflict_skips_file(tmp_path, monkeypatch, capsys):
+    original_mark = marker_module.FileMarker._mark
+
+    def conflicting_mark(self):
+        original_mark(self)
+        # 与已有的包裹区间部分重叠
+        start = self._content.index('"中文"')
+        self._edits.replace(start + 1, start + 6, "X")
+
+    monkeypatch.setattr(marker_module.FileMarker, "_mark", conflicting_mark)
+    result, content = _mark(tmp_path, CHINESE)
+    assert content == CHINESE
+    assert not result.changed and not result.written
+    assert "conflicting edits" in capsys.readouterr().out
+
+
+def test_dry_run_diff_applies(tmp_path, capsys):
+    original = _project(tmp_path / "project")
+    (tmp_path / "project" / "pkg0" / "tail.py").write_text('A = "中文"', encoding="utf-8")
+    preview, marked = str(tmp_path / "preview"), str(tmp_path / "marked")
+    shutil.copytree(original, preview)
+    shutil.copytree(original, marked)
+    capsys.readouterr()
+    MarkerTool(preview, dry_run=True).handle()
+    output = capsys.readouterr().out
+    assert _contents(preview) == _contents(original)
+    # diff原样输出, 文件头使用相对于目标目录的路径
+    assert "--- a/pkg0/m0.py\n+++ b/pkg0/m0.py\n" not in output
+    assert "--- a/pkg1/m1.py\n+++ b/pkg1/m1.py\n" in output
+    assert all(tmp_path.name not in _line for _line in output.splitlines() if _line.startswith(("--- ", "+++ ")))
+    # 其它提示信息不影响在目标目录下直接应用
+    subprocess.run(["git", "apply", "-"], cwd=preview, input=output, text=True, check=True)
+
+    MarkerTool(marked).handle()
+    assert _contents(preview) == _contents(marked)
@@ -0,0 +1,160 @@
+import json
+import os
+import pickle
+
+from common.utils import file_digest
+from marker.utils.cache import (
+    CACHE_VERSION,
+    MARKER_CACHE_FILE,
+    CacheRecord,
+    MarkerCache,
+)
+from marker.utils.token import Token, TokenPoint, TokenStore
+
+
+def _tokens(*texts: str) -> TokenStore:
+    return TokenStore(
+        Token(start_at=TokenPoint(_i + 1, 4), end_at=TokenPoint(_i + 1, 4 + len(_t)), type=3, token=_t)
+        for _i, _t in enumerate(texts)
+    )
+
+
+def _record(fp: str, *texts: str, marked: bool = False) -> CacheRecord:
+    stat = os.stat(fp)
+    return CacheRecord(
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        digest=file_digest(fp),
+        tokens=_tokens(*texts),
+        illegal_tokens=_tokens('f"你好{x}"'),
+        marked=marked,
+    )
+
+
+def _source(path, content: str = 'A = "中文"\n') -> str:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def _cache(tmp_path, fingerprint: str = "v1") -> MarkerCache:
+    return MarkerCache(fingerprint, path=str(tmp_path / "cache"))
+
+
+def test_round_trip(tmp_path):
+    fp = _source(tmp_path / "src" / "a.py")
+    cache = _cache(tmp_path)
+    cache.put(fp, _record(fp, '"中文"', '"二"', marked=True))
+    cache.save()
+    assert os.path.basename(cache._fp) == MARKER_CACHE_FILE == "marker.json"
+
+    record = _cache(tmp_path).get(fp)
+    assert record is not None
+    assert list(record.tokens.texts()) == ['"中文"', '"二"']
+    assert [_t.start_at for _t in record.tokens] == [TokenPoint(1, 4), TokenPoint(2, 4)]
+    assert list(record.illegal_tokens.texts()) == ['f"你好{x}"']
+    assert record.marked
+
+
+def test_fingerprint_change_invalidates(tmp_path, capsys):
+    fp = _source(tmp_path / "src" / "a.py")
+    cache = _cache(tmp_path, "v1")
+    cache.put(fp, _record(fp, '"中文"'))
+    cache.save()
+    assert _cache(tmp_path, "v2").get(fp) is None
+    assert "cache invalidated" in capsys.readouterr().out
+
+
+def test_mtime_change_same_content(tmp_path):
+    fp = _source(tmp_path / "src" / "a.py")
+    cache = _cache(tmp_path)
+    cache.put(fp, _record(fp, '"中文"'))
+    cache.save()
+    stat = os.stat(fp)
+    os.utime(fp, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    cache = _cache(tmp_path)
+    record = cache.get(fp)
+    assert record is not None
+    # 内容不变时刷新mtime并写回, 下次不再计算摘要
+    assert record.mtime_ns == stat.st_mtime_ns + 10**9
+    cache.save()
+    assert _cache(tmp_path)._records[os.path.abspath(fp)].mtime_ns == stat.st_mtime_ns + 10**9
+
+
+def test_content_change_invalidates(tmp_path):
+    fp = _source(tmp_path / "src" / "a.py")
+    cache = _cache(tmp_path)
+    cache.put(fp, _record(fp, '"中文"'))
+    stat = os.stat(fp)
+    # 大小不变, 内容变化
+    _source(tmp_path / "src" / "a.py", 'B = "中文"\n')
+    os.utime(fp, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(fp) is None
+    # 大小变化
+    _source(tmp_path / "src" / "a.py", 'A = "中文字符串"\n')
+    assert cache.get(fp) is None
+
+
+def test_discard(tmp_path):
+    fp = _source(tmp_path / "src" / "a.py")
+    cache = _cache(tmp_path)
+    cache.put(fp, _record(fp))
+    cache.discard(fp)
+    assert cache.get(fp) is None
+
+
+def test_retain(tmp_path):
+    kept = _source(tmp_path / "a" / "b" / "kept.py")
+    removed = _source(tmp_path / "a" / "b" / "removed.py")
+    sibling = _source(tmp_path / "a" / "bc" / "sibling.py")
+    cache = _cache(tmp_path)
+    for _fp in (kept, removed, sibling):
+        cache.put(_fp, _record(_fp))
+    cache.retain(str(tmp_path / "a" / "b"), [kept])
+    # /a/bc不在/a/b下, 不能被清理
+    assert set(cache._records) == {os.path.abspath(kept), os.path.abspath(sibling)}
+
+
+def test_broken_cache_ignored(tmp_path, capsys):
+    fp = _source(tmp_path / "src" / "a.py")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    for _content in (
+        "{broken",
+        json.dumps({"version": CACHE_VERSION, "fingerprint": "v1", "records": {os.path.abspath(fp): [1, 2]}}),
+        json.dumps(
+            {
+                "version": CACHE_VERSION,
+                "fingerprint": "v1",
+                "records": {os.path.abspath(fp): [1, 2, "d", [[1], [0], ""]]},
+            }
+        ),
+        json.dumps([1, 2, 3]),
+    ):
+        (cache_dir / MARKER_CACHE_FILE).write_text(_content, encoding="utf-8")
+        cache = _cache(tmp_path)
+        assert cache.get(fp) is None
+        # 损坏的缓存在下次保存时被覆盖
+        cache.put(fp, _record(fp, '"中文"'))
+        cache.save()
+        assert _cache(tmp_path).get(fp) is not None
+    assert "Ignore broken marker cache" in capsys.readouterr().out
+
+
+def test_pickle_never_loaded(tmp_path):
+    """缓存目录中植入的pickle文件不会被反序列化"""
+    fp = _source(tmp_path / "src" / "a.py")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    marker = tmp_path / "pwned"
+
+    class Exploit:
+        def __reduce__(self):
+            return open, (str(marker), "w")
+
+    payload = pickle.dumps(("v1", {os.path.abspath(fp): Exploit()}))
+    (cache_dir / "marker.pickle").write_bytes(payload)
+    (cache_dir / MARKER_CACHE_FILE).write_bytes(payload)
+    assert _cache(tmp_path).get(fp) is None
+    assert not marker.exists()
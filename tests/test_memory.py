@@ -0,0 +1,73 @@
+import requests
+
+from common.constants import TRANSLATION_MEMORY_PO_PROVIDER
+from translator.memory import TranslationMemory, TranslationMemoryConfig
+from translator.provider.base import TranslatorBase
+
+
+class FakeTranslator(TranslatorBase):
+    """匹配官方词典后的语句倒序作为译文, 包含失败的语句请求出错"""
+
+    def __init__(self, contents, memory, official_dict=None) -> None:
+        super().__init__("zh_hans", "en", official_dict, contents, provider="fake", memory=memory)
+        self.requested: list[str] = []
+
+    def translate_once(self, content: str) -> str:
+        self.requested.append(content)
+        if "失败" in content:
+            raise requests.ConnectionError("boom")
+        return self.pre_translate(content).content[::-1]
+
+
+def _memory(tmp_path) -> TranslationMemory:
+    return TranslationMemory(str(tmp_path / "memory.db"))
+
+
+def test_disabled_by_default():
+    assert TranslationMemoryConfig().enabled is False
+
+
+def test_put_get(tmp_path):
+    with _memory(tmp_path) as memory:
+        memory.put_many("fake", "zh_hans", "en", {"中文": "Chinese", "空": ""})
+        assert memory.get_many("fake", "zh_hans", "en", ["中文", "空", "其他"]) == {"中文": "Chinese"}
+        assert memory.get_many("fake", "zh_hans", "ja", ["中文"]) == {}
+        assert memory.get_many("other", "zh_hans", "en", ["中文"]) == {}
+        assert (memory.hits, memory.misses) == (1, 4)
+
+
+def test_po_translation_preferred(tmp_path):
+    with _memory(tmp_path) as memory:
+        memory.put_many("fake", "zh_hans", "en", {"中文": "Chinese"})
+        memory.put_many(TRANSLATION_MEMORY_PO_PROVIDER, "zh_hans", "en", {"中文": "Chinese (reviewed)"})
+        assert memory.get_many("fake", "zh_hans", "en", ["中文"]) == {"中文": "Chinese (reviewed)"}
+
+
+def test_max_entries(tmp_path):
+    with TranslationMemory(str(tmp_path / "memory.db"), max_entries=2) as memory:
+        for _i in range(5):
+            memory.put_many("fake", "zh_hans", "en", {f"中文{_i}": f"Chinese{_i}"})
+        assert memory.stats() == [("fake", "zh_hans", "en", 2, 0)]
+
+
+def test_translate_skips_failures(tmp_path):
+    with _memory(tmp_path) as memory:
+        translator = FakeTranslator(["中文", "请求失败", "中文"], memory)
+        translator.translate()
+        assert translator.result == {"中文": "文中"}
+        assert memory.get_many("fake", "zh_hans", "en", ["中文", "请求失败"]) == {"中文": "文中"}
+
+        # 命中记忆库的语句不再请求, 失败的语句重新请求
+        translator = FakeTranslator(["中文", "请求失败"], memory)
+        translator.translate()
+        assert translator.requested == ["请求失败"]
+        assert translator.result == {"中文": "文中"}
+
+
+def test_translate_full_match_bypasses_memory(tmp_path):
+    with _memory(tmp_path) as memory:
+        translator = FakeTranslator(["用户", "用户名称"], memory, official_dict={"用户": "User"})
+        translator.translate()
+        assert translator.result == {"用户": "User", "用户名称": "称名resU"}
+        # 记忆库的key为匹配官方词典后的语句
+        assert memory.get_many("fake", "zh_hans", "en", ["User名称", "用户"]) == {"User名称": "称名resU"}
@@ -0,0 +1,235 @@
+import gettext
+import io
+import random
+import struct
+
+import pytest
+
+from common.po_reader import PoRecord
+from compiler.mo import MO_MAGIC, build_mo, hash_string, hash_table_size, next_prime
+
+HEADER = "Content-Type: text/plain; charset=UTF-8\n"
+GBK_HEADER = "Content-Type: text/plain; charset=GBK\n"
+_HEADER_STRUCT = struct.Struct("=7I")
+
+
+def _c_hash_string(key: bytes) -> int:
+    """hash-string.c在LP64平台上的逐字转写: hval为64位unsigned long, 返回时截断为nls_uint32"""
+    hval = 0
+    for _c in key:
+        hval = ((hval << 4) + _c) & 0xFFFFFFFFFFFFFFFF
+        g = hval & (0xF << 28)
+        if g:
+            hval ^= g >> 24
+            hval ^= g
+    return hval & 0xFFFFFFFF
+
+
+def _c_next_prime(seed: int) -> int:
+    """gettext hash.c的next_prime/is_prime逐字转写"""
+
+    def is_prime(candidate: int) -> bool:
+        divn, sq = 3, 9
+        while sq < candidate and candidate % divn != 0:
+            divn += 1
+            sq += 4 * divn
+            divn += 1
+        return candidate % divn != 0
+
+    seed |= 1
+    while not is_prime(seed):
+        seed += 2
+    return seed
+
+
+def _msgfmt(messages: dict[bytes, bytes]) -> bytes:
+    """write-mo.c(无sysdep字符串, alignment=1)的逐字转写, 作为生成golden字节的参考实现"""
+    keys = sorted(messages)
+    nitems = len(keys)
+    hash_tab_size = _c_next_prime(nitems * 4 // 3)
+    if hash_tab_size <= 2:
+        hash_tab_size = 3
+    hash_tab = [0] * hash_tab_size
+    for j, key in enumerate(keys):
+        hash_val = _c_hash_string(key.split(b"\0")[0])
+        idx = hash_val % hash_tab_size
+        if hash_tab[idx] != 0:
+            incr = 1 + (hash_val % (hash_tab_size - 2))
+            while True:
+                if idx >= hash_tab_size - incr:
+                    idx -= hash_tab_size - incr
+                else:
+                    idx += incr
+                if hash_tab[idx] == 0:
+                    break
+        hash_tab[idx] = j + 1
+
+    out = io.BytesIO()
+    orig_tab_offset = 28
+    trans_tab_offset = orig_tab_offset + nitems * 8
+    hash_tab_offset = trans_tab_offset + nitems * 8
+    out.write(
+        struct.pack("=7I", MO_MAGIC, 0, nitems, orig_tab_offset, trans_tab_offset, hash_tab_size, hash_tab_offset)
+    )
+    offset = hash_tab_offset + hash_tab_size * 4
+    for strings in (keys, [messages[k] for k in keys]):
+        for s in strings:
+            out.write(struct.pack("=2I", len(s), offset))
+            offset += len(s) + 1
+    out.write(struct.pack(f"={hash_tab_size}I", *hash_tab))
+    for strings in (keys, [messages[k] for k in keys]):
+        for s in strings:
+            out.write(s + b"\0")
+    return out.getvalue()
+
+
+def _lookup(mo: bytes, key: bytes) -> int:
+    """按libintl(dcigettext.c)的方式沿二次hash探测查找原文, 返回条目下标, 找不到时返回-1"""
+    _, _, _, orig_offset, _, size, hash_offset = _HEADER_STRUCT.unpack_from(mo)
+    table = struct.unpack_from(f"={size}I", mo, hash_offset)
+    hval = _c_hash_string(key)
+    idx = hval % size
+    incr = 1 + hval % (size - 2)
+    for _ in range(size):
+        nstr = table[idx]
+        if nstr == 0:
+            return -1
+        length, offset = struct.unpack_from("=2I", mo, orig_offset + (nstr - 1) * 8)
+        # 复数条目的原文为 msgid + NUL + msgid_plural, 只比较msgid部分
+        if mo[offset : offset + length].split(b"\0")[0] == key:
+            return nstr - 1
+        idx = idx - (size - incr) if idx >= size - incr else idx + incr
+    return -1
+
+
+def _header(charset_header: str = HEADER) -> PoRecord:
+    return PoRecord(msgstr=charset_header)
+
+
+@pytest.mark.parametrize(
+    "count, size", [(0, 3), (1, 3), (2, 5), (3, 5), (4, 5), (5, 7), (6, 11), (7, 11), (8, 11), (9, 13), (75, 101)]
+)
+def test_hash_table_size_matches_msgfmt(count, size):
+    assert hash_table_size(count) == size
+
+
+def test_next_prime_matches_gettext():
+    # gettext的is_prime不把3当作质数, 1当作质数
+    assert next_prime(1) == 1
+    assert next_prime(2) == 5
+    assert next_prime(3) == 5
+    assert next_prime(25) == 29
+    assert next_prime(49) == 53
+    for _n in range(0, 5000):
+        assert next_prime(_n) == _c_next_prime(_n)
+
+
+def test_hash_string_is_32bit():
+    assert hash_string(b"") == 0
+    assert hash_string(b"a") == 97
+    # hval在低32位为0x0FFFFFFF时加上高位字节, C中会进位到第32位, 截断后不影响结果
+    key = b"\xff" * 6 + b"\x0f\xff"
+    assert hash_string(key) == _c_hash_string(key) == 0xEF
+    rng = random.Random(0)
+    for _ in range(2000):
+        key = bytes(rng.randrange(1, 256) for _ in range(rng.randrange(0, 64)))
+        assert hash_string(key) == _c_hash_string(key)
+
+
+def test_empty_catalog():
+    assert build_mo([]) == _HEADER_STRUCT.pack(MO_MAGIC, 0, 0, 28, 28, 3, 28) + bytes(12)
+
+
+def test_header_only():
+    header = HEADER.encode()
+    expected = b"".join(
+        (
+            _HEADER_STRUCT.pack(MO_MAGIC, 0, 1, 28, 36, 3, 44),
+            struct.pack("=2I", 0, 56),
+            struct.pack("=2I", len(header), 57),
+            struct.pack("=3I", 1, 0, 0),
+            b"\0",
+            header + b"\0",
+        )
+    )
+    assert build_mo([_header()]) == expected
+
+
+def test_header_and_one_message():
+    header = HEADER.encode()
+    # hash("a") = 97, 97 % 5 = 2
+    expected = b"".join(
+        (
+            _HEADER_STRUCT.pack(MO_MAGIC, 0, 2, 28, 44, 5, 60),
+            struct.pack("=4I", 0, 80, 1, 81),
+            struct.pack("=4I", len(header), 83, 1, 84 + len(header)),
+            struct.pack("=5I", 1, 0, 2, 0, 0),
+            b"\0a\0",
+            header + b"\0b\0",
+        )
+    )
+    assert build_mo([_header(), PoRecord(msgid="a", msgstr="b")]) == expected
+
+
+def test_plural_and_context():
+    records = [
+        _header(),
+        PoRecord(msgid="一个", msgid_plural="多个", msgstr_plural={0: "one", 1: "many"}),
+        PoRecord(msgid="文件", msgstr="File", msgctxt="菜单"),
+        PoRecord(msgid="文件", msgstr="file"),
+    ]
+    content = build_mo(records)
+    assert content == _msgfmt(
+        {
+            b"": HEADER.encode(),
+            "一个\0多个".encode(): b"one\0many",
+            "菜单\x04文件".encode(): b"File",
+            "文件".encode(): b"file",
+        }
+    )
+    translations = gettext.GNUTranslations(io.BytesIO(content))
+    assert translations.ngettext("一个", "多个", 1) == "one"
+    assert translations.ngettext("一个", "多个", 2) == "many"
+    assert translations.pgettext("菜单", "文件") == "File"
+    assert translations.gettext("文件") == "file"
+    assert _lookup(content, "一个".encode()) >= 0
+    assert _lookup(content, "菜单\x04文件".encode()) >= 0
+
+
+def test_non_utf8_charset():
+    records = [_header(GBK_HEADER), PoRecord(msgid="中文", msgstr="Chinese")]
+    content = build_mo(records)
+    assert content == _msgfmt({b"": GBK_HEADER.encode(), "中文".encode("gbk"): b"Chinese"})
+    assert gettext.GNUTranslations(io.BytesIO(content)).gettext("中文") == "Chinese"
+
+
+def test_skipped_entries():
+    records = [
+        _header(),
+        PoRecord(msgid="未翻译"),
+        PoRecord(msgid="模糊", msgstr="fuzzy", flags=("fuzzy",)),
+        PoRecord(msgid="废弃", msgstr="obsolete", obsolete=True),
+        PoRecord(msgid="复数", msgid_plural="复数s", msgstr_plural={0: "", 1: ""}),
+    ]
+    assert build_mo(records) == build_mo([_header()])
+
+
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_many_entries(count):
+    rng = random.Random(count)
+    words = {"".join(rng.choice("中文字符串翻译abcxyz") for _ in range(rng.randrange(1, 12))) for _ in range(count)}
+    records = [_header()] + [PoRecord(msgid=_w, msgstr=_w[::-1]) for _w in words]
+    content = build_mo(records)
+    assert content == _msgfmt({b"": HEADER.encode(), **{_w.encode(): _w[::-1].encode() for _w in words}})
+
+    # 每个原文都能沿探测序列找到, 且冲突确实发生过(探测路径被覆盖)
+    keys = sorted([b""] + [_w.encode() for _w in words])
+    _, _, _, _, _, size, _ = _HEADER_STRUCT.unpack_from(content)
+    assert len({_c_hash_string(_k) % size for _k in keys}) < len(keys)
+    for _i, _key in enumerate(keys):
+        assert _lookup(content, _key) == _i
+    assert _lookup(content, "不存在".encode()) == -1
+
+    translations = gettext.GNUTranslations(io.BytesIO(content))
+    for _w in words:
+        assert translations.gettext(_w) == _w[::-1]
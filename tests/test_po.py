@@ -0,0 +1,83 @@
+import os
+
+import polib
+import pytest
+
+from common.constants import PoFileModeEnum
+from common.po import PoUtil
+
+CATALOG = '''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "中文"
+msgstr ""
+
+msgid "文本"
+msgstr "text"
+
+#, fuzzy
+msgid "模糊"
+msgstr "fuzzy"
+
+msgctxt "菜单"
+msgid "文件"
+msgstr ""
+'''
+
+
+@pytest.fixture
+def po_path(tmp_path) -> str:
+    path = tmp_path / "django.po"
+    path.write_text(CATALOG, encoding="utf-8")
+    return str(path)
+
+
+def test_no_changes_skip_save(po_path):
+    mtime_ns = os.stat(po_path).st_mtime_ns
+    po_file = PoUtil(po_path)
+    assert po_file.write({"文本": "text", "不存在": "x"}, mode=PoFileModeEnum.UPDATE) == 0
+    assert os.stat(po_path).st_mtime_ns == mtime_ns
+
+
+def test_update_only_fills_empty(po_path):
+    assert PoUtil(po_path).write({"中文": "Chinese", "文本": "changed"}, mode=PoFileModeEnum.UPDATE) == 1
+    saved = {_e.msgid: _e.msgstr for _e in polib.pofile(po_path)}
+    assert saved["中文"] == "Chinese"
+    assert saved["文本"] == "text"
+
+
+def test_overwrite_updates_every_context(po_path):
+    assert PoUtil(po_path).write({"文本": "changed", "文件": "File"}, mode=PoFileModeEnum.OVERWRITE) == 2
+    saved = {(_e.msgctxt, _e.msgid): _e.msgstr for _e in polib.pofile(po_path)}
+    assert saved[(None, "文本")] == "changed"
+    assert saved[("菜单", "文件")] == "File"
+
+
+def test_append_batches_save_once(po_path):
+    po_file = PoUtil(po_path)
+    po_file.append({"新增": ""})
+    po_file.append({'u"引号"': "", "新增": ""})
+    assert po_file.changed == 2
+    assert po_file.save() == 2
+    assert po_file.changed == 0
+    assert po_file.msgid_list[-2:] == ["新增", "引号"]
+    # 写入前备份原文件
+    assert os.listdir(os.path.join(os.path.dirname(po_path), ".jinx_backups", "django.po"))
+
+
+def test_merge(po_path):
+    po_file = PoUtil(po_path)
+    assert po_file.merge("不存在", "x") is None
+    assert po_file.merge("文件", "File", msgctxt="菜单").msgstr == "File"
+    # 译文不变时去掉fuzzy也算作变更
+    assert not po_file.merge("模糊", "fuzzy").fuzzy
+    assert po_file.save() == 2
+    assert not polib.pofile(po_path).fuzzy_entries()
+
+
+def test_records_do_not_load_polib(po_path):
+    po_file = PoUtil(po_path)
+    assert [_r.msgid for _r in po_file.records(lambda r: r.msgstr == "")] == ["中文", "文件"]
+    assert po_file.content_dict["文本"] == "text"
+    assert po_file._po is None
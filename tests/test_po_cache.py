@@ -0,0 +1,69 @@
+import marshal
+import os
+
+from common.config import po as po_config
+from common.po import iter_po_records
+from common.po_cache import SIDECAR_SUFFIX, PoSidecar
+from common.po_reader import PoReader
+from compiler.mo import build_mo, write_mo
+
+CATALOG = '''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+msgid "中文"
+msgstr "Chinese"
+
+#, fuzzy
+msgctxt "菜单"
+msgid "文件"
+msgstr "File"
+
+msgid "一个"
+msgid_plural "多个"
+msgstr[0] "one"
+msgstr[1] "many"
+'''
+
+
+def _po(tmp_path) -> str:
+    path = tmp_path / "django.po"
+    path.write_text(CATALOG, encoding="utf-8")
+    return str(path)
+
+
+def test_records_same_as_reader(tmp_path):
+    po_path = _po(tmp_path)
+    expected = list(PoReader(po_path).iter_records(include_header=True))
+    # 第一次解析并写入缓存, 第二次从缓存加载
+    for __ in range(2):
+        assert PoSidecar(po_path).records(include_header=True) == expected
+        assert PoSidecar(po_path).records() == expected[1:]
+    assert os.path.exists(po_path + SIDECAR_SUFFIX)
+
+
+def test_stale_cache_is_ignored(tmp_path):
+    po_path = _po(tmp_path)
+    PoSidecar(po_path).records()
+    with open(po_path, "a", encoding="utf-8") as f:
+        f.write('\nmsgid "新增"\nmsgstr ""\n')
+    assert PoSidecar(po_path).records()[-1].msgid == "新增"
+
+
+def test_old_cache_version_is_ignored(tmp_path):
+    po_path = _po(tmp_path)
+    with open(po_path + SIDECAR_SUFFIX, "wb") as f:
+        f.write(marshal.dumps((1, 0, 0, "", ())))
+    assert [_r.msgid for _r in PoSidecar(po_path).records()] == ["中文", "文件", "一个"]
+
+
+def test_compiler_uses_sidecar(tmp_path, monkeypatch):
+    po_path = _po(tmp_path)
+    expected = build_mo(PoReader(po_path).iter_records(include_header=True))
+    monkeypatch.setattr(po_config, "sidecar_cache", True)
+    assert list(iter_po_records(po_path, include_header=True))[0].is_header
+    mo_path = str(tmp_path / "django.mo")
+    write_mo(po_path, mo_path)
+    assert os.path.exists(po_path + SIDECAR_SUFFIX)
+    with open(mo_path, "rb") as f:
+        assert f.read() == expected
@@ -0,0 +1,117 @@
+import random
+
+import polib
+import pytest
+
+from common.po_reader import PoParseError, PoReader
+
+CATALOG = r'''# Translation header
+msgid ""
+msgstr ""
+"Content-Type: text/plain; charset={charset}\n"
+"Plural-Forms: nplurals=2; plural=(n != 1);\n"
+
+#: app/views.py:1
+msgid "中文"
+msgstr "Chinese"
+
+#, fuzzy, python-format
+msgid "你好 %(name)s"
+msgstr "Hello %(name)s"
+
+msgctxt "菜单"
+msgid "文件"
+msgstr "File"
+
+msgid "文件"
+msgstr ""
+
+msgid ""
+"多行"
+"文本\n"
+msgstr ""
+"multi "
+"line\n"
+
+msgid "转义 \"引号\" \\ \t"
+msgstr "escape \"quote\" \\ \t"
+
+msgid "一个苹果"
+msgid_plural "%d个苹果"
+msgstr[0] "one apple"
+msgstr[1] "%d apples"
+
+#~ msgid "废弃"
+#~ msgstr "obsolete"
+'''
+
+
+def _fields(entry, translated: bool) -> tuple:
+    """PoRecord/polib.POEntry共有的翻译相关字段"""
+    return (
+        entry.msgid,
+        entry.msgstr,
+        entry.msgctxt,
+        entry.msgid_plural,
+        dict(entry.msgstr_plural),
+        tuple(entry.flags),
+        bool(entry.obsolete),
+        translated,
+    )
+
+
+def _assert_same_as_polib(path: str):
+    # polib.POFile包含废弃条目, 不包含header
+    expected = [_fields(_e, _e.translated()) for _e in polib.pofile(path)]
+    actual = [_fields(_r, _r.translated) for _r in PoReader(path)]
+    assert actual == expected
+
+
+@pytest.mark.parametrize("charset, encoding", [("UTF-8", "utf-8"), ("GBK", "gbk")])
+def test_same_as_polib(tmp_path, charset, encoding):
+    path = tmp_path / "django.po"
+    path.write_bytes(CATALOG.replace("{charset}", charset).encode(encoding))
+    _assert_same_as_polib(str(path))
+
+
+def test_generated_catalog_same_as_polib(tmp_path):
+    rng = random.Random(0)
+    alphabet = "中文字符串abc %\"\\\n\t"
+    po = polib.POFile()
+    po.metadata = {"Content-Type": "text/plain; charset=UTF-8"}
+    for i in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 120)))
+        entry = polib.POEntry(msgid=f"{i}{text}", msgstr=text[::-1] if rng.random() < 0.7 else "")
+        if rng.random() < 0.2:
+            entry.msgctxt = f"ctx{i % 3}"
+        if rng.random() < 0.2:
+            entry.flags.append("fuzzy")
+        if rng.random() < 0.1:
+            entry.msgid_plural, entry.msgstr, entry.msgstr_plural = f"{i}复数", "", {0: "one", 1: text}
+        entry.obsolete = rng.random() < 0.05
+        po.append(entry)
+    path = str(tmp_path / "django.po")
+    po.save(path)
+    _assert_same_as_polib(path)
+
+
+def test_header_and_predicate(tmp_path):
+    path = tmp_path / "django.po"
+    path.write_bytes(CATALOG.replace("{charset}", "UTF-8").encode("utf-8"))
+    reader = PoReader(str(path))
+    assert next(reader.iter_records(include_header=True)).is_header
+    assert [_r.msgid for _r in reader.iter_records(lambda r: r.fuzzy)] == ["你好 %(name)s"]
+    assert [_r.msgid for _r in reader.iter_content(path.read_bytes(), lambda r: r.obsolete)] == ["废弃"]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "django.po"
+    path.write_bytes(b"")
+    assert list(PoReader(str(path))) == []
+
+
+def test_parse_error(tmp_path):
+    path = tmp_path / "django.po"
+    path.write_bytes(b'msgid "a"\nmsgstr "b"\n"dangling"\nbogus "c"\n')
+    with pytest.raises(PoParseError, match=":4:"):
+        list(PoReader(str(path)))
@@ -0,0 +1,71 @@
+import json
+
+from common.po_reader import PoRecord
+from common.po_snapshot import PoSnapshot, entry_key, record_digest, translation_digest
+
+
+def _snapshot(tmp_path) -> PoSnapshot:
+    return PoSnapshot(str(tmp_path / "django.po"), path=str(tmp_path / "cache"))
+
+
+def test_entry_key_context():
+    assert entry_key("文件") == entry_key("文件", None)
+    assert entry_key("文件", "") != entry_key("文件")
+    assert entry_key("文件", "菜单") != entry_key("文件")
+
+
+def test_translation_digest():
+    assert translation_digest("File") == translation_digest("File", None) == translation_digest("File", {})
+    assert translation_digest("File") != translation_digest("File", fuzzy=True)
+    assert translation_digest("File") != translation_digest("file")
+    # 复数译文按下标排序, 与dict的插入顺序无关
+    assert translation_digest("", {0: "one", 1: "many"}) == translation_digest("", {1: "many", 0: "one"})
+    assert translation_digest("", {0: "one", 1: "many"}) != translation_digest("", {0: "many", 1: "one"})
+
+
+def test_record_digest():
+    record = PoRecord(msgid="一个", msgid_plural="多个", msgstr_plural={0: "one", 1: "many"}, flags=("fuzzy",))
+    assert record_digest(record) == translation_digest("", {0: "one", 1: "many"}, fuzzy=True)
+
+
+def test_missing_snapshot(tmp_path):
+    snapshot = _snapshot(tmp_path)
+    record = PoRecord(msgid="中文", msgstr="Chinese")
+    assert len(snapshot) == 0
+    assert snapshot.get("中文") is None
+    assert snapshot.is_changed(record)
+
+
+def test_put_save_reload(tmp_path):
+    snapshot = _snapshot(tmp_path)
+    record = PoRecord(msgid="文件", msgstr="File", msgctxt="菜单")
+    snapshot.put(record)
+    assert not snapshot.is_changed(record)
+    assert snapshot.is_changed(PoRecord(msgid="文件", msgstr="File"))
+    snapshot.save()
+
+    reloaded = _snapshot(tmp_path)
+    assert len(reloaded) == 1
+    assert not reloaded.is_changed(record)
+    assert reloaded.is_changed(PoRecord(msgid="文件", msgstr="Files", msgctxt="菜单"))
+    assert reloaded.is_changed(PoRecord(msgid="文件", msgstr="File", msgctxt="菜单", flags=("fuzzy",)))
+
+
+def test_snapshot_per_po_file(tmp_path):
+    snapshot = _snapshot(tmp_path)
+    snapshot.set("中文", None, translation_digest("Chinese"))
+    snapshot.save()
+    other = PoSnapshot(str(tmp_path / "other.po"), path=str(tmp_path / "cache"))
+    assert len(other) == 0
+
+
+def test_broken_snapshot_ignored(tmp_path):
+    snapshot = _snapshot(tmp_path)
+    snapshot.set("中文", None, translation_digest("Chinese"))
+    snapshot.save()
+    (fp,) = (tmp_path / "cache").rglob("*.json")
+    fp.write_text("{broken", encoding="utf-8")
+    assert len(_snapshot(tmp_path)) == 0
+
+    fp.write_text(json.dumps({entry_key("中文"): translation_digest("Chinese")}), encoding="utf-8")
+    assert _snapshot(tmp_path).get("中文") == translation_digest("Chinese")
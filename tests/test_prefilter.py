@@ -0,0 +1,56 @@
+import mmap
+import re
+
+import pytest
+
+from common.constants import LanguageCharRangeEnum, LanguageEnum, LanguageRegexEnum
+from marker.utils.prefilter import BytePrefilter, compile_bytes_pattern
+
+# 覆盖所有utf-8编码长度, 排除代理区
+_CODEPOINTS = [_c for _c in range(0x10000) if not 0xD800 <= _c <= 0xDFFF] + [0x10000, 0x1F600, 0x10FFFF]
+
+
+@pytest.mark.parametrize("current", list(LanguageCharRangeEnum))
+def test_ranges_match_language_re(current):
+    """码点区间与语言正则完全一致"""
+    pattern = re.compile(LanguageRegexEnum[current])
+    ranges = LanguageCharRangeEnum[current]
+    for code in _CODEPOINTS:
+        in_ranges = any(lo <= code <= hi for lo, hi in ranges)
+        assert bool(pattern.fullmatch(chr(code))) == in_ranges, hex(code)
+
+
+@pytest.mark.parametrize("current", list(LanguageCharRangeEnum))
+def test_bytes_pattern_is_superset(current):
+    """字节正则不漏判任何语言字符"""
+    pattern = compile_bytes_pattern(LanguageCharRangeEnum[current])
+    for lo, hi in LanguageCharRangeEnum[current]:
+        for code in (lo, (lo + hi) // 2, hi):
+            assert pattern.search(chr(code).encode("utf-8"))
+
+
+def test_bytes_pattern_rejects_ascii_for_chinese():
+    pattern = compile_bytes_pattern(LanguageCharRangeEnum[LanguageEnum.Chinese])
+    assert pattern.search(bytes(range(128))) is None
+
+
+def _scan(prefilter: BytePrefilter, tmp_path, content: bytes) -> bool:
+    fp = tmp_path / "a.py"
+    fp.write_bytes(content)
+    with open(fp, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return prefilter.scan(mm)
+
+
+def test_scan(tmp_path):
+    prefilter = BytePrefilter(LanguageEnum.Chinese, LanguageRegexEnum[LanguageEnum.Chinese])
+    assert prefilter.enabled
+    assert _scan(prefilter, tmp_path, 'x = "中文"\n'.encode("utf-8"))
+    assert not _scan(prefilter, tmp_path, b'x = "english"\n')
+    # 非utf-8编码的文件交给tokenize处理
+    assert _scan(prefilter, tmp_path, '# -*- coding: gbk -*-\nx = "english"\n'.encode("gbk"))
+
+
+def test_custom_re_disables_prefilter(tmp_path):
+    prefilter = BytePrefilter(LanguageEnum.Chinese, r"[一-鿿]+")
+    assert not prefilter.enabled
+    assert _scan(prefilter, tmp_path, b'x = "english"\n')
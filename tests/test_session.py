@@ -0,0 +1,15 @@
+from translator.provider.session import HttpConfig, create_session
+
+
+def test_create_session():
+    config = HttpConfig(connect_timeout=1, read_timeout=2, retries=3, backoff_factor=0.1)
+    session = create_session(pool_size=4, config=config)
+    assert session.timeout == (1, 2)
+    adapter = session.get_adapter("https://translate.googleapis.com")
+    assert adapter is session.get_adapter("http://example.com")
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.total == 3
+    assert adapter.max_retries.status_forcelist == (500, 502, 503, 504)
+    # 429由Throttle处理, 不在连接层重试
+    assert 429 not in adapter.max_retries.status_forcelist
+    session.close()
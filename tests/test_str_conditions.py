@@ -0,0 +1,190 @@
+import random
+import re
+import tokenize
+from dataclasses import asdict
+
+import pytest
+
+from common.constants import LanguageRegexEnum
+from marker.plugins.str_conditions import (
+    StrConditionConfig,
+    StrConditions,
+    StrMatcher,
+    str_conditions,
+)
+from marker.utils.token import Token, TokenPoint
+
+
+class LegacyStrCondition:
+    """重构前marker/plugins/str_conditions.py中的StrCondition, 原样保留作为对照"""
+
+    def __init__(self, token: Token, conditions: StrConditions, language_re: str):
+        self.token = token
+        self.conditions = conditions
+        self.language_re = language_re
+
+    def match(self):
+        if self.match_part(part="source_line") and self.match_part(part="token") and self.match_language():
+            return True
+        return False
+
+    def match_part(self, part: str):
+        """匹配字符串入口函数"""
+        for _key in asdict(getattr(self.conditions, part)).keys():
+            _method = "build_" + _key
+            if not getattr(self, _method)(part=part):
+                return False
+        return True
+
+    def match_language(self):
+        """匹配当前语言"""
+        language_re_pattern = re.compile(self.language_re)
+        return language_re_pattern.search(self.token.token)
+
+    def build_contains(self, part: str):
+        """包含: 遍历匹配一个就为True"""
+        content = getattr(self.token, part)
+        conditions = getattr(self.conditions, part)
+        if conditions.contains:
+            for _c in conditions.contains:
+                if _c in content:
+                    return True
+            return False
+        return True
+
+    def build_not_contains(self, part: str):
+        """不包含: 遍历匹配一个就为False"""
+        content = getattr(self.token, part)
+        conditions = getattr(self.conditions, part)
+        if conditions.not_contains:
+            for _c in conditions.not_contains:
+                if _c in content:
+                    return False
+        return True
+
+    def build_startswith(self, part):
+        """以...开头: 遍历匹配一个就为True"""
+        content = getattr(self.token, part)
+        conditions = getattr(self.conditions, part)
+        if conditions.startswith:
+            for _c in conditions.startswith:
+                if content.startswith(_c):
+                    return True
+            return False
+        return True
+
+    def build_not_startswith(self, part):
+        """不以...开头: 遍历匹配一个就为False"""
+        content = getattr(self.token, part)
+        conditions = getattr(self.conditions, part)
+        if conditions.not_startswith:
+            for _c in conditions.not_startswith:
+                if content.startswith(_c):
+                    return False
+        return True
+
+    def build_endswith(self, part):
+        """以...结尾: 遍历匹配一个就为True"""
+        content = getattr(self.token, part)
+        conditions = getattr(self.conditions, part)
+        if conditions.endswith:
+            for _c in conditions.endswith:
+                if content.endswith(_c):
+                    return True
+            return False
+        return True
+
+    def build_not_endswith(self, part):
+        """不以...结尾: 遍历匹配一个就为False"""
+        content = getattr(self.token, part)
+        conditions = getattr(self.conditions, part)
+        if conditions.not_endswith:
+            for _c in conditions.not_endswith:
+                if content.endswith(_c):
+                    return False
+        return True
+
+
+def _config(**kwargs) -> StrConditionConfig:
+    fields = dict.fromkeys(("contains", "not_contains", "startswith", "not_startswith", "endswith", "not_endswith"))
+    return StrConditionConfig(**{_k: kwargs.get(_k, []) for _k in fields})
+
+
+CONDITIONS = {
+    "configured": str_conditions,
+    "empty": StrConditions(source_line=_config(), token=_config()),
+    "all": StrConditions(
+        source_line=_config(
+            contains=["=", "(", ""], not_contains=["logger", "log", "__name__"], not_startswith=["#", "    #"]
+        ),
+        token=_config(
+            contains=["中", "文", "中文"],
+            not_contains=["忽略"],
+            startswith=['"', "'", 'f"'],
+            not_startswith=["r'"],
+            endswith=['"', "'"],
+            not_endswith=['"""', "'''"],
+        ),
+    ),
+}
+
+TOKENS = [
+    ('"中文"', 'A = "中文"\n'),
+    ("'中文'", "A = '中文'\n"),
+    ('"abc"', 'A = "abc"\n'),
+    ('"中文"', 'logger.info("中文")\n'),
+    ('"""中文"""', '"""中文"""\n'),
+    ("r'中文'", "A = r'中文'\n"),
+    ('f"你好{x}"', 'A = f"你好{x}"\n'),
+    ('"忽略中文"', 'A = "忽略中文"\n'),
+    ('"日本語ひらがな"', 'A = "日本語ひらがな"\n'),
+    ('"한국어"', 'A = "한국어"\n'),
+    ('"\\u4e2d"', 'A = "\\u4e2d"\n'),
+    ('""', 'A = ""\n'),
+    ('"中文"', '    # "中文"\n'),
+    ('"Ünïcödé"', 'A = "Ünïcödé"\n'),
+]
+
+
+def _random_tokens(count: int) -> list[tuple[str, str]]:
+    rng = random.Random(0)
+    alphabet = ['"', "'", "a", "Z", " ", "中", "文", "忽", "略", "ひ", "한", "#", "(", "=", "\x01", "é"]
+    result = []
+    for _ in range(count):
+        token = "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 8)))
+        prefix = rng.choice(["A = ", "logger.info(", "    # ", "", "__name__ "])
+        result.append((token, prefix + token + "\n"))
+    return result
+
+
+@pytest.mark.parametrize("conditions", CONDITIONS.values(), ids=CONDITIONS.keys())
+@pytest.mark.parametrize(
+    "language_re", [*LanguageRegexEnum.values(), r"[\u00c0-\u00ff]+", r"\s", r"[\x00-\x7f]+"], ids=str
+)
+def test_matcher_equals_legacy(conditions, language_re):
+    matcher = StrMatcher.compile(conditions, language_re)
+    # 内置的中/日/韩文正则走isascii快速排除, 结果同样需要一致
+    assert matcher.ascii_reject == (
+        language_re in LanguageRegexEnum.values() and language_re != LanguageRegexEnum["en"]
+    )
+    for _text, _source in TOKENS + _random_tokens(2000):
+        token = Token(
+            start_at=TokenPoint(1, 0),
+            end_at=TokenPoint(1, len(_text)),
+            type=tokenize.STRING,
+            token=_text,
+            source_line=_source,
+        )
+        assert matcher.match(token) == bool(LegacyStrCondition(token, conditions, language_re).match()), (
+            _text,
+            _source,
+        )
+
+
+def test_ascii_reject_only_for_builtin_non_ascii_languages():
+    # 内置的非ASCII字符集正则才能走isascii快速排除
+    assert StrMatcher.compile(str_conditions, LanguageRegexEnum["zh-CN"]).ascii_reject
+    assert StrMatcher.compile(str_conditions, LanguageRegexEnum["ko"]).ascii_reject
+    assert not StrMatcher.compile(str_conditions, LanguageRegexEnum["en"]).ascii_reject
+    # 自定义正则即使不匹配ASCII也不走快速排除
+    assert not StrMatcher.compile(str_conditions, r"[\u00c0-\u00ff]+").ascii_reject
@@ -0,0 +1,202 @@
+import threading
+
+import pytest
+
+from translator.provider import throttle
+from translator.provider.throttle import (
+    AimdLimiter,
+    Throttle,
+    ThrottleConfig,
+    ThrottledError,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    """代替throttle模块中的time, sleep只推进时间"""
+
+    def __init__(self) -> None:
+        self.now = 100.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(throttle, "time", fake)
+    return fake
+
+
+def test_config_defaults():
+    assert ThrottleConfig(qps=0).burst == 1
+    assert ThrottleConfig(qps=5.5).burst == 5
+    assert ThrottleConfig(qps=5, burst=2).burst == 2
+    assert ThrottleConfig(max_concurrency=0).max_concurrency == 1
+
+
+def test_token_bucket_unlimited(clock):
+    bucket = TokenBucket(rate=0)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_token_bucket_burst_then_rate(clock):
+    # 速率取2的幂, 假时钟的浮点运算没有误差
+    bucket = TokenBucket(rate=4, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+    start = clock.now
+    for _ in range(20):
+        bucket.acquire()
+    # 桶空后按速率发放令牌
+    assert clock.now - start == 5
+    assert clock.sleeps == [0.25] * 20
+
+
+def test_token_bucket_capped_at_burst(clock):
+    bucket = TokenBucket(rate=4, burst=3)
+    bucket.acquire()
+    # 空闲很久也只积攒burst个令牌
+    clock.now += 60
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert clock.sleeps == [0.25]
+
+
+def test_aimd_halves_once_per_generation(clock):
+    limiter = AimdLimiter(max_limit=8, latency_target=1)
+    assert limiter.limit == 8
+    first, second = clock.now, clock.now
+    clock.now += 0.5
+    limiter.acquire()
+    limiter.acquire()
+    limiter.release(first, ok=False)
+    assert limiter.limit == 4
+    # 与第一次失败同一时期发出的请求, 不再减半
+    limiter.release(second, ok=False)
+    assert limiter.limit == 4
+    clock.now += 0.5
+    third = clock.now
+    clock.now += 0.5
+    limiter.acquire()
+    limiter.release(third, ok=False)
+    assert limiter.limit == 2
+    for _ in range(5):
+        clock.now += 1
+        started_at = clock.now
+        clock.now += 0.1
+        limiter.acquire()
+        limiter.release(started_at, ok=False)
+    assert limiter.limit == 1
+
+
+def test_aimd_additive_increase(clock):
+    limiter = AimdLimiter(max_limit=4, latency_target=1, initial=1)
+    # 每个请求加1/limit, 即每完成约limit个请求并发数加1: 1 -> 2 -> 2.5 -> 2.9 -> 3.24 -> 3.55 -> 3.83 -> 4
+    for expected, requests in ((2, 1), (3, 3), (4, 3)):
+        for _ in range(requests):
+            limiter.acquire()
+            limiter.release(clock.now, ok=True)
+        assert limiter.limit == expected
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release(clock.now, ok=True)
+    assert limiter.limit == 4
+
+
+def test_aimd_slow_requests_do_not_increase(clock):
+    limiter = AimdLimiter(max_limit=4, latency_target=1, initial=1)
+    for _ in range(10):
+        started_at = clock.now
+        clock.now += 2
+        limiter.acquire()
+        limiter.release(started_at, ok=True)
+    assert limiter.limit == 1
+
+
+def test_aimd_acquire_waits_for_release():
+    limiter = AimdLimiter(max_limit=1, latency_target=1)
+    limiter.acquire()
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.05)
+    limiter.release(0, ok=True)
+    assert acquired.wait(1)
+    waiter.join()
+
+
+def test_throttle_retries_with_backoff(clock):
+    calls = []
+
+    def func():
+        calls.append(clock.now)
+        if len(calls) <= 3:
+            raise ThrottledError()
+        return "ok"
+
+    throttle_ = Throttle(ThrottleConfig(max_concurrency=8, max_retries=5))
+    assert throttle_.call(func) == "ok"
+    assert len(calls) == 4
+    assert clock.sleeps == [0.5, 1, 2]
+    # 每次限流发生在不同时期, 每次都减半(8 -> 1), 最后成功的请求延迟正常, 加1
+    assert throttle_.limit == 2
+
+
+def test_throttle_honours_retry_after(clock):
+    results = iter([ThrottledError(retry_after=0.25), ThrottledError(retry_after=0), "ok"])
+
+    def func():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert Throttle(ThrottleConfig(max_retries=2)).call(func) == "ok"
+    assert clock.sleeps == [0.25, 0]
+
+
+def test_throttle_gives_up_after_max_retries(clock):
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise ThrottledError(retry_after=0.01)
+
+    with pytest.raises(ThrottledError):
+        Throttle(ThrottleConfig(max_retries=2)).call(func)
+    assert len(calls) == 3
+    assert clock.sleeps == [0.01, 0.01]
+
+
+def test_throttle_other_errors_not_retried(clock):
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise ValueError("bad response")
+
+    throttle_ = Throttle(ThrottleConfig(max_concurrency=8))
+    with pytest.raises(ValueError):
+        throttle_.call(func)
+    assert len(calls) == 1
+    assert clock.sleeps == []
+    assert throttle_.limit == 4
+
+
+def test_throttle_not_adaptive(clock):
+    throttle_ = Throttle(ThrottleConfig(max_concurrency=8, adaptive=False, max_retries=1))
+    with pytest.raises(ThrottledError):
+        throttle_.call(lambda: (_ for _ in ()).throw(ThrottledError(retry_after=0)))
+    assert throttle_.limit == 8
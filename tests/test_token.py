@@ -0,0 +1,75 @@
+import pickle
+import tokenize
+
+import pytest
+
+from marker.utils.token import (
+    Token,
+    TokenPoint,
+    TokenStore,
+    is_fstring,
+    join_literals,
+    literal_body,
+)
+
+
+def _token(row: int, text: str) -> Token:
+    return Token(start_at=TokenPoint(row, 4), end_at=TokenPoint(row, 4 + len(text)), type=tokenize.STRING, token=text)
+
+
+TOKENS = [_token(1, '"中文"'), _token(2, '"文本"'), _token(3, '""')]
+
+
+def test_sequence():
+    store = TokenStore(TOKENS)
+    assert len(store) == 3
+    assert list(store) == TOKENS
+    assert store[-1] == TOKENS[-1]
+    assert list(store.texts()) == [_t.token for _t in TOKENS]
+    with pytest.raises(IndexError):
+        store[3]
+
+
+def test_slice_returns_store():
+    store = TokenStore(TOKENS)
+    sliced = store[1:]
+    assert isinstance(sliced, TokenStore)
+    assert list(sliced) == TOKENS[1:]
+
+
+def test_extend_with_store():
+    store = TokenStore(TOKENS[:1])
+    store.extend(TokenStore(TOKENS[1:]))
+    store.append(TOKENS[0])
+    assert list(store) == TOKENS + TOKENS[:1]
+
+
+def test_pickle():
+    store = TokenStore(TOKENS)
+    assert list(pickle.loads(pickle.dumps(store))) == TOKENS
+
+
+@pytest.mark.parametrize(
+    "text, body, fstring",
+    [
+        ('"中文"', "中文", False),
+        ("u'中文'", "中文", False),
+        ('r"\\d中文"', "\\d中文", False),
+        ('"""多行\n中文"""', "多行\n中文", False),
+        ("f'{x}中文'", "{x}中文", True),
+        ('Rf"{x}"', "{x}", True),
+        ('fR"{x}"', "{x}", True),
+        ('F"{x}"', "{x}", True),
+        ('""', "", False),
+    ],
+)
+def test_literal_body(text, body, fstring):
+    assert literal_body(text) == body
+    assert is_fstring(text) is fstring
+
+
+def test_join_literals():
+    token = join_literals([_token(1, '"abc"'), _token(2, "'中文'")])
+    assert token.token == '"abc中文"'
+    assert token.start_at == TokenPoint(1, 4)
+    assert token.end_at == TokenPoint(2, 8)
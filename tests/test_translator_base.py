@@ -0,0 +1,78 @@
+import typing
+
+from translator.provider import base
+from translator.provider.base import TranslatorBase
+
+
+class FakeBatchTranslator(TranslatorBase):
+    """与google_api一致, 翻译时先匹配官方词典; 译文为匹配后的语句转大写"""
+
+    batch_max_items = 3
+    batch_max_size = 10
+
+    def __init__(self, contents: typing.List[str], official_dict: typing.Optional[typing.Dict[str, str]] = None):
+        super().__init__("zh_hans", "en", official_dict, contents, provider="fake")
+        self.batches: typing.List[typing.List[str]] = []
+        self.misaligned = False
+
+    def translate_once(self, content: str) -> str:
+        match_result = self.pre_translate(content)
+        if match_result.full_match:
+            return match_result.content
+        return match_result.content.upper()
+
+    def can_batch(self, content: str) -> bool:
+        return "\n" not in content
+
+    def translate_batch(self, contents: typing.List[str]) -> typing.List[str]:
+        self.batches.append(contents)
+        results = [self.pre_translate(_c).content.upper() for _c in contents]
+        return results[:-1] if self.misaligned else results
+
+
+def test_pack():
+    translator = FakeBatchTranslator([])
+    contents = ["aaaa", "bbbb", "cc", "d\n", "e", "f", "g", "hhhhhhhhhhhh", "i"]
+    # 不能批量的语句立即单独成批; 每批不超过3条且大小不超过10, 超出大小的语句单独一批
+    assert list(translator._pack(contents)) == [
+        ["d\n"],
+        ["aaaa", "bbbb", "cc"],
+        ["e", "f", "g"],
+        ["hhhhhhhhhhhh"],
+        ["i"],
+    ]
+    translator.batch_max_items = 1
+    assert list(translator._pack(["a", "b"])) == [["a"], ["b"]]
+
+
+def test_translate_batches():
+    translator = FakeBatchTranslator(["ab", "cd", "ab", "ef"], official_dict={"cd": "CD!"})
+    translator.translate()
+    assert translator.result == {"ab": "AB", "cd": "CD!", "ef": "EF"}
+    # 重复语句只翻译一次, 完全匹配官方词典的语句不请求
+    assert translator.batches == [["ab", "ef"]]
+
+
+def test_misaligned_batch_falls_back(capsys):
+    translator = FakeBatchTranslator(["ab", "cd", "ef"])
+    translator.misaligned = True
+    translator.translate()
+    assert translator.result == {"ab": "AB", "cd": "CD", "ef": "EF"}
+    assert "translating one by one" in capsys.readouterr().out
+
+
+def test_pre_translate_once_per_content(monkeypatch) -> None:
+    calls: typing.List[str] = []
+    match_official_dict = base.match_official_dict
+
+    def counting(
+        official_dict: typing.Dict[str, str], content: str, glossary: base.Glossary = None
+    ) -> base.MatchResult:
+        calls.append(content)
+        return match_official_dict(official_dict, content, glossary)
+
+    monkeypatch.setattr(base, "match_official_dict", counting)
+    translator = FakeBatchTranslator(["用户名", "用户", "名称", "用户名"], official_dict={"用户": "user"})
+    translator.translate()
+    assert translator.result == {"用户名": "USER名", "用户": "user", "名称": "名称"}
+    assert sorted(calls) == sorted(["用户名", "用户", "名称"])
@@ -0,0 +1,56 @@
+import os
+import stat
+
+import pytest
+
+from common.utils import atomic_path, atomic_write
+
+
+def _files(path) -> list[str]:
+    return sorted(os.listdir(path))
+
+
+def test_atomic_write(tmp_path):
+    fp = str(tmp_path / "a.json")
+    atomic_write(fp, '{"中文": 1}', encoding="utf-8")
+    assert open(fp, encoding="utf-8").read() == '{"中文": 1}'
+    atomic_write(fp, b"\x00\x01")
+    assert open(fp, "rb").read() == b"\x00\x01"
+    assert _files(tmp_path) == ["a.json"]
+
+
+def test_atomic_write_failure_keeps_original(tmp_path):
+    fp = str(tmp_path / "a.po")
+    atomic_write(fp, "original")
+    with pytest.raises(RuntimeError):
+        with atomic_path(fp) as tmp_file:
+            with open(tmp_file, "w") as f:
+                f.write("partial")
+            raise RuntimeError("serialize failed")
+    # 原文件不变, 临时文件被清理
+    assert open(fp).read() == "original"
+    assert _files(tmp_path) == ["a.po"]
+    with pytest.raises(TypeError):
+        atomic_write(fp, None)  # type: ignore[arg-type]
+    assert _files(tmp_path) == ["a.po"]
+
+
+def test_atomic_path_writer_removed_tmp(tmp_path):
+    fp = str(tmp_path / "a.mo")
+    with pytest.raises(FileNotFoundError):
+        with atomic_path(fp) as tmp_file:
+            os.unlink(tmp_file)
+    assert _files(tmp_path) == []
+
+
+def test_atomic_write_mode(tmp_path):
+    fp = str(tmp_path / "a.po")
+    atomic_write(fp, "a")
+    os.chmod(fp, 0o640)
+    atomic_write(fp, "b", keep_mode=True)
+    assert stat.S_IMODE(os.stat(fp).st_mode) == 0o640
+    # 新文件的权限与直接open创建一致
+    umask = os.umask(0)
+    os.umask(umask)
+    atomic_write(str(tmp_path / "new.mo"), b"")
+    assert stat.S_IMODE(os.stat(tmp_path / "new.mo").st_mode) == 0o666 & ~umask
@@ -0,0 +1,206 @@
+import os
+
+import pytest
+
+from common.walker import FileWalker, is_ignored, parse_gitignore
+
+
+def _tree(root, files: list[str]) -> str:
+    for _f in files:
+        path = root / _f
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("", encoding="utf-8")
+    return str(root)
+
+
+def _walk(target: str, workers: int = 1, **kwargs) -> list[str]:
+    files = FileWalker(workers=workers, **kwargs).walk(target)
+    return sorted(os.path.relpath(_fp, target).replace(os.sep, "/") for _fp in files)
+
+
+@pytest.mark.parametrize(
+    "content, rel_path, is_dir, expected",
+    [
+        # 不含"/"的规则匹配任意层级
+        ("*.log", "a.log", False, True),
+        ("*.log", "a/b/c.log", False, True),
+        ("build", "a/build", True, True),
+        # 含"/"的规则相对于.gitignore所在目录
+        ("/build", "build", True, True),
+        ("/build", "a/build", True, False),
+        ("a/build", "a/build", True, True),
+        ("a/build", "x/a/build", True, False),
+        # **匹配任意多级目录
+        ("**/cache", "cache", True, True),
+        ("**/cache", "a/b/cache", True, True),
+        ("docs/**/*.py", "docs/conf.py", False, True),
+        ("docs/**/*.py", "docs/a/b/conf.py", False, True),
+        ("docs/**/*.py", "src/docs/conf.py", False, False),
+        ("a/**", "a/b/c.py", False, True),
+        # *不跨越目录
+        ("a/*.py", "a/b/c.py", False, False),
+        # 只匹配目录
+        ("data/", "data", True, True),
+        ("data/", "data", False, False),
+        # 取反规则, 最后命中的规则生效
+        ("*.py\n!keep.py", "keep.py", False, False),
+        ("*.py\n!keep.py", "drop.py", False, True),
+        ("!keep.py\n*.py", "keep.py", False, True),
+        # 转义与字符集
+        ("\\!important.py", "!important.py", False, True),
+        ("\\#note.py", "#note.py", False, True),
+        ("m[0-9].py", "m1.py", False, True),
+        ("m[!0-9].py", "m1.py", False, False),
+        # 注释与空行
+        ("# *.py\n\n", "a.py", False, False),
+    ],
+)
+def test_gitignore_rules(content, rel_path, is_dir, expected):
+    assert is_ignored(parse_gitignore(content), rel_path, is_dir) is expected
+
+
+def test_gitignore_rules_with_base():
+    rules = parse_gitignore("/build\n*.tmp", base="sub")
+    assert is_ignored(rules, "sub/build", True)
+    assert not is_ignored(rules, "build", True)
+    assert not is_ignored(rules, "sub/a/build", True)
+    assert is_ignored(rules, "sub/a/x.tmp", False)
+    assert not is_ignored(rules, "other/x.tmp", False)
+
+
+def test_walk_default_excludes(tmp_path):
+    target = _tree(
+        tmp_path / "project",
+        [
+            "a.py",
+            "a.txt",
+            "pkg/b.py",
+            ".git/hooks/c.py",
+            "node_modules/d.py",
+            "__pycache__/e.py",
+            "venv/pyvenv.cfg",
+            "venv/lib/f.py",
+            "pkg/.venv/pyvenv.cfg",
+            "pkg/.venv/g.py",
+        ],
+    )
+    assert _walk(target) == ["a.py", "pkg/b.py"]
+
+
+def test_walk_symlink_dir_skipped(tmp_path):
+    target = _tree(tmp_path / "project", ["a.py"])
+    _tree(tmp_path / "outside", ["b.py"])
+    os.symlink(tmp_path / "outside", tmp_path / "project" / "link")
+    assert _walk(target) == ["a.py"]
+
+
+def test_walk_exclude_patterns(tmp_path):
+    target = _tree(
+        tmp_path / "project",
+        [
+            "manage.py",
+            "app/manage.py",
+            "app/models.py",
+            "app/test_models.py",
+            "app/migrations/0001_initial.py",
+            "app/legacy/old.py",
+            "legacy/kept.py",
+            "conf/settings/dev.py",
+            "conf/settings/__init__.txt",
+            "other/settings/dev.py",
+        ],
+    )
+    files = _walk(
+        target,
+        exclude_paths=["migrations", "app/legacy"],
+        exclude_files=["manage.py", "test_*.py", "conf/settings/*.py"],
+    )
+    # 不含"/"的规则匹配任意层级的名称, 含"/"的规则匹配相对于目标目录的路径
+    assert files == ["app/models.py", "legacy/kept.py", "other/settings/dev.py"]
+
+
+def test_walk_excluded_dir_pruned(tmp_path, monkeypatch):
+    target = _tree(tmp_path / "project", ["a.py", "skip/deep/b.py", "keep/c.py"])
+    scanned = []
+    original = os.scandir
+
+    def scandir(path):
+        scanned.append(os.path.relpath(path, target))
+        return original(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    assert _walk(target, exclude_paths=["skip"]) == ["a.py", "keep/c.py"]
+    # 被过滤的目录不会进入
+    assert sorted(scanned) == [".", "keep"]
+
+
+def test_walk_gitignore(tmp_path):
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("build/\n*.gen.py\n!keep.gen.py\n/top.py\n", encoding="utf-8")
+    _tree(
+        tmp_path,
+        [
+            "top.py",
+            "src/top.py",
+            "src/a.py",
+            "src/a.gen.py",
+            "src/keep.gen.py",
+            "src/build/b.py",
+            "build.py",
+            "src/nested/c.py",
+            "src/nested/d.py",
+            "src/nested/sub/d.py",
+        ],
+    )
+    # 子目录的.gitignore只对该目录生效, 并可以覆盖上级规则
+    (tmp_path / "src" / "nested" / ".gitignore").write_text("/d.py\n!*.gen.py\n", encoding="utf-8")
+    (tmp_path / "src" / "nested" / "x.gen.py").write_text("", encoding="utf-8")
+    expected = [
+        "build.py",
+        "src/a.py",
+        "src/keep.gen.py",
+        "src/nested/c.py",
+        "src/nested/sub/d.py",
+        "src/nested/x.gen.py",
+        "src/top.py",
+    ]
+    assert _walk(str(tmp_path), respect_gitignore=True) == expected
+    assert _walk(str(tmp_path), workers=4, respect_gitignore=True) == expected
+    assert "top.py" in _walk(str(tmp_path), respect_gitignore=False)
+
+
+def test_walk_gitignore_from_parent(tmp_path):
+    """目标为仓库子目录时, 需要加载上级目录的.gitignore"""
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("generated/\n/src/skip.py\n", encoding="utf-8")
+    _tree(tmp_path, ["src/a.py", "src/skip.py", "src/generated/b.py", "src/sub/skip.py"])
+    assert _walk(str(tmp_path / "src"), respect_gitignore=True) == ["a.py", "sub/skip.py"]
+
+
+def test_walk_parallel_same_order(tmp_path):
+    target = _tree(tmp_path / "project", [f"pkg{_i}/sub{_j}/m{_j}.py" for _i in range(5) for _j in range(3)])
+    assert FileWalker(workers=4).walk(target) == FileWalker(workers=1).walk(target)
+
+
+def test_walk_file_target(tmp_path):
+    target = _tree(tmp_path / "project", ["a.py"])
+    fp = os.path.join(target, "a.py")
+    assert FileWalker().walk(fp) == [fp]
+
+
+def test_filter(tmp_path):
+    target = _tree(
+        tmp_path / "project",
+        ["a.py", "a.txt", "manage.py", "app/b.py", "app/migrations/0001.py", "node_modules/c.py"],
+    )
+    _tree(tmp_path / "outside", ["d.py"])
+    walker = FileWalker(exclude_paths=["migrations"], exclude_files=["manage.py"])
+    candidates = [
+        os.path.join(target, _f)
+        for _f in ("app/b.py", "a.py", "a.txt", "manage.py", "app/migrations/0001.py", "node_modules/c.py", "gone.py")
+    ]
+    candidates.append(str(tmp_path / "outside" / "d.py"))
+    assert walker.filter(target, candidates) == [os.path.join(target, "a.py"), os.path.join(target, "app", "b.py")]
+    fp = os.path.join(target, "a.py")
+    assert walker.filter(fp, candidates) == [fp]
+    assert walker.filter(fp, candidates[:1]) == []
@@ -0,0 +1,256 @@
+"""
+翻译记忆库
+基于SQLite保存翻译结果, key为(翻译提供商, 源语言, 目标语言, 原文), 多次运行/多个项目之间共享
+"""
+import os
+import sqlite3
+import time
+import typing
+import unicodedata
+from dataclasses import dataclass
+
+from rich.table import Table
+
+from common.config import config_util, language
+from common.constants import (
+    DEFAULT_TRANSLATION_MEMORY_PATH,
+    TRANSLATION_MEMORY_PO_PROVIDER,
+)
+from common.path import resolve_po_file
+from common.po import PoUtil
+from common.prompt import Prompt
+
+# 单条SQL中IN参数的最大数量, 低于SQLite默认的变量数限制
+_QUERY_BATCH_SIZE = 500
+_DAY_SECONDS = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    provider TEXT NOT NULL,
+    source_lang TEXT NOT NULL,
+    dest_lang TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    used_at INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, source_lang, dest_lang, source)
+);
+CREATE INDEX IF NOT EXISTS memory_used_at ON memory (used_at);
+"""
+
+
+@dataclass
+class TranslationMemoryConfig:
+    """
+    翻译记忆库配置
+    :param enabled: 是否开启, 默认关闭, 开启后翻译时会在path下创建数据库
+    :param path: 数据库路径, 默认在用户目录下, 多个项目共享
+    :param ttl_days: 翻译结果的有效天数, 0为永久有效
+    :param max_entries: 最大条目数, 超出时淘汰最久未使用的条目, 0为不限制
+    """
+
+    enabled: bool = False
+    path: str = DEFAULT_TRANSLATION_MEMORY_PATH
+    ttl_days: int = 0
+    max_entries: int = 0
+
+
+translation_memory_config = TranslationMemoryConfig(
+    enabled=config_util.get("translator.memory.enabled", False),
+    path=config_util.get("translator.memory.path", DEFAULT_TRANSLATION_MEMORY_PATH),
+    ttl_days=config_util.get("translator.memory.ttl_days", 0),
+    max_entries=config_util.get("translator.memory.max_entries", 0),
+)
+
+
+def normalize(text: str) -> str:
+    """原文归一化, 统一Unicode组合形式, 保留空白字符, 避免译文丢失首尾换行"""
+    return unicodedata.normalize("NFC", text)
+
+
+def _batches(items: list, size: int = _QUERY_BATCH_SIZE) -> typing.Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class TranslationMemory:
+    """
+    翻译记忆库, 只应在单个线程中使用, 批量查询/写入
+    人工翻译(从po文件导入)的结果优先于机器翻译
+    :param path: 数据库路径
+    :param ttl_days: 翻译结果的有效天数, 0为永久有效
+    :param max_entries: 最大条目数, 0为不限制
+    """
+
+    def __init__(
+        self,
+        path: str = translation_memory_config.path,
+        ttl_days: int = translation_memory_config.ttl_days,
+        max_entries: int = translation_memory_config.max_entries,
+    ):
+        self.path = os.path.expanduser(path)
+        self._ttl = ttl_days * _DAY_SECONDS
+        self._max_entries = max_entries
+        self.hits = self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # 多个项目可能同时使用, WAL模式下读写互不阻塞
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self) -> "TranslationMemory":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_many(
+        self, provider: str, source_lang: str, dest_lang: str, contents: typing.Iterable[str]
+    ) -> dict[str, str]:
+        """
+        批量查询, 过期的条目视为未命中
+        :return: 原文 -> 译文, 只包含命中的原文
+        """
+        keys: dict[str, list[str]] = {}
+        for content in contents:
+            keys.setdefault(normalize(content), []).append(content)
+        now = int(time.time())
+        expired_before = now - self._ttl if self._ttl else 0
+        found: dict[str, tuple[str, str]] = {}
+        for batch in _batches(list(keys)):
+            rows = self._conn.execute(
+                "SELECT provider, source, target FROM memory WHERE source_lang = ? AND dest_lang = ? "
+                f"AND provider IN (?, ?) AND created_at >= ? AND source IN ({','.join('?' * len(batch))})",
+                (source_lang, dest_lang, provider, TRANSLATION_MEMORY_PO_PROVIDER, expired_before, *batch),
+            )
+            for row_provider, source, target in rows:
+                if source not in found or row_provider == TRANSLATION_MEMORY_PO_PROVIDER:
+                    found[source] = (row_provider, target)
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE memory SET hits = hits + 1, used_at = ? "
+                "WHERE provider = ? AND source_lang = ? AND dest_lang = ? AND source = ?",
+                [(now, _p, source_lang, dest_lang, _s) for _s, (_p, __) in found.items()],
+            )
+        result = {_c: found[_k][1] for _k, _contents in keys.items() if _k in found for _c in _contents}
+        self.hits += len(result)
+        self.misses += sum(len(_contents) for _k, _contents in keys.items() if _k not in found)
+        return result
+
+    def put_many(self, provider: str, source_lang: str, dest_lang: str, translations: dict[str, str]):
+        """批量写入, 译文为空时跳过"""
+        now = int(time.time())
+        rows = [
+            (provider, source_lang, dest_lang, normalize(_s), _t, now, now)
+            for _s, _t in translations.items()
+            if _s and _t
+        ]
+        if not rows:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO memory (provider, source_lang, dest_lang, source, target, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (provider, source_lang, dest_lang, source) "
+                "DO UPDATE SET target = excluded.target, created_at = excluded.created_at, used_at = excluded.used_at",
+                rows,
+            )
+        self.evict()
+
+    def import_po(self, po_file: PoUtil, source_lang: str, dest_lang: str) -> int:
+        """
+        导入po文件中已翻译且非fuzzy的词条, 作为人工翻译保存
+        :return: 导入的条目数
+        """
+        translations = {_r.msgid: _r.msgstr for _r in po_file.records(lambda r: r.translated and not r.msgid_plural)}
+        self.put_many(TRANSLATION_MEMORY_PO_PROVIDER, source_lang, dest_lang, translations)
+        return len(translations)
+
+    def evict(self) -> int:
+        """
+        淘汰过期条目, 以及超出最大条目数时最久未使用的条目
+        :return: 淘汰的条目数
+        """
+        removed = 0
+        with self._conn:
+            if self._ttl:
+                removed += self._conn.execute(
+                    "DELETE FROM memory WHERE created_at < ?", (int(time.time()) - self._ttl,)
+                ).rowcount
+            if self._max_entries:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()
+                if count > self._max_entries:
+                    removed += self._conn.execute(
+                        "DELETE FROM memory WHERE rowid IN (SELECT rowid FROM memory ORDER BY used_at LIMIT ?)",
+                        (count - self._max_entries,),
+                    ).rowcount
+        return removed
+
+    def stats(self) -> list[tuple[str, str, str, int, int]]:
+        """按(翻译提供商, 源语言, 目标语言)统计条目数和累计命中次数"""
+        return self._conn.execute(
+            "SELECT provider, source_lang, dest_lang, COUNT(*), SUM(hits) FROM memory "
+            "GROUP BY provider, source_lang, dest_lang ORDER BY provider, source_lang, dest_lang"
+        ).fetchall()
+
+    def clear(self) -> int:
+        with self._conn:
+            return self._conn.execute("DELETE FROM memory").rowcount
+
+
+class TranslationMemoryTool:
+    """
+    翻译记忆库管理工具, 不传任何操作时输出统计信息
+    :param import_path: 导入已翻译词条的locale目录或者django.po路径
+    :param stats: 输出统计信息
+    :param evict: 淘汰过期以及超出最大条目数的条目
+    :param clear: 清空记忆库
+    """
+
+    def __init__(self, import_path: str = None, stats: bool = False, evict: bool = False, clear: bool = False):
+        self.import_path = import_path
+        self._stats = stats or not (import_path or evict or clear)
+        self._evict = evict
+        self._clear = clear
+
+    def handle(self):
+        with TranslationMemory() as memory:
+            if self._clear:
+                Prompt.info("Removed {count} entries", count=memory.clear())
+            if self.import_path:
+                count = memory.import_po(PoUtil(resolve_po_file(self.import_path)), language.current, language.dest)
+                Prompt.info("Imported {count} entries from {import_path}", count=count, import_path=self.import_path)
+            if self._evict:
+                Prompt.info("Evicted {count} entries", count=memory.evict())
+            if self._stats:
+                self._print_stats(memory)
+
+    @staticmethod
+    def _print_stats(memory: TranslationMemory):
+        table = Table(show_header=True, header_style="bold magenta")
+        for _column in ("Provider", "Source", "Dest", "Entries", "Hits"):
+            table.add_column(_column)
+        for _row in memory.stats():
+            table.add_row(*map(str, _row))
+        Prompt.print(table)
+        Prompt.info("Translation memory: {path}", path=memory.path)
+
+
+def open_memory() -> typing.Optional[TranslationMemory]:
+    """按配置打开翻译记忆库, 未开启或打开失败时返回None"""
+    if not translation_memory_config.enabled:
+        return None
+    try:
+        return TranslationMemory()
+    except sqlite3.Error as e:
+        Prompt.warning(
+            "Translation memory disabled, failed to open {path}: {e}", path=translation_memory_config.path, e=e
+        )
+        return None
+
+
+__all__ = ["TranslationMemory", "TranslationMemoryTool", "translation_memory_config", "open_memory"]
@@ -1,8 +1,14 @@
-from concurrent.futures import ThreadPoolExecutor, wait
 import typing
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass
 
+import requests
+
 from common.prompt import Prompt
+from translator.memory import TranslationMemory
+from translator.provider.glossary import Glossary
+from translator.provider.session import create_session
+from translator.provider.throttle import Throttle, ThrottledError, load_throttle_config
 
 
 @dataclass
@@ -13,8 +19,11 @@ class MatchResult:
     full_match: bool = False
 
 
-def match_official_dict(official_dict: typing.Dict[str, str], content: str) -> MatchResult:
-    """匹配官方词典, 最大匹配"""
+def match_official_dict(official_dict: typing.Dict[str, str], content: str, glossary: Glossary = None) -> MatchResult:
+    """
+    匹配官方词典, 最大匹配
+    :param glossary: 官方词典构建的术语表, 多次匹配时应复用, 不传时临时构建
+    """
     mr = MatchResult(content=content, full_match=False)
     if official_dict:
         if content in official_dict:
@@ -24,11 +33,9 @@ def match_official_dict(official_dict: typing.Dict[str, str], content: str) -> M
             mr.full_match = True
             return mr
 
-        max_official_content = ""
-        for official_content, translate_content in official_dict.items():
-            if official_content in content:
-                if len(official_content) > len(max_official_content):
-                    max_official_content = official_content
+        if glossary is None:
+            glossary = Glossary(official_dict)
+        max_official_content = glossary.longest(content)
         if max_official_content and official_dict[max_official_content]:
             content = content.replace(max_official_content, official_dict[max_official_content])
             mr.content = content
@@ -38,41 +45,180 @@ def match_official_dict(official_dict: typing.Dict[str, str], content: str) -> M
 class TranslatorBase:
     """翻译接口/Client基类"""
 
+    # 单个批量请求的最大语句数, 不超过1时不使用批量翻译
+    batch_max_items: int = 0
+    # 单个批量请求的最大大小, 按batch_size计算
+    batch_max_size: int = 0
+
     def __init__(
         self,
         source_lang: str,
         dest_lang: str,
         official_dict: typing.Dict[str, str] = None,
         contents: typing.List[str] = None,
+        provider: str = "",
+        memory: TranslationMemory = None,
     ):
         self._source_lang = source_lang
         self._dest_lang = dest_lang
         self._official_dict = official_dict if official_dict else {}
+        # 术语表只构建一次, 各线程共享
+        self._glossary = Glossary(self._official_dict)
         self._contents = contents
         self._result: typing.Dict[str, str] = {}
+        # 语句 -> 匹配官方词典的结果, 每个语句只匹配一次, 在主线程中填充后各线程只读
+        self._pre_translated: typing.Dict[str, MatchResult] = {}
+        self._provider = provider
+        # 翻译记忆库, 只在主线程中批量查询/写入
+        self._memory = memory
+        # 并发与限流, 按翻译提供商配置
+        self._throttle = Throttle(load_throttle_config(provider))
+        self._max_workers = self._throttle.config.max_concurrency
+        self._session: typing.Optional[requests.Session] = None
 
     @property
     def result(self) -> typing.Dict[str, str]:
         """翻译结果"""
         return self._result
 
+    @property
+    def session(self) -> requests.Session:
+        """HTTP会话, 线程池内的所有线程共享, 连接池大小与并发数一致"""
+        if self._session is None:
+            self._session = create_session(pool_size=self._max_workers)
+        return self._session
+
+    def close(self):
+        """关闭HTTP会话, 释放连接"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
     def pre_translate(self, content: str) -> MatchResult:
-        """预翻译, 即匹配官方词典"""
-        return match_official_dict(self._official_dict, content)
+        """预翻译, 即匹配官方词典, 结果按语句缓存, 打包/翻译/写回记忆库时不再重复匹配"""
+        mr = self._pre_translated.get(content)
+        if mr is None:
+            mr = self._pre_translated[content] = match_official_dict(self._official_dict, content, self._glossary)
+        return mr
 
     def translate_once(self, content: str) -> str:
         """翻译单个语句, 各个翻译接口/Client需要实现该方法"""
         raise NotImplementedError
 
+    def translate_batch(self, contents: typing.List[str]) -> typing.List[str]:
+        """
+        批量翻译, 返回与contents一一对应的译文, 支持批量翻译的API/Client需要实现该方法并设置batch_max_items
+        返回的译文数量不一致或者有空译文时, 该批语句会逐句重新翻译
+        """
+        raise NotImplementedError
+
+    def can_batch(self, content: str) -> bool:
+        """语句能否放入批量请求, 如包含批量请求分隔符的语句只能逐句翻译"""
+        return True
+
+    def batch_size(self, content: str) -> int:
+        """匹配官方词典后的语句在批量请求中占用的大小, 默认为字符数"""
+        return len(content)
+
     def translate(self) -> None:
-        """默认使用多线程逐句翻译, 如果有API/Client支持批量翻译, 可以重写该方法"""
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = [executor.submit(self._translate_and_log, content) 
-                       for content in self._contents 
-                       if content not in self._result]
-            wait(futures)
+        """
+        使用多线程翻译, API/Client支持批量翻译时, 按batch_max_items/batch_max_size将语句打包后批量翻译
+        线程池大小为配置的最大并发数, 每个请求都经过限流, 被限流时自动降低并发并重试
+        开启翻译记忆库时, 先从记忆库中查找, 只翻译未命中的语句, 翻译结果写回记忆库
+        记忆库的key为匹配官方词典后实际发送给翻译API/Client的语句, 完全匹配官方词典的语句不经过记忆库
+        """
+        contents = [content for content in dict.fromkeys(self._contents or []) if content not in self._result]
+        pending = self._from_memory(contents)
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                futures = [executor.submit(self._translate_batch_and_log, batch) for batch in self._pack(pending)]
+                wait(futures)
+        finally:
+            self.close()
+        if self._throttle.config.adaptive and pending:
+            Prompt.info("Final concurrency: {limit}", limit=self._throttle.limit)
+        self._to_memory(pending)
+
+    def _from_memory(self, contents: typing.List[str]) -> typing.List[str]:
+        """完全匹配官方词典的语句直接使用词典, 其余从翻译记忆库中查找, 返回需要请求翻译API/Client的语句"""
+        queries = {}
+        for content in contents:
+            mr = self.pre_translate(content)
+            if mr.full_match:
+                self._result[content] = mr.content
+                continue
+            queries[content] = mr.content
+        if self._memory is None:
+            return list(queries)
+        cached = self._memory.get_many(self._provider, self._source_lang, self._dest_lang, queries.values())
+        for content, query in queries.items():
+            if query in cached:
+                self._result[content] = cached[query]
+        Prompt.info(
+            "Translation memory: {hits} hits, {misses} misses", hits=self._memory.hits, misses=self._memory.misses
+        )
+        return [content for content in queries if content not in self._result]
+
+    def _to_memory(self, contents: typing.List[str]):
+        """将翻译结果写回翻译记忆库"""
+        if self._memory is None:
+            return
+        # 请求失败的语句不在翻译结果中, 不写入记忆库
+        translations = {self.pre_translate(_c).content: self._result[_c] for _c in contents if self._result.get(_c)}
+        if translations:
+            self._memory.put_many(self._provider, self._source_lang, self._dest_lang, translations)
+
+    def _pack(self, contents: typing.List[str]) -> typing.Iterator[typing.List[str]]:
+        """按顺序将语句打包, 每批不超过batch_max_items条且大小不超过batch_max_size, 超出大小的语句单独一批"""
+        if self.batch_max_items <= 1:
+            yield from ([content] for content in contents)
+            return
+        batch: typing.List[str] = []
+        size = 0
+        for content in contents:
+            if not self.can_batch(content):
+                yield [content]
+                continue
+            content_size = self.batch_size(self.pre_translate(content).content)
+            if batch and (len(batch) >= self.batch_max_items or size + content_size > self.batch_max_size):
+                yield batch
+                batch = []
+                size = 0
+            batch.append(content)
+            size += content_size
+        if batch:
+            yield batch
+
+    def _translate_batch_and_log(self, batch: typing.List[str]) -> None:
+        """批量翻译并打印日志, 请求失败或译文无法与原文对齐时, 回退为逐句翻译"""
+        if len(batch) == 1:
+            self._translate_and_log(batch[0])
+            return
+        try:
+            results = self._throttle.call(lambda: self.translate_batch(batch))
+        except (requests.RequestException, ThrottledError, ValueError) as e:
+            Prompt.warning("Batch of {count} failed, translating one by one: {e}", count=len(batch), e=e)
+            results = None
+        if results is not None and (len(results) != len(batch) or not all(results)):
+            Prompt.warning(
+                "Batch of {count} returned {returned} translations, translating one by one",
+                count=len(batch),
+                returned=len([_r for _r in results if _r]),
+            )
+            results = None
+        if results is None:
+            for content in batch:
+                self._translate_and_log(content)
+            return
+        for content, result in zip(batch, results):
+            self._result[content] = result
+            Prompt.info(f"origin: {content}, translated: {result}")
 
     def _translate_and_log(self, content: str) -> None:
-        """翻译并打印日志"""
-        self._result[content] = self.translate_once(content)
-        Prompt.info(f"origin: {content}, translated: {self._result[content]}")
\ No newline at end of file
+        """翻译并打印日志, 请求失败时跳过该语句"""
+        try:
+            self._result[content] = self._throttle.call(lambda: self.translate_once(content))
+        except (requests.RequestException, ThrottledError) as e:
+            Prompt.warning("Failed to translate {content}: {e}", content=content, e=e)
+            return
+        Prompt.info(f"origin: {content}, translated: {self._result[content]}")
@@ -0,0 +1,91 @@
+"""
+官方词典术语匹配
+基于Aho-Corasick自动机, 构建一次后对每个语句只需线性扫描一遍, 即可找到其中出现的最长术语
+"""
+import typing
+
+# 状态转移表的key为 状态 << _CHAR_BITS | 字符码点, 用一个扁平的dict代替每个状态一个dict, 节省内存
+_CHAR_BITS = 21
+
+
+class Glossary:
+    """
+    术语表
+    :param terms: 术语, 顺序决定长度相同时的优先级, 空字符串会被忽略
+    """
+
+    def __init__(self, terms: typing.Iterable[str]):
+        self._terms: list[str] = []
+        # (状态, 字符) -> 下一个状态
+        self._goto: dict[int, int] = {}
+        # 失配时回退的状态
+        self._fail: list[int] = [0]
+        # 以该状态结尾的术语下标, 不是术语结尾时为-1
+        self._term: list[int] = [-1]
+        # 失配链上最近的术语结尾状态, 没有时为0, 即当前状态不是术语结尾时以当前位置结尾的最长术语
+        self._output: list[int] = [0]
+        self._build(terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _build(self, terms: typing.Iterable[str]):
+        goto, term_of = self._goto, self._term
+        # 构建trie, 同时记录每个状态的子状态, 用于按层计算失配指针
+        children: list[list[tuple[int, int]]] = [[]]
+        for term in terms:
+            if not term:
+                continue
+            state = 0
+            for _c in term:
+                key = state << _CHAR_BITS | ord(_c)
+                next_state = goto.get(key)
+                if next_state is None:
+                    next_state = goto[key] = len(term_of)
+                    term_of.append(-1)
+                    children.append([])
+                    children[state].append((ord(_c), next_state))
+                state = next_state
+            if term_of[state] == -1:
+                term_of[state] = len(self._terms)
+            self._terms.append(term)
+        # 按层遍历计算失配指针, 第一层的失配状态为根
+        fail = self._fail = [0] * len(term_of)
+        output = self._output = [0] * len(term_of)
+        queue = [_s for __, _s in children[0]]
+        for state in queue:
+            for code, child in children[state]:
+                fallback = fail[state]
+                while fallback and (fallback << _CHAR_BITS | code) not in goto:
+                    fallback = fail[fallback]
+                target = fail[child] = goto.get(fallback << _CHAR_BITS | code, 0)
+                output[child] = target if term_of[target] != -1 else output[target]
+                queue.append(child)
+
+    def _scan(self, text: str) -> typing.Generator[tuple[int, int], None, None]:
+        """逐个字符扫描, 产出(结束位置, 以该位置结尾的最长术语所在状态)"""
+        goto, fail, term_of, output = self._goto, self._fail, self._term, self._output
+        state = 0
+        for end, _c in enumerate(text, start=1):
+            code = ord(_c)
+            next_state = goto.get(state << _CHAR_BITS | code)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto.get(state << _CHAR_BITS | code)
+            state = next_state or 0
+            # 当前状态不是术语结尾时, 失配链上最近的术语就是以该位置结尾的最长术语
+            matched = state if term_of[state] != -1 else output[state]
+            if matched:
+                yield end, matched
+
+    def longest(self, text: str) -> typing.Optional[str]:
+        """text中出现的最长术语, 长度相同时取靠前的术语, 与按顺序逐个判断 term in text 的结果一致"""
+        found = -1
+        for __, state in self._scan(text):
+            index = self._term[state]
+            if found == -1 or (len(self._terms[index]), -index) > (len(self._terms[found]), -found):
+                found = index
+        return None if found == -1 else self._terms[found]
+
+
+__all__ = ["Glossary"]
@@ -1,15 +1,23 @@
 import html
 import re
+import typing
 from urllib import parse
 
-import requests
-
 from common import constants
 from translator.provider.base import TranslatorBase
+from translator.provider.throttle import ThrottledError
+
+# 批量翻译时语句之间的分隔符
+BATCH_SEPARATOR = "\n"
+BATCH_SEPARATOR_QUOTED = parse.quote(BATCH_SEPARATOR)
 
 
 class GoogleAPI(TranslatorBase):
-    """谷歌翻译API"""
+    """谷歌翻译API, 批量翻译时用换行符连接多个语句, 译文按换行符拆分"""
+
+    batch_max_items = constants.GOOGLE_BATCH_MAX_ITEMS
+    # 按URL编码后的长度计算, 避免URL过长
+    batch_max_size = constants.GOOGLE_BATCH_MAX_URL_SIZE
 
     def _generate_url(self, content: str):
         """生成翻译URL"""
@@ -22,16 +30,35 @@ class GoogleAPI(TranslatorBase):
         )
         return url
 
-    def translate_once(self, content: str):
-        """翻译单个语句"""
-        match_result = self.pre_translate(content)
-        if match_result.full_match:
-            return match_result.content
-        url = self._generate_url(match_result.content)
-        response = requests.get(url)
+    def _request(self, text: str) -> str:
+        """请求翻译, 返回译文, 没有译文时返回空字符串"""
+        response = self.session.get(self._generate_url(text))
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            raise ThrottledError(retry_after=float(retry_after) if retry_after.isdigit() else None)
+        response.raise_for_status()
         data = response.text
         expr = r'(?s)class="(?:t0|result-container)">(.*?)<'
         result = re.findall(expr, data)
         if not result:
             return ""
         return html.unescape(result[0])
+
+    def translate_once(self, content: str):
+        """翻译单个语句"""
+        match_result = self.pre_translate(content)
+        if match_result.full_match:
+            return match_result.content
+        return self._request(match_result.content)
+
+    def can_batch(self, content: str) -> bool:
+        """包含换行符的语句无法与译文对齐, 只能逐句翻译"""
+        return "\n" not in content and "\r" not in content
+
+    def batch_size(self, content: str) -> int:
+        # 加上分隔符编码后的长度
+        return len(parse.quote(content)) + len(BATCH_SEPARATOR_QUOTED)
+
+    def translate_batch(self, contents: typing.List[str]) -> typing.List[str]:
+        queries = [self.pre_translate(_c).content for _c in contents]
+        return self._request(BATCH_SEPARATOR.join(queries)).split(BATCH_SEPARATOR)
@@ -3,6 +3,7 @@ import typing
 from common import Prompt
 from common.constants import TranslatorProviderEnum
 from common.utils import import_string
+from translator.memory import TranslationMemory
 
 
 class Provider:
@@ -16,6 +17,7 @@ class Provider:
         provider: str,
         official_dict: typing.Dict[str, str] = None,
         contents: typing.List[str] = None,
+        memory: TranslationMemory = None,
     ):
         # 用import_string的形式是为了避免各个翻译API/Client的配置初始化仅在使用到的时候才初始化
         mapping = {
@@ -29,4 +31,6 @@ class Provider:
             source_lang=source_lang,
             official_dict=official_dict,
             contents=contents,
+            provider=provider,
+            memory=memory,
         )
@@ -0,0 +1,82 @@
+"""
+翻译API/Client共用的HTTP会话
+同一个线程池内的请求复用连接(keep-alive), 避免每个请求都重新建立TCP/TLS连接
+"""
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.config import config_util
+from common.constants import (
+    DEFAULT_HTTP_CONNECT_TIMEOUT,
+    DEFAULT_HTTP_READ_TIMEOUT,
+    DEFAULT_HTTP_RETRIES,
+)
+
+# 服务端错误时重试, 429(限流)不在此重试, 由调用方降低并发
+_RETRY_STATUS = (500, 502, 503, 504)
+
+
+@dataclass
+class HttpConfig:
+    """
+    翻译请求HTTP配置
+    :param connect_timeout: 连接超时(秒)
+    :param read_timeout: 读取超时(秒)
+    :param retries: 连接失败或服务端错误(5xx)时的重试次数, 0为不重试
+    :param backoff_factor: 重试间隔的退避系数, 第n次重试前等待 backoff_factor * 2^(n-1) 秒
+    """
+
+    connect_timeout: float = DEFAULT_HTTP_CONNECT_TIMEOUT
+    read_timeout: float = DEFAULT_HTTP_READ_TIMEOUT
+    retries: int = DEFAULT_HTTP_RETRIES
+    backoff_factor: float = 0.5
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        return self.connect_timeout, self.read_timeout
+
+
+http_config = HttpConfig(
+    connect_timeout=config_util.get("translator.http.connect_timeout", DEFAULT_HTTP_CONNECT_TIMEOUT),
+    read_timeout=config_util.get("translator.http.read_timeout", DEFAULT_HTTP_READ_TIMEOUT),
+    retries=config_util.get("translator.http.retries", DEFAULT_HTTP_RETRIES),
+    backoff_factor=config_util.get("translator.http.backoff_factor", 0.5),
+)
+
+
+class TimeoutSession(requests.Session):
+    """未指定timeout的请求使用配置的超时时间, requests默认不超时, 连接卡住时会一直阻塞工作线程"""
+
+    def __init__(self, timeout: tuple[float, float]):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+def create_session(pool_size: int, config: HttpConfig = http_config) -> requests.Session:
+    """
+    创建HTTP会话, 供同一个线程池内的所有线程共享
+    :param pool_size: 每个host的最大连接数, 应与线程池的并发数一致, 否则超出的连接用完即关闭, 无法复用
+    """
+    retry = Retry(
+        total=config.retries,
+        backoff_factor=config.backoff_factor,
+        status_forcelist=_RETRY_STATUS,
+        # 翻译请求没有副作用, POST(有道)也可以重试
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = TimeoutSession(config.timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+__all__ = ["HttpConfig", "http_config", "create_session"]
@@ -0,0 +1,180 @@
+"""
+翻译请求的并发控制与限流
+令牌桶限制请求速率(QPS), AIMD控制同时进行的请求数: 被限流或出错时并发数减半, 延迟正常时逐步增加
+"""
+import threading
+import time
+import typing
+from dataclasses import dataclass
+
+from common.config import config_util
+from common.constants import DEFAULT_THROTTLE_LATENCY_TARGET, MAX_CONCURRENT_REQUEST
+
+
+class ThrottledError(Exception):
+    """
+    翻译服务限流(如HTTP 429), 由各个翻译API/Client抛出, 降低并发后重试
+    :param retry_after: 服务端要求的等待时间(秒), 未知时为None
+    """
+
+    def __init__(self, msg: str = "Throttled by translation service", retry_after: typing.Optional[float] = None):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+@dataclass
+class ThrottleConfig:
+    """
+    翻译API/Client的并发与限流配置
+    :param max_concurrency: 最大并发数, 即线程池大小
+    :param qps: 每秒最大请求数, 0为不限制
+    :param burst: 令牌桶容量, 即允许的瞬时请求数, 0时取max(1, qps)
+    :param adaptive: 是否开启自适应并发, 关闭时始终以最大并发数请求
+    :param latency_target: 自适应并发的目标延迟(秒), 请求延迟不超过该值时才增加并发
+    :param max_retries: 被限流时的最大重试次数
+    """
+
+    max_concurrency: int = MAX_CONCURRENT_REQUEST
+    qps: float = 0
+    burst: int = 0
+    adaptive: bool = True
+    latency_target: float = DEFAULT_THROTTLE_LATENCY_TARGET
+    max_retries: int = 5
+
+    def __post_init__(self):
+        self.max_concurrency = max(1, self.max_concurrency)
+        if not self.burst:
+            self.burst = max(1, int(self.qps))
+
+
+def load_throttle_config(provider: str) -> ThrottleConfig:
+    """读取翻译API/Client的并发与限流配置, 配置在[translator.throttle.<provider>]下"""
+    prefix = f"translator.throttle.{provider}"
+    return ThrottleConfig(
+        max_concurrency=config_util.get(f"{prefix}.max_concurrency", MAX_CONCURRENT_REQUEST),
+        qps=config_util.get(f"{prefix}.qps", 0),
+        burst=config_util.get(f"{prefix}.burst", 0),
+        adaptive=config_util.get(f"{prefix}.adaptive", True),
+        latency_target=config_util.get(f"{prefix}.latency_target", DEFAULT_THROTTLE_LATENCY_TARGET),
+        max_retries=config_util.get(f"{prefix}.max_retries", 5),
+    )
+
+
+class TokenBucket:
+    """
+    令牌桶, 线程安全
+    :param rate: 每秒生成的令牌数, 0为不限制
+    :param burst: 桶容量
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌, 没有令牌时等待"""
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AimdLimiter:
+    """
+    AIMD并发控制, 线程安全
+    请求成功且延迟不超过目标时, 每完成约limit个请求并发数加1; 被限流或出错时并发数减半
+    同一时期发出的请求只触发一次减半, 避免并发数被同时失败的请求连续减半
+    :param max_limit: 最大并发数
+    :param latency_target: 目标延迟(秒)
+    :param initial: 初始并发数, 默认为最大并发数
+    """
+
+    def __init__(self, max_limit: int, latency_target: float, initial: int = None):
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self._limit = float(initial or max_limit)
+        self._in_flight = 0
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self):
+        """占用一个并发, 达到并发上限时等待"""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, started_at: float, ok: bool = True):
+        """
+        释放并发, 并根据请求结果调整并发数
+        :param started_at: 请求开始时间(time.monotonic), 不含等待并发/令牌的时间
+        :param ok: 请求是否成功, 被限流或出错时为False
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if not ok:
+                if started_at >= self._decreased_at:
+                    self._limit = max(1.0, self._limit / 2)
+                    self._decreased_at = time.monotonic()
+            elif time.monotonic() - started_at <= self.latency_target:
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+
+class Throttle:
+    """
+    翻译请求的并发控制与限流, 组合令牌桶和AIMD并发控制, 供线程池内的所有线程共享
+    :param config: 并发与限流配置
+    """
+
+    def __init__(self, config: ThrottleConfig):
+        self.config = config
+        self._bucket = TokenBucket(config.qps, config.burst)
+        self._limiter = AimdLimiter(config.max_concurrency, config.latency_target) if config.adaptive else None
+
+    @property
+    def limit(self) -> int:
+        """当前并发数"""
+        return self._limiter.limit if self._limiter else self.config.max_concurrency
+
+    def call(self, func: typing.Callable[[], typing.Any]) -> typing.Any:
+        """
+        在并发与速率限制下调用func, 被限流时按服务端要求或指数退避等待后重试
+        :raise ThrottledError: 超过最大重试次数仍被限流
+        """
+        for attempt in range(self.config.max_retries + 1):
+            if self._limiter:
+                self._limiter.acquire()
+            ok, started_at = False, time.monotonic()
+            try:
+                self._bucket.acquire()
+                started_at = time.monotonic()
+                result = func()
+                ok = True
+                return result
+            except ThrottledError as e:
+                if attempt == self.config.max_retries:
+                    raise
+                retry_after = e.retry_after if e.retry_after is not None else min(2**attempt * 0.5, 30)
+            finally:
+                if self._limiter:
+                    self._limiter.release(started_at, ok)
+            time.sleep(retry_after)
+
+
+__all__ = ["ThrottledError", "ThrottleConfig", "Throttle", "load_throttle_config"]
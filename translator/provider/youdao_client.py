@@ -1,18 +1,26 @@
 import hashlib
 import time
+import typing
 import uuid
 from dataclasses import dataclass
 
-import requests
-
 from common.config import config_util
-from common.constants import YOU_DAO_SDK_URL, YouDaoSupportDomainEnum
+from common.constants import (
+    YOU_DAO_BATCH_MAX_CHARS,
+    YOU_DAO_BATCH_MAX_ITEMS,
+    YOU_DAO_SDK_BATCH_URL,
+    YOU_DAO_SDK_URL,
+    YOU_DAO_THROTTLED_ERROR_CODE,
+    YouDaoSupportDomainEnum,
+)
 from translator.provider.base import TranslatorBase
+from translator.provider.throttle import ThrottledError
 
 
 @dataclass
 class YouDaoClientConfig:
     url: str = YOU_DAO_SDK_URL
+    batch_url: str = YOU_DAO_SDK_BATCH_URL
     app_key: str = ""
     app_secret: str = ""
     domain: str = YouDaoSupportDomainEnum.General
@@ -24,6 +32,7 @@ class YouDaoClientConfig:
 # 有道客户端配置
 youdao_client_config = YouDaoClientConfig(
     url=config_util.get("youdao_client.url", YOU_DAO_SDK_URL),
+    batch_url=config_util.get("youdao_client.batch_url", YOU_DAO_SDK_BATCH_URL),
     app_key=config_util.get("youdao_client.app_key", ""),
     app_secret=config_util.get("youdao_client.app_secret", ""),
     domain=config_util.get("youdao_client.domain", YouDaoSupportDomainEnum.General),
@@ -31,6 +40,9 @@ youdao_client_config = YouDaoClientConfig(
 
 
 class YoudaoClient(TranslatorBase):
+    batch_max_items = YOU_DAO_BATCH_MAX_ITEMS
+    batch_max_size = YOU_DAO_BATCH_MAX_CHARS
+
     @staticmethod
     def encrypt(sign_str):
         hash_algorithm = hashlib.sha256()
@@ -44,33 +56,48 @@ class YoudaoClient(TranslatorBase):
         size = len(q)
         return q if size <= 20 else q[0:10] + str(size) + q[size - 10 : size]
 
-    @staticmethod
-    def do_request(data):
+    def do_request(self, data, url: str = None):
         headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-        return requests.post(youdao_client_config.url, data=data, headers=headers)
+        return self.session.post(url or youdao_client_config.url, data=data, headers=headers)
 
-    def translate_once(self, content: str) -> str:
-        match_result = self.pre_translate(content)
-        if match_result.full_match:
-            return match_result.content
-        content = match_result.content
+    def _sign_data(self, q: typing.Union[str, typing.List[str]]) -> dict:
+        """生成请求参数, 批量请求时q为多个语句, 签名的input为所有语句拼接后的字符串"""
         salt = str(uuid.uuid1())
         cur_time = str(int(time.time()))
-        sign_str = youdao_client_config.app_key + self.truncate(content)
+        sign_str = youdao_client_config.app_key + self.truncate(q if isinstance(q, str) else "".join(q))
         sign_str += salt + cur_time + youdao_client_config.app_secret
-        sign = self.encrypt(sign_str)
-        data = {
+        return {
             "from": self._source_lang,
             "to": self._dest_lang,
             "signType": 'v3',
-            "curtime": str(int(time.time())),
-            "q": content,
+            "curtime": cur_time,
+            "q": q,
             "appKey": youdao_client_config.app_key,
             "salt": salt,
-            "sign": sign,
+            "sign": self.encrypt(sign_str),
         }
-        response = self.do_request(data)
-        result_list = response.json().get("translation", [])
+
+    @staticmethod
+    def _parse(response) -> dict:
+        response.raise_for_status()
+        body = response.json()
+        if body.get("errorCode") == YOU_DAO_THROTTLED_ERROR_CODE:
+            raise ThrottledError()
+        return body
+
+    def translate_once(self, content: str) -> str:
+        match_result = self.pre_translate(content)
+        if match_result.full_match:
+            return match_result.content
+        body = self._parse(self.do_request(self._sign_data(match_result.content)))
+        result_list = body.get("translation", [])
         if not result_list:
             return ""
         return result_list[0]
+
+    def translate_batch(self, contents: typing.List[str]) -> typing.List[str]:
+        """批量翻译接口的译文带有原文, 按原文对齐, 缺失的译文为空字符串"""
+        queries = [self.pre_translate(_c).content for _c in contents]
+        body = self._parse(self.do_request(self._sign_data(queries), url=youdao_client_config.batch_url))
+        translations = {_r.get("query"): _r.get("translation", "") for _r in body.get("translateResults") or []}
+        return [translations.get(_q, "") for _q in queries]
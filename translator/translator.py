@@ -4,9 +4,10 @@ from dataclasses import dataclass
 
 from common import Prompt
 from common.config import config_util, language
-from common.constants import TranslatorModeEnum, TranslatorProviderEnum
+from common.constants import PoFileModeEnum, TranslatorModeEnum, TranslatorProviderEnum
 from common.po import PoUtil
 from common.utils import read_file
+from translator.memory import open_memory
 from translator.provider import Provider
 
 
@@ -40,6 +41,7 @@ class TranslatorTool:
         self._init_po()
         self._init_official_dict()
         self._client = None
+        self._memory = None
         self._init_client()
 
     def _init_po(self):
@@ -64,15 +66,17 @@ class TranslatorTool:
         if self.mode == TranslatorModeEnum.FULL_MATCH:
             return
         if self.mode == TranslatorModeEnum.UPDATE:
-            contents = [entry.msgid for entry in self.po_file.po if entry.msgstr == ""]
+            contents = [_r.msgid for _r in self.po_file.records(lambda r: r.msgstr == "")]
         else:
             contents = self.po_file.msgid_list
+        self._memory = open_memory()
         self._client = Provider.get_instance(
             source_lang=language.current,
             dest_lang=language.dest,
             official_dict=self.official_dict,
             provider=translator_config.provider,
             contents=contents,
+            memory=self._memory,
         )
 
     def handle(self):
@@ -80,15 +84,15 @@ class TranslatorTool:
             self._full_match()
             return
         # 翻译
-        self._client.translate()
+        try:
+            self._client.translate()
+        finally:
+            if self._memory is not None:
+                self._memory.close()
         # 写入po文件
         self.po_file.write(data=self._client.result, mode=self.mode)
 
     def _full_match(self):
         Prompt.info("开始同步词条")
-        for entry in self.po_file.po:
-            if entry.msgid not in self.official_dict:
-                continue
-            entry.msgstr = self.official_dict[entry.msgid]
-        self.po_file.po.save(self.po_file.po_file_path)
+        self.po_file.write(data=self.official_dict, mode=PoFileModeEnum.OVERWRITE)
         Prompt.info("完成同步词条")